@@ -0,0 +1,138 @@
+import os
+import zipfile
+
+# 以下配置在创建 AdmissionController 时从环境变量读取（app.py 会先加载 .env）
+# GCSCAN_MEM_LIMIT_MB：所有扫描可预留的内存总量，默认取物理内存的 80%
+# GCSCAN_JAVA_MIN_HEAP_MB / GCSCAN_JAVA_MAX_HEAP_MB：Java 扫描 -Xmx 的取值范围
+# GCSCAN_PHP_MAX_MB：单个 PHP 扫描预估内存的上限（运行时按实际 RSS 修正）
+
+MB = 1024 * 1024
+
+
+def _read_meminfo():
+    info = {}
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                info[key] = int(rest.split()[0]) // 1024  # kB -> MB
+    except (OSError, ValueError, IndexError):
+        pass
+    return info
+
+
+def mem_total_mb():
+    return _read_meminfo().get('MemTotal')
+
+
+def mem_available_mb():
+    return _read_meminfo().get('MemAvailable')
+
+
+def _children_of(pid):
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children', 'r') as f:
+                children += [int(c) for c in f.read().split()]
+    except (OSError, ValueError):
+        pass
+    return children
+
+
+def process_tree_rss_mb(pid):
+    """进程及其所有子进程的 RSS 之和（MB），进程不存在时返回 0"""
+    total = 0
+    stack = [pid]
+    seen = set()
+    while stack:
+        cur = stack.pop()
+        if cur in seen:
+            continue
+        seen.add(cur)
+        try:
+            with open(f'/proc/{cur}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+                        break
+        except (OSError, ValueError, IndexError):
+            continue
+        stack += _children_of(cur)
+    return total // 1024
+
+
+def count_java_classes(project_path):
+    """统计项目中的 class 数量与 jar/class 文件总大小"""
+    class_count = 0
+    total_bytes = 0
+    for root, dirs, files in os.walk(project_path):
+        # 反编译出的源码不参与分析
+        if 'decompiled' in dirs:
+            dirs.remove('decompiled')
+        for file in files:
+            full = os.path.join(root, file)
+            if file.endswith('.class'):
+                class_count += 1
+                total_bytes += os.path.getsize(full)
+            elif file.endswith('.jar'):
+                total_bytes += os.path.getsize(full)
+                try:
+                    with zipfile.ZipFile(full, 'r') as z:
+                        class_count += sum(1 for n in z.namelist() if n.endswith('.class'))
+                except (zipfile.BadZipFile, OSError):
+                    pass
+    return class_count, total_bytes
+
+
+def php_source_bytes(project_path, exts=('.php', '.phtml', '.inc')):
+    total_bytes = 0
+    for root, _, files in os.walk(project_path):
+        for file in files:
+            if file.lower().endswith(exts):
+                total_bytes += os.path.getsize(os.path.join(root, file))
+    return total_bytes
+
+
+class AdmissionController:
+    """按内存预留情况决定排队中的扫描能否启动。
+
+    每个任务入队时根据上传内容估算所需内存（Java 为 -Xmx 加 JVM 额外开销，
+    PHP 按源码体积估算），启动时把估算值记为预留；运行中按扫描进程树的实际 RSS
+    上调预留。只有当所有运行中任务的预留之和加上新任务的需求不超过内存预算、
+    且系统当前可用内存足够时才放行，否则任务继续留在队列中等待。
+    """
+
+    def __init__(self):
+        total = mem_total_mb() or 16384
+        self.budget_mb = int(os.environ.get('GCSCAN_MEM_LIMIT_MB', int(total * 0.8)))
+        self.java_min_heap_mb = int(os.environ.get('GCSCAN_JAVA_MIN_HEAP_MB', 2048))
+        self.java_max_heap_mb = int(os.environ.get('GCSCAN_JAVA_MAX_HEAP_MB', 8192))
+        self.php_max_mb = int(os.environ.get('GCSCAN_PHP_MAX_MB', 8192))
+
+    def estimate(self, lang, project_path):
+        """返回 (预留内存MB, Java 堆大小MB)，PHP 任务的堆大小为 None"""
+        if lang == 'Java':
+            class_count, total_bytes = count_java_classes(project_path)
+            # JDK 运行库本身就需要约 2G 堆，其余按类数量与字节码体积增长
+            heap = 2048 + class_count // 4 + total_bytes * 4 // MB
+            heap = max(self.java_min_heap_mb, min(heap, self.java_max_heap_mb))
+            # 元空间、代码缓存、线程栈等堆外开销
+            return heap + heap // 4 + 512, heap
+        else:
+            # phply AST 常驻内存，约为源码体积的数百倍
+            need = 256 + php_source_bytes(project_path) * 300 // MB
+            return min(need, self.php_max_mb), None
+
+    def admit(self, need_mb, reserved_mb, running_count):
+        """need_mb: 新任务的预留；reserved_mb: 运行中任务的预留之和"""
+        need_mb = need_mb or 0
+        # 单个任务超过预算时，只在没有其它扫描运行时放行，避免永远无法启动
+        if running_count == 0:
+            return True
+        if reserved_mb + need_mb > self.budget_mb:
+            return False
+        available = mem_available_mb()
+        if available is not None and need_mb > available:
+            return False
+        return True
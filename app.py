@@ -1,11 +1,12 @@
 from gevent import monkey
 monkey.patch_all()
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_from_directory, Response, stream_with_context
 from werkzeug.utils import secure_filename
 from utils import *
 from database import *
-import threading
+from scheduler import JobScheduler, process_start_time
+from decompiler import JdkSources, ClassDecompiler, PENDING
 import os
 import subprocess
 import json
@@ -13,7 +14,12 @@ import shutil
 import sys
 import sqlite3
 import re
+import time
 import requests
+from collections import OrderedDict
+from datetime import datetime, timezone
+from hashlib import md5
+from werkzeug.http import is_resource_modified
 from dotenv import load_dotenv
 
 # 以当前文件位置为根目录，避免相对路径问题
@@ -43,13 +49,12 @@ try:
 except Exception:
     pass
 
-def get_gc_php(gc_file, proj_root: str, file_hash: str):
-    """读取 PFortifier 的 pop_chains.json，并将绝对路径标准化为
-    以仓库为根的相对路径：/flask_app/uploads/php/<hash>/...
+def php_path_normalizer(proj_root: str, file_hash: str):
+    """返回将 PFortifier 结果中的绝对路径标准化为
+    以仓库为根的相对路径（/flask_app/uploads/php/<hash>/...）的函数
 
     proj_root 形如：ROOT_DIR/flask_app/uploads/php/<hash>
     """
-    gcs = []
     anchor = f"/flask_app/uploads/php/{file_hash}/"
     proj_root_norm = os.path.abspath(proj_root).replace('\\', '/').rstrip('/') + '/'
 
@@ -72,39 +77,76 @@ def get_gc_php(gc_file, proj_root: str, file_hash: str):
             return "/flask_app" + s[j:]
         return s
 
-    with open(gc_file, "r", encoding="utf-8") as f:
-        contents = f.readlines()
+    return norm_one_path
 
-    for content in contents:  # 一行一个 JSON
-        try:
-            temp = json.loads(content)
-        except Exception:
-            continue
+def php_gc_from_report(temp, norm_one_path):
+    """将 PFortifier 输出的一条链（pop_chains.json 中的一行）转换为结果中的链"""
+    gc = {}
+    gc_stack = temp.get('funcStack')
+    call_stack = temp.get('callStack')
 
-        gc = {}
-        gc_stack = temp.get('funcStack')
-        call_stack = temp.get('callStack')
-
-        gc["gc_stack"] = gc_stack
-
-        # 规范化文件定位堆栈：[[path, line], ...]
-        new_fp = []
-        if isinstance(call_stack, list):
-            for it in call_stack:
-                if isinstance(it, (list, tuple)) and len(it) >= 2:
-                    rp = norm_one_path(it[0])
-                    try:
-                        ln = int(it[1])
-                    except Exception:
-                        ln = it[1]
-                    new_fp.append([rp, ln])
-                else:
-                    new_fp.append(it)
-        gc["filepos_stack"] = new_fp
+    gc["gc_stack"] = gc_stack
+    gc["vuln_type"] = temp.get('vulType')
 
-        gcs.append(gc)
+    # 规范化文件定位堆栈：[[path, line], ...]
+    new_fp = []
+    if isinstance(call_stack, list):
+        for it in call_stack:
+            if isinstance(it, (list, tuple)) and len(it) >= 2:
+                rp = norm_one_path(it[0])
+                try:
+                    ln = int(it[1])
+                except Exception:
+                    ln = it[1]
+                new_fp.append([rp, ln])
+            else:
+                new_fp.append(it)
+    gc["filepos_stack"] = new_fp
+    return gc
 
-    return gcs
+class PhpChainIngestor:
+    """跟踪 PFortifier 追加写入的 pop_chains.json（一行一个 JSON），
+    将新增的完整行规范化后批量写入 chains 表，扫描中途即可查询，扫描进程崩溃时也保留已找到的链
+    """
+
+    def __init__(self, gc_file, file_hash):
+        self.gc_file = gc_file
+        self.file_hash = file_hash
+        # 将 callStack 里的路径规范为 /flask_app/uploads/php/<hash>/... 形式
+        self.norm_one_path = php_path_normalizer(os.path.join(PHP_DIR, file_hash), file_hash)
+        self.offset = 0  # 已读取到的文件位置
+        self.seq = 0  # 下一条链的序号
+        self.last_poll = 0
+
+    def poll(self, force=False):
+        """距上次读取超过 CHAIN_INGEST_INTERVAL 秒（或 force）时读取新增的行"""
+        if not force and time.time() - self.last_poll < CHAIN_INGEST_INTERVAL:
+            return
+        self.last_poll = time.time()
+        try:
+            f = open(self.gc_file, 'rb')
+        except FileNotFoundError:
+            # 未找到任何 POP 链时不会生成结果文件
+            return
+        with f:
+            f.seek(self.offset)
+            data = f.read()
+        # 只处理完整的行，写了一半的行留到下次读取
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return
+        self.offset += end
+
+        gcs = []
+        for content in data[:end].splitlines():
+            try:
+                temp = json.loads(content)
+            except Exception:
+                continue
+            gcs.append(php_gc_from_report(temp, self.norm_one_path))
+        if gcs:
+            db_insert_chains(self.file_hash, self.seq, gcs)
+            self.seq += len(gcs)
 
 # 显式提供 /favicon.ico，避免浏览器默认请求 404（Docker/Nginx 环境尤甚）
 @app.route('/favicon.ico')
@@ -115,62 +157,124 @@ def favicon():
     except Exception:
         return ('', 204)
 
-def gc_scan_php(target, hash, filename):
-    tool_dir = os.path.join(ROOT_DIR, "tools", "php", "PFortifier")
-    run_cmd = ["python", "Main.py"]
-    os.environ['PHP_PROG_ROOT'] = target
+# 扫描中途找到的 PHP 链写入数据库的最小间隔（秒）
+CHAIN_INGEST_INTERVAL = float(os.environ.get('GCSCAN_STREAM_INTERVAL', 3))
 
-    with subprocess.Popen(run_cmd, cwd=tool_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True) as proc:
+def gc_scan_php(target, hash, filename, on_start=None, on_progress=None):
+    tool_dir = os.path.join(ROOT_DIR, "tools", "php", "PFortifier")
+    # 目标目录与结果目录通过命令行传给每次扫描，互不干扰，可并发运行
+    out_dir = os.path.join(tool_dir, "result", hash)
+    run_cmd = ["python", "Main.py", "-root", target, "-out", out_dir]
+
+    # 扫描开始时输出 "[result] <结果文件>"，找到的链追加写入该文件，并输出 "[chain] <json>" 行；
+    # 收到新的链或进度时读取结果文件中新增的链写入数据库，扫描结束前即可在页面上查看
+    db_clear_chains(hash)
+    ingestor = None
+
+    # 扫描进程以新的会话启动，worker 意外退出后调度器可以结束整个进程组
+    with subprocess.Popen(run_cmd, cwd=tool_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                          start_new_session=True) as proc:
+        if on_start is not None:
+            on_start(proc.pid)
         for line in proc.stdout:
+            if line.startswith('[result] '):
+                ingestor = PhpChainIngestor(line[len('[result] '):].strip(), hash)
+            elif line.startswith('[progress] '):
+                # 扫描进度：阶段（parse/search）、已处理的文件/入口类数、已找到的链数
+                try:
+                    progress = json.loads(line[len('[progress] '):])
+                except Exception:
+                    progress = None
+                if progress is not None and on_progress is not None:
+                    on_progress(progress.get('phase'), progress.get('done'), progress.get('total'),
+                                progress.get('chains'))
+                if ingestor is not None:
+                    ingestor.poll()
+            elif line.startswith('[chain] ') and ingestor is not None:
+                ingestor.poll()
             print(line, end='')
             sys.stdout.flush()
-    
+
     if proc.returncode != 0:
         print(f"命令执行失败")
 
-    results_dir = os.path.join(tool_dir, 'result')
-    for result_dir in os.listdir(results_dir):
-        if hash in result_dir: # result
-            gc_file = os.path.join(results_dir, result_dir, "pop_chains.json")
-            # 将 callStack 里的路径规范为 /flask_app/uploads/php/<hash>/... 形式
-            gcs = get_gc_php(gc_file, proj_root=os.path.join(PHP_DIR, hash), file_hash=hash)
-    
-    # 数据库导入
-    if gcs is not None:
-        gcs_str = json.dumps(gcs)
-        db_finish_analyze(hash, gcs_str)
-        print(f"{filename} finished analysis")
+    if ingestor is None:
+        raise RuntimeError(f"{filename} 未生成分析结果")
+    # 扫描进程异常退出时，已写入 chains 表的链仍然保留（可在页面上查看），但项目记为失败
+    ingestor.poll(force=True)
+    build_chain_graphs(hash, 'PHP')
+    if proc.returncode != 0:
+        raise RuntimeError(f"{filename} 扫描异常退出（{proc.returncode}），已保留找到的 {ingestor.seq} 条链")
+
+    db_finish_analyze(hash)
+    print(f"{filename} finished analysis")
 
-def gc_scan_java(target, hash, file_name):
+def gc_scan_java(target, hash, file_name, heap_mb=None, on_start=None, on_progress=None):
     print(target)
+    # 只建立 jar 中类的索引，源码在扫描结束后（链中用到的类）或审计时按需反编译
+    index_project_jars(hash, target)
+    if on_progress is not None:
+        on_progress('search')
     tool_dir = os.path.join(ROOT_DIR, "tools", "java")
-    new_config = os.path.join(tool_dir, "java-benchmarks/JDV/target.yml")
-    generate_yaml(os.path.join(tool_dir, "java-benchmarks/JDV/base.yml"), target, new_config)
-    run_cmd = ["java", "-Xss512m", "-Xmx8G", "-jar", "flash.jar", "--options-file", "java-benchmarks/JDV/target.yml"]
-
-    with subprocess.Popen(run_cmd, cwd=tool_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True) as proc:
-        for line in proc.stdout:
-            print(line, end='')
-            sys.stdout.flush()
-
-    os.remove(new_config)
-
-    if proc.returncode != 0:
-        print(f"命令执行失败")
+    # 每个任务使用独立的配置文件和输出目录，Java 扫描可以并发运行
+    job_dir = os.path.join(tool_dir, "jobs", hash)
+    shutil.rmtree(job_dir, ignore_errors=True)
+    os.makedirs(job_dir)
+    new_config = os.path.join(job_dir, "target.yml")
+    gc_file = generate_yaml(os.path.join(tool_dir, "java-benchmarks/JDV/base.yml"), target, new_config,
+                            out_dir=os.path.join(job_dir, "output"))
+    # 堆大小由调度器按上传规模估算，未指定时沿用 8G
+    xmx = f"-Xmx{heap_mb}m" if heap_mb else "-Xmx8G"
+    run_cmd = ["java", "-Xss512m", xmx, "-jar", "flash.jar", "--options-file", new_config]
 
-    gc_file = os.path.join(tool_dir, "output", "chains.json")
-    with open(gc_file, "r") as f:
-        gcs = json.load(f)
+    try:
+        with subprocess.Popen(run_cmd, cwd=tool_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                              start_new_session=True) as proc:
+            if on_start is not None:
+                on_start(proc.pid)
+            for line in proc.stdout:
+                print(line, end='')
+                sys.stdout.flush()
+
+        if proc.returncode != 0:
+            print(f"命令执行失败")
+
+        if not os.path.exists(gc_file):
+            raise RuntimeError(f"{file_name} 未生成分析结果")
+        with open(gc_file, "r") as f:
+            gcs = json.load(f)
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
 
-    gcs_str = json.dumps(gcs)
-    db_finish_analyze(hash, gcs_str)
+    # 数据库导入
+    db_clear_chains(hash)
+    db_insert_chains(hash, 0, chain_list(gcs))
+    # 预先反编译链中用到的类，在线审计时直接读取缓存
+    if on_progress is not None:
+        on_progress('decompile')
+    predecompile_chain_classes(hash, target, chain_list(gcs), on_progress=on_progress)
+    build_chain_graphs(hash, 'Java')
+    db_finish_analyze(hash)
     print(f"{file_name} finished analysis")
 
-def gc_scan(project_path, lang, hash, file_name):
+def gc_scan(project_path, lang, hash, file_name, heap_mb=None, on_start=None, on_progress=None):
     if lang == "PHP":
-        gc_scan_php(project_path, hash, file_name)
+        gc_scan_php(project_path, hash, file_name, on_start=on_start, on_progress=on_progress)
     elif lang == "Java":
-        gc_scan_java(project_path, hash, file_name)
+        gc_scan_java(project_path, hash, file_name, heap_mb=heap_mb, on_start=on_start, on_progress=on_progress)
+
+def run_job(job):
+    # 记录扫描子进程 pid（及启动时间），调度器据此统计实际内存占用，并在 worker 意外退出后结束遗留的扫描
+    def on_start(pid):
+        db_set_job_pid(job['id'], pid, process_start_time(pid))
+    # 记录扫描进度，供 /api/progress/stream 推送
+    def on_progress(phase, done=None, total=None, chains=None):
+        db_update_job_progress(job['id'], phase, done, total, chains)
+    gc_scan(job['project_path'], job['language'], job['file_hash'], job['filename'],
+            heap_mb=job.get('heap_mb'), on_start=on_start, on_progress=on_progress)
+
+# 分析任务调度器：gunicorn 下由 gunicorn_conf.post_fork 在每个 worker 中启动
+scheduler = JobScheduler(run_job)
 
 def _short_from_label_generic(label: str):
     if not label:
@@ -194,6 +298,51 @@ def _short_from_label_generic(label: str):
     m = re.search(r"([A-Za-z_$][A-Za-z0-9_$<>]*)\s*(?:\(|$)", s)
     return m.group(1) if m else s
 
+# 进度推送时检查任务状态的间隔（秒）
+PROGRESS_POLL_INTERVAL = float(os.environ.get('GCSCAN_PROGRESS_INTERVAL', 2))
+
+def job_progress(file_hash):
+    """任务的状态与进度，elapsed 为已运行（或总共运行）的秒数"""
+    progress = db_job_progress(file_hash)
+    if progress is None:
+        return None
+    started = progress['started_at']
+    if started is None:
+        elapsed = 0
+    elif progress['status'] == 'running' or progress['finished_at'] is None:
+        elapsed = time.time() - started
+    else:
+        elapsed = progress['finished_at'] - started
+    return {
+        'status': progress['status'],
+        'phase': progress['phase'],
+        'done': progress['progress_done'],
+        'total': progress['progress_total'],
+        'chains': progress['chains_found'] or 0,
+        'elapsed': round(elapsed),
+    }
+
+@app.route('/api/progress/stream')
+def progress_stream():
+    """以 Server-Sent Events 推送任务进度，任务结束（或不存在）后关闭连接"""
+    file_hash = request.args.get('hash')
+    if not file_hash:
+        return jsonify({'error': 'missing hash'}), 400
+
+    def events():
+        while True:
+            progress = job_progress(file_hash)
+            if progress is None:
+                yield "event: missing\ndata: {}\n\n"
+                return
+            yield f"data: {json.dumps(progress)}\n\n"
+            if progress['status'] not in ('queued', 'running'):
+                return
+            time.sleep(PROGRESS_POLL_INTERVAL)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route("/about")
 def about():
     return render_template('about.html')
@@ -207,45 +356,21 @@ def project_view():
     try:
         conn = get_connect(); conn.row_factory = sqlite3.Row
         cur = conn.cursor()
-        cur.execute("SELECT filename, language, analysis_result FROM results WHERE file_hash = ?", (file_hash,))
+        cur.execute("SELECT filename, language, status FROM results WHERE file_hash = ?", (file_hash,))
         row = cur.fetchone(); cur.close(); conn.close()
         if not row:
             flash('未找到该项目记录','error')
             return redirect(url_for('analyze'))
         filename = row['filename']; language = row['language']
         name = os.path.splitext(filename)[0]
-        data = json.loads(row['analysis_result']) if row['analysis_result'] else None
-        raw_list = data if isinstance(data, list) else (data.get('chains') if isinstance(data, dict) else [])
-        chains = []
-        if isinstance(raw_list, list):
-            for idx, ch in enumerate(raw_list):
-                entry = ''; sink = ''; length = 0
-                if isinstance(ch, dict):
-                    stack = ch.get('gc_stack') or ch.get('funcStack') or ch.get('path')
-                    if isinstance(stack, list) and stack:
-                        # 展示完整标签，不再取短名
-                        entry = str(stack[0])
-                        sink = str(stack[-1])
-                        length = len(stack)
-                    elif isinstance(ch.get('nodes'), list):
-                        nodes = ch['nodes']
-                        if nodes:
-                            first_label = nodes[0].get('label') or (nodes[0].get('name') if isinstance(nodes[0], dict) else str(nodes[0]))
-                            last_label = nodes[-1].get('label') or (nodes[-1].get('name') if isinstance(nodes[-1], dict) else str(nodes[-1]))
-                            entry = first_label
-                            sink = last_label
-                            length = len(nodes)
-                elif isinstance(ch, list) and ch:
-                    entry = str(ch[0])
-                    sink = str(ch[-1])
-                    length = len(ch)
-                chains.append({
-                    'index': idx,
-                    'entry': entry,
-                    'sink': sink,
-                    'length': length,
-                })
-        meta = { 'file_hash': file_hash, 'name': name, 'language': language, 'filename': filename }
+        # 展示完整标签，不再取短名；只读取链的概要列，不加载链的完整数据
+        chains = [{
+            'index': ch['seq'],
+            'entry': ch['entry'] or '',
+            'sink': ch['sink'] or '',
+            'length': ch['length'] or 0,
+        } for ch in db_list_chains(file_hash)[0]]
+        meta = { 'file_hash': file_hash, 'name': name, 'language': language, 'filename': filename, 'status': row['status'] }
         return render_template('project.html', meta=meta, chains=chains)
     except Exception as e:
         print('project_view error:', e)
@@ -260,201 +385,267 @@ def index():
 def index_html():
     return render_template('index.html')
 
-@app.route('/result')
-def result():
-    # 结果页面仅从数据库读取调用链数据
-    def parse_php_gc_stacks(gc_list):
-        """将 PHP 分析结果中的 gc_stack 列表转换为 chains 结构。
-        gc_list: 形如 [ {"gc_stack": ["Class#method", ...]}, ... ]
-        """
-        chains = []
-        if not isinstance(gc_list, list):
-            return chains
-        for idx, item in enumerate(gc_list, start=1):
-            stack = item.get('gc_stack') if isinstance(item, dict) else None
-            if not stack or not isinstance(stack, list):
-                continue
-            nodes = []
-            edges = []
-            prev_id = None
-            for i, frame in enumerate(stack):
-                label = str(frame)
-                # 取短方法名
-                short = None
-                if '#' in label:
-                    short = label.split('#', 1)[1]
-                elif '::' in label:
-                    short = label.split('::', 1)[1]
-                else:
-                    m = re.search(r"([A-Za-z_][A-Za-z0-9_]*)\s*$", label)
-                    short = m.group(1) if m else label
-                ntype = 'entry' if i == 0 else ('sink' if i == len(stack) - 1 else 'gadget')
-                nid = f"n{i}"
-                nodes.append({'id': nid, 'label': label, 'short': short, 'type': ntype})
-                if prev_id is not None:
-                    edges.append({'from': prev_id, 'to': nid, 'label': ''})
-                prev_id = nid
-            entry = nodes[0]['short'] if nodes else f'chain-{idx}'
-            chains.append({'id': f'c{idx}', 'entry': entry, 'nodes': nodes, 'edges': edges})
+# ===== 结果页面 =====
+def parse_php_gc_stacks(gc_list):
+    """将 PHP 分析结果中的 gc_stack 列表转换为 chains 结构。
+    gc_list: 形如 [ {"gc_stack": ["Class#method", ...]}, ... ]
+    """
+    chains = []
+    if not isinstance(gc_list, list):
         return chains
-
-    def parse_java_gc(data):
-        """容错解析 Java 分析结果，输出与前端一致的 chains 结构。"""
-        def short_from_label(label: str):
-            if label.startswith('<') and ':' in label and '(' in label and '>' in label:
-                try:
-                    inner = label[1:label.rfind('>')]
-                    part = inner.split(':', 1)[1]
-                    before_paren = part.split('(', 1)[0]
-                    tokens = before_paren.strip().split()
-                    if tokens:
-                        return tokens[-1]
-                except Exception:
-                    pass
+    for idx, item in enumerate(gc_list, start=1):
+        stack = item.get('gc_stack') if isinstance(item, dict) else None
+        if not stack or not isinstance(stack, list):
+            continue
+        nodes = []
+        edges = []
+        prev_id = None
+        for i, frame in enumerate(stack):
+            label = str(frame)
+            # 取短方法名
+            short = None
             if '#' in label:
-                return label.split('#', 1)[1]
-            if '::' in label:
-                return label.split('::', 1)[1]
-            m = re.search(r"([A-Za-z_$][A-Za-z0-9_$<>]*)\s*(?:\(|$)", label)
-            return m.group(1) if m else label
-
-        def make_chain_from_labels(labels, idx_base):
-            nodes, edges = [], []
-            prev = None
-            for i, lab in enumerate(labels):
-                label = str(lab)
-                short = short_from_label(label)
-                ntype = 'entry' if i == 0 else ('sink' if i == len(labels) - 1 else 'gadget')
-                nid = f"n{idx_base}_{i}"
-                nodes.append({'id': nid, 'label': label, 'short': short, 'type': ntype})
-                if prev is not None:
-                    edges.append({'from': prev, 'to': nid, 'label': ''})
-                prev = nid
-            entry = nodes[0]['short'] if nodes else f'chain-{idx_base}'
-            return {'id': f'c{idx_base}', 'entry': entry, 'nodes': nodes, 'edges': edges}
-
-        chains = []
-        if data is None:
-            return chains
-        try:
-            if isinstance(data, dict) and isinstance(data.get('chains'), list):
-                raw = data['chains']
+                short = label.split('#', 1)[1]
+            elif '::' in label:
+                short = label.split('::', 1)[1]
             else:
-                raw = data if isinstance(data, list) else []
-
-            for idx, ch in enumerate(raw, start=1):
-                if isinstance(ch, dict) and isinstance(ch.get('nodes'), list):
-                    norm_nodes = []
-                    for i, n in enumerate(ch['nodes']):
-                        label = n.get('label') or n.get('name') if isinstance(n, dict) else str(n)
-                        label = label or ''
-                        short = short_from_label(label)
-                        ntype = 'entry' if i == 0 else ('sink' if i == len(ch['nodes']) - 1 else 'gadget')
-                        nid = n.get('id') if isinstance(n, dict) and n.get('id') else f"n{idx}_{i}"
-                        norm_nodes.append({'id': nid, 'label': label, 'short': short, 'type': ntype})
-                    norm_edges = []
-                    if isinstance(ch.get('edges'), list) and ch['edges']:
-                        for e in ch['edges']:
-                            if isinstance(e, dict) and e.get('from') and e.get('to'):
-                                norm_edges.append({'from': e['from'], 'to': e['to'], 'label': e.get('label', '')})
-                    else:
-                        for i in range(1, len(norm_nodes)):
-                            norm_edges.append({'from': norm_nodes[i-1]['id'], 'to': norm_nodes[i]['id'], 'label': ''})
-                    entry = norm_nodes[0]['short'] if norm_nodes else f'chain-{idx}'
-                    chains.append({'id': f'c{idx}', 'entry': entry, 'nodes': norm_nodes, 'edges': norm_edges})
-                elif isinstance(ch, dict) and isinstance(ch.get('path'), list):
-                    chains.append(make_chain_from_labels(ch['path'], idx))
-                elif isinstance(ch, dict) and isinstance(ch.get('funcStack'), list):
-                    chains.append(make_chain_from_labels(ch['funcStack'], idx))
-                elif isinstance(ch, dict) and isinstance(ch.get('gc_stack'), list):
-                    chains.append(make_chain_from_labels(ch['gc_stack'], idx))
-                elif isinstance(ch, list):
-                    chains.append(make_chain_from_labels(ch, idx))
-                else:
-                    continue
-        except Exception as e:
-            print('parse_java_gc error:', e)
-        return chains
-
-    def safe_json_loads(s: str):
-        if s is None:
-            return None
-        if isinstance(s, (list, dict)):
-            return s
-        if not isinstance(s, str):
-            s = str(s)
-        try:
-            return json.loads(s)
-        except Exception:
-            pass
-        # 兼容形如："23\t<hash>\t<file>\tJava\t[ ... ]" 的行，只提取最后的 JSON 片段
-        try:
-            lbr = min([i for i in [s.find('['), s.find('{')] if i != -1]) if ('[' in s or '{' in s) else -1
-        except Exception:
-            lbr = -1
-        if lbr != -1:
-            candidate = s[lbr:].strip().rstrip(';')
+                m = re.search(r"([A-Za-z_][A-Za-z0-9_]*)\s*$", label)
+                short = m.group(1) if m else label
+            ntype = 'entry' if i == 0 else ('sink' if i == len(stack) - 1 else 'gadget')
+            nid = f"n{i}"
+            nodes.append({'id': nid, 'label': label, 'short': short, 'type': ntype})
+            if prev_id is not None:
+                edges.append({'from': prev_id, 'to': nid, 'label': ''})
+            prev_id = nid
+        entry = nodes[0]['short'] if nodes else f'chain-{idx}'
+        chains.append({'id': f'c{idx}', 'entry': entry, 'nodes': nodes, 'edges': edges})
+    return chains
+
+def parse_java_gc(data):
+    """容错解析 Java 分析结果，输出与前端一致的 chains 结构。"""
+    def short_from_label(label: str):
+        if label.startswith('<') and ':' in label and '(' in label and '>' in label:
             try:
-                return json.loads(candidate)
+                inner = label[1:label.rfind('>')]
+                part = inner.split(':', 1)[1]
+                before_paren = part.split('(', 1)[0]
+                tokens = before_paren.strip().split()
+                if tokens:
+                    return tokens[-1]
             except Exception:
-                try:
-                    fixed = candidate.replace('""', '"')
-                    return json.loads(fixed)
-                except Exception:
-                    return None
-        return None
+                pass
+        if '#' in label:
+            return label.split('#', 1)[1]
+        if '::' in label:
+            return label.split('::', 1)[1]
+        m = re.search(r"([A-Za-z_$][A-Za-z0-9_$<>]*)\s*(?:\(|$)", label)
+        return m.group(1) if m else label
+
+    def make_chain_from_labels(labels, idx_base):
+        nodes, edges = [], []
+        prev = None
+        for i, lab in enumerate(labels):
+            label = str(lab)
+            short = short_from_label(label)
+            ntype = 'entry' if i == 0 else ('sink' if i == len(labels) - 1 else 'gadget')
+            nid = f"n{idx_base}_{i}"
+            nodes.append({'id': nid, 'label': label, 'short': short, 'type': ntype})
+            if prev is not None:
+                edges.append({'from': prev, 'to': nid, 'label': ''})
+            prev = nid
+        entry = nodes[0]['short'] if nodes else f'chain-{idx_base}'
+        return {'id': f'c{idx_base}', 'entry': entry, 'nodes': nodes, 'edges': edges}
+
+    chains = []
+    if data is None:
+        return chains
+    try:
+        if isinstance(data, dict) and isinstance(data.get('chains'), list):
+            raw = data['chains']
+        else:
+            raw = data if isinstance(data, list) else []
+
+        for idx, ch in enumerate(raw, start=1):
+            if isinstance(ch, dict) and isinstance(ch.get('nodes'), list):
+                norm_nodes = []
+                for i, n in enumerate(ch['nodes']):
+                    label = n.get('label') or n.get('name') if isinstance(n, dict) else str(n)
+                    label = label or ''
+                    short = short_from_label(label)
+                    ntype = 'entry' if i == 0 else ('sink' if i == len(ch['nodes']) - 1 else 'gadget')
+                    nid = n.get('id') if isinstance(n, dict) and n.get('id') else f"n{idx}_{i}"
+                    norm_nodes.append({'id': nid, 'label': label, 'short': short, 'type': ntype})
+                norm_edges = []
+                if isinstance(ch.get('edges'), list) and ch['edges']:
+                    for e in ch['edges']:
+                        if isinstance(e, dict) and e.get('from') and e.get('to'):
+                            norm_edges.append({'from': e['from'], 'to': e['to'], 'label': e.get('label', '')})
+                else:
+                    for i in range(1, len(norm_nodes)):
+                        norm_edges.append({'from': norm_nodes[i-1]['id'], 'to': norm_nodes[i]['id'], 'label': ''})
+                entry = norm_nodes[0]['short'] if norm_nodes else f'chain-{idx}'
+                chains.append({'id': f'c{idx}', 'entry': entry, 'nodes': norm_nodes, 'edges': norm_edges})
+            elif isinstance(ch, dict) and isinstance(ch.get('path'), list):
+                chains.append(make_chain_from_labels(ch['path'], idx))
+            elif isinstance(ch, dict) and isinstance(ch.get('funcStack'), list):
+                chains.append(make_chain_from_labels(ch['funcStack'], idx))
+            elif isinstance(ch, dict) and isinstance(ch.get('gc_stack'), list):
+                chains.append(make_chain_from_labels(ch['gc_stack'], idx))
+            elif isinstance(ch, list):
+                chains.append(make_chain_from_labels(ch, idx))
+            else:
+                continue
+    except Exception as e:
+        print('parse_java_gc error:', e)
+    return chains
+
+def chain_graph(language, seq, ch):
+    """将项目中序号为 seq 的一条链转换为前端图谱结构 {id, seq, entry, nodes, edges}"""
+    graphs = parse_php_gc_stacks([ch]) if language == 'PHP' else parse_java_gc([ch])
+    graph = graphs[0] if graphs else {'entry': f'chain-{seq + 1}', 'nodes': [], 'edges': []}
+    graph['id'] = f'c{seq + 1}'
+    graph['seq'] = seq
+    return graph
+
+def build_chain_graphs(file_hash, language):
+    """扫描结束时为项目中还没有图谱的链生成图谱 JSON 并保存，之后的请求直接返回保存的结果"""
+    graphs = [(seq, json.dumps(chain_graph(language, seq, json.loads(data))))
+              for seq, data in db_chains_without_graph(file_hash)]
+    if graphs:
+        db_set_chain_graphs(file_hash, graphs)
+
+class GraphCache:
+    """链图谱 JSON 的进程内 LRU 缓存
+    键中包含项目的版本（results.updated_at），项目重新扫描后旧的缓存项不会再被命中，按 LRU 淘汰
+    """
 
-    def safe_json_loads(s: str):
-        if s is None:
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+
+    def get(self, key):
+        graph = self.items.get(key)
+        if graph is not None:
+            self.items.move_to_end(key)
+        return graph
+
+    def put(self, key, graph):
+        self.items[key] = graph
+        self.items.move_to_end(key)
+        while len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+# 进程内缓存的链图谱条数
+GRAPH_CACHE_SIZE = int(os.environ.get('GCSCAN_GRAPH_CACHE_SIZE', 1024))
+graph_cache = GraphCache(GRAPH_CACHE_SIZE)
+
+def load_chain_graph(project, seq):
+    """返回链的图谱 JSON（字符串），链不存在时返回 None
+    依次查找进程内缓存、chains.graph；都没有时（迁移的旧数据、扫描中的链）现场生成并保存
+    """
+    file_hash = project['file_hash']
+    key = (file_hash, seq, project['updated_at'])
+    graph = graph_cache.get(key)
+    if graph is not None:
+        return graph
+    row = db_get_chain_graph(file_hash, seq)
+    if row is None:
+        return None
+    data, graph = row
+    if graph is None:
+        graph = json.dumps(chain_graph(project['language'], seq, json.loads(data)))
+        db_set_chain_graphs(file_hash, [(seq, graph)])
+    graph_cache.put(key, graph)
+    return graph
+
+def conditional_json(project, tag, make_body):
+    """项目链数据的 JSON 响应，ETag 与 Last-Modified 取自项目版本（results.updated_at）与 tag，
+    客户端缓存仍然有效时直接返回 304，不生成响应内容；make_body 返回 None 时返回 None
+    """
+    version = project['updated_at'] or 0
+    etag = f"{project['file_hash']}-{version!r}-{tag}"
+    last_modified = datetime.fromtimestamp(int(version), timezone.utc) if version else None
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        body = make_body()
+        if body is None:
             return None
-        try:
-            return json.loads(s)
-        except Exception:
-            try:
-                fixed = s.replace('""', '"')
-                return json.loads(fixed)
-            except Exception:
-                return None
+        resp = Response(body, mimetype='application/json')
+    else:
+        resp = Response(status=304)
+    resp.set_etag(etag)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    # 扫描中的项目仍会变化，浏览器每次使用缓存前都需要验证
+    resp.cache_control.no_cache = True
+    return resp
+
+# 分页接口每页的默认与最大条数
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 200
+
+def page_args(default_size=API_PAGE_SIZE):
+    """从请求参数中读取 page（从 1 开始）与 per_page，返回 (page, per_page, offset)"""
+    page = max(1, request.args.get('page', type=int, default=1))
+    per_page = request.args.get('per_page', type=int, default=default_size)
+    per_page = max(1, min(per_page, API_MAX_PAGE_SIZE))
+    return page, per_page, (page - 1) * per_page
 
-    def load_projects_from_db():
-        projects = []
-        try:
-            conn = get_connect()
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            cur.execute("SELECT file_hash, filename, language, analysis_result, status FROM results WHERE analysis_result IS NOT NULL")
-            rows = cur.fetchall()
+@app.route('/result')
+def result():
+    # 项目列表与调用链图谱由前端通过 /api/projects 分页加载
+    return render_template('result.html')
+
+@app.route('/api/projects')
+def api_projects():
+    """分页返回已分析的项目，可按 language、entry、sink（子串）筛选，并附带按语言的统计"""
+    page, per_page, offset = page_args()
+    language = request.args.get('language') or None
+    entry = request.args.get('entry', '').strip() or None
+    sink = request.args.get('sink', '').strip() or None
+    rows, total = db_list_projects(language=language, entry=entry, sink=sink, offset=offset, limit=per_page)
+    items = [{
+        'file_hash': row['file_hash'],
+        'name': os.path.splitext(row['filename'])[0],
+        'language': row['language'],
+        'status': row['status'],
+        'chain_count': row['chain_count'] or 0,
+    } for row in rows]
+    return jsonify({'page': page, 'per_page': per_page, 'total': total, 'items': items,
+                    'stats': db_project_stats()})
+
+@app.route('/api/projects/<file_hash>/chains')
+def api_project_chains(file_hash):
+    """分页返回项目中的链概要，可按 entry、sink（子串）与 vuln_type 筛选；graph=1 时附带每条链的图谱"""
+    project = is_analyzed(file_hash)
+    if project is None:
+        return jsonify({'error': 'project not found'}), 404
+    page, per_page, offset = page_args()
+    with_graph = request.args.get('graph') == '1'
+
+    def make_body():
+        rows, total = db_list_chains(file_hash,
+                                     entry=request.args.get('entry', '').strip() or None,
+                                     sink=request.args.get('sink', '').strip() or None,
+                                     vuln_type=request.args.get('vuln_type') or None,
+                                     offset=offset, limit=per_page, with_graph=with_graph)
+        if with_graph:
             for row in rows:
-                filename = row['filename']
-                language = row['language']
-                analysis_result = row['analysis_result']
-                name = os.path.splitext(filename)[0]
-                file_hash = row['file_hash']
-
-                chains = []
-                data = safe_json_loads(analysis_result)
-                if language == 'PHP' and data:
-                    chains = parse_php_gc_stacks(data)
-                elif language == 'Java' and data is not None:
-                    chains = parse_java_gc(data)
-                # 始终加入项目，便于右侧统计与审计按钮可用
-                projects.append({
-                    'id': f"{language.lower()}-{name}",
-                    'name': name,
-                    'language': language,
-                    'chains': chains or [],
-                    'file_hash': file_hash,
-                })
-            cur.close()
-            conn.close()
-        except Exception as e:
-            # 打印错误但不阻断页面
-            print('load_projects_from_db error:', e)
-        return projects
-
-    projects = load_projects_from_db()
-    # 如果没有解析到任何项目，传 None 以启用前端示例数据
-    return render_template('result.html', projects=(projects if projects else None))
+                graph = row['graph'] or load_chain_graph(project, row['seq'])
+                row['graph'] = json.loads(graph) if graph else None
+        return json.dumps({'page': page, 'per_page': per_page, 'total': total, 'items': rows})
+
+    return conditional_json(project, md5(request.query_string).hexdigest(), make_body)
+
+@app.route('/api/projects/<file_hash>/chains/<int:seq>')
+def api_project_chain(file_hash, seq):
+    """返回项目中序号为 seq 的链的图谱（扫描结束时生成并保存的 JSON）"""
+    project = is_analyzed(file_hash)
+    if project is None:
+        return jsonify({'error': 'project not found'}), 404
+    resp = conditional_json(project, seq, lambda: load_chain_graph(project, seq))
+    if resp is None:
+        return jsonify({'error': 'chain not found'}), 404
+    return resp
 
 # ===== 在线审计支持 =====
 def _safe_rel_join(root, given_path):
@@ -472,64 +663,160 @@ def _safe_rel_join(root, given_path):
         return None
     return cand_abs
 
-def _resolve_audit_Java_file(proj_root, raw_path, file_hash):
-    def norm(p: str) -> str:
-        return str(p).replace('\\', '/').rstrip('/')
 
-    ret = None
-    decompile_dir = os.path.join(proj_root, "decompiled")
+def index_java_sources(scope, decompile_dir):
+    """为反编译目录建立类名索引并保存在数据库中（重启后仍可使用），scope 为项目 hash 或 'jdk'"""
+    classes = java_class_files(decompile_dir) if os.path.isdir(decompile_dir) else []
+    db_replace_class_index(scope, decompile_dir, classes)
+    print(f"indexed {len(classes)} classes under {decompile_dir}")
 
-    # Normalize incoming path and drop inner-class suffix like Foo$1.java
-    raw_norm = norm(raw_path).split('$', 1)[0]
+def find_java_source(scope, decompile_dir, class_name):
+    """按类名（如 org/apache/Foo）在反编译目录中查找源码，返回绝对路径；尚未建立索引时先建立索引"""
+    if db_class_index_root(scope) != decompile_dir:
+        index_java_sources(scope, decompile_dir)
+    found = db_find_class_file(scope, class_name)
+    if found is None:
+        return None
+    path = os.path.join(decompile_dir, found[1])
+    return path if os.path.isfile(path) else None
 
-    # Look up inside project decompiled folder first
-    for root, dirs, files in os.walk(decompile_dir):
-        for file in files:
-            if not file.endswith(".java"):
-                continue
-            full = os.path.join(root, file)
-            if raw_norm in norm(full) and raw_norm.split("/")[-1] == file.rstrip(".java"):
-                ret = full
-                break
-        if ret:
-            break
+def index_project_jars(file_hash, proj_root):
+    """为项目中各 jar 包含的类建立索引（只读取 jar 的目录，不反编译），scope 为 'jar:<项目 hash>'
+    同时计算各 jar 的 md5 并保存在索引中，作为按需反编译的缓存 key（在扫描任务中计算，请求中不再读取整个 jar）
+    """
+    classes = jar_class_entries(proj_root) if os.path.isdir(proj_root) else []
+    digests = {}
+    for rel in dict.fromkeys(path for _, _, path in classes):
+        with open(os.path.join(proj_root, rel), 'rb') as f:
+            digests[rel] = get_file_hash(f)
+    db_replace_class_index(f'jar:{file_hash}', proj_root, classes, digests)
+    print(f"indexed {len(classes)} classes in {len(digests)} jars under {proj_root}")
+
+# 按需反编译的项目类，按 jar 的 md5 与类名缓存，不同项目中相同的 jar 共用
+class_decompiler = ClassDecompiler(
+    os.path.join(ROOT_DIR, "tools", "java_decompile", "classes"),
+    os.path.join(ROOT_DIR, "tools", "java_decompile", "bin"),
+)
+
+def project_class_job(file_hash, proj_root, class_name):
+    """查找项目中包含该类的 jar，返回 (jar 路径, 完整类名, 缓存 key)，找不到时返回 None"""
+    scope = f'jar:{file_hash}'
+    if db_class_index_root(scope) != proj_root:
+        index_project_jars(file_hash, proj_root)
+    found = db_find_class_file(scope, class_name)
+    if found is not None and found[2] is None:
+        # 旧版本建立的索引中没有 jar 的 md5，重建一次
+        index_project_jars(file_hash, proj_root)
+        found = db_find_class_file(scope, class_name)
+    if found is None:
+        return None
+    name, rel, digest = found
+    jar_path = os.path.join(proj_root, rel)
+    if not os.path.isfile(jar_path):
+        return None
+    return jar_path, name, digest
 
-    if ret is None:
-        jdk_dir = os.path.join(ROOT_DIR, "tools", "java_decompile", "jdk")
-        if not os.path.exists(jdk_dir):
-            os.makedirs(jdk_dir, exist_ok=True)
+def project_class_source(file_hash, proj_root, class_name):
+    """项目 jar 中类的源码路径，找不到时返回 None；尚未反编译时在后台反编译并返回 PENDING，
+    请求中不运行 jadx（链中用到的类在扫描结束时已预先反编译）"""
+    job = project_class_job(file_hash, proj_root, class_name)
+    return class_decompiler.request(*job) if job else None
+
+def java_class_name(raw):
+    """将调用链中的类路径（org/apache/Foo、org.apache.Foo$1、.../Foo.java）规范为 org/apache/Foo"""
+    # Normalize incoming path and drop inner-class suffix like Foo$1.java
+    class_name = str(raw).replace('\\', '/').split('$', 1)[0].strip('/')
+    if class_name.endswith('.java'):
+        class_name = class_name[:-len('.java')]
+    if '/' not in class_name:
+        class_name = class_name.replace('.', '/')
+    return class_name
+
+def java_label_class(label):
+    """方法签名所属的类：<org.Foo: void bar()>、org.Foo#bar、org.Foo.bar(...)"""
+    label = str(label).strip()
+    if label.startswith('<') and ':' in label:
+        return label[1:].split(':', 1)[0].strip()
+    if '#' in label:
+        return label.split('#', 1)[0]
+    return label.split('(', 1)[0].rsplit('.', 1)[0]
+
+def java_chain_classes(ch):
+    """调用链涉及的类：filepos_stack 中的路径与各步骤方法签名所属的类"""
+    names = []
+    if isinstance(ch, dict) and isinstance(ch.get('filepos_stack'), list):
+        for it in ch['filepos_stack']:
+            if isinstance(it, (list, tuple)) and it and it[0]:
+                names.append(java_class_name(it[0]))
+    for label in chain_labels(ch):
+        names.append(java_class_name(java_label_class(label)))
+    return [name for name in names if name]
+
+def predecompile_chain_classes(file_hash, proj_root, gcs, on_progress=None):
+    """并行反编译找到的链中用到的项目类；完整的 JDK 源码尚未就绪时，链中用到的 JDK 类也单独反编译"""
+    jobs = {}
+    for ch in gcs:
+        for name in java_chain_classes(ch):
+            if name not in jobs:
+                jobs[name] = project_class_job(file_hash, proj_root, name)
+    items = list(dict.fromkeys(job for job in jobs.values() if job))
+    jdk_items = []
+    if not jdk_sources.ready():
+        jdk_items = [(jdk_sources.jar_path, name, '') for name, job in jobs.items()
+                     if job is None and name.startswith(JDK_PACKAGES)]
+    total = len(items) + len(jdk_items)
+    def on_done(offset):
+        if on_progress is None:
+            return None
+        return lambda done, _: on_progress('decompile', offset + done, total)
+    class_decompiler.source_many(items, on_done=on_done(0))
+    jdk_sources.classes.source_many(jdk_items, on_done=on_done(len(items)))
+    print(f"decompiled {total} classes used by chains")
+
+# JDK（rt.jar）的反编译源码，所有项目共用
+jdk_sources = JdkSources(
+    os.path.join(ROOT_DIR, "tools", "java_decompile"),
+    os.path.join(ROOT_DIR, "tools", "java", "java-benchmarks", "JREs", "jre1.8", "rt.jar"),
+    os.path.join(ROOT_DIR, "tools", "java_decompile", "bin"),
+    on_ready=lambda jdk_dir: index_java_sources('jdk', jdk_dir),
+)
+# rt.jar 中的包，其它类不会在 JDK 中查找
+JDK_PACKAGES = ('java/', 'javax/', 'sun/', 'com/sun/', 'jdk/', 'org/omg/', 'org/w3c/', 'org/xml/', 'org/ietf/', 'org/jcp/')
+
+def java_source_display(abs_path):
+    """反编译缓存中的源码在审计页面上显示为类路径（如 org/apache/Foo.java）"""
+    path = os.path.abspath(abs_path)
+    # <缓存目录>/<jar md5>/<类路径>、<JDK 类缓存>/<类路径>、<JDK 目录>/sources/<类路径>
+    for base, skip in ((class_decompiler.cache_dir, 1), (jdk_sources.class_dir, 0),
+                       (os.path.join(jdk_sources.jdk_dir, 'sources'), 0)):
+        if path.startswith(os.path.join(base, '')):
+            rel = os.path.relpath(path, base).replace('\\', '/')
+            return rel.split('/', skip)[-1]
+    return path
 
-            jar_path = os.path.join(
-                ROOT_DIR, "tools", "java", "java-benchmarks", "JREs", "jre1.8", "rt.jar"
-            )
+def _resolve_audit_Java_file(proj_root, raw_path, file_hash):
+    class_name = java_class_name(raw_path)
+    if not class_name:
+        return None
 
-            tool_dir = os.path.join(
-                os.path.abspath(os.path.dirname(__file__)), "tools", "java_decompile", "bin"
-            )
+    # 旧版本上传时整体反编译过的项目，先在 decompiled/ 中查找
+    ret = None
+    decompile_dir = os.path.join(proj_root, "decompiled")
+    if os.path.isdir(decompile_dir):
+        ret = find_java_source(file_hash, decompile_dir, class_name)
 
-            # Choose the correct jadx launcher per platform
-            if os.name == 'nt':
-                run_cmd = ["cmd", "/c", "jadx.bat", "-d", jdk_dir, jar_path]
-            else:
-                run_cmd = ["./jadx", "-d", jdk_dir, jar_path]
-
-            with subprocess.Popen(
-                run_cmd, cwd=tool_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
-            ) as proc:
-                for line in proc.stdout:
-                    print(line, end='')
-                    sys.stdout.flush()
-
-        for root, dirs, files in os.walk(jdk_dir):
-            for file in files:
-                if not file.endswith(".java"):
-                    continue
-                full = os.path.join(root, file)
-                if raw_norm in norm(full):
-                    ret = full
-                    break
-            if ret:
-                break
+    # 在项目的 jar 中查找，未缓存的类在后台反编译
+    if ret is None:
+        ret = project_class_source(file_hash, proj_root, class_name)
+
+    if ret is None and class_name.startswith(JDK_PACKAGES):
+        if jdk_sources.ready():
+            ret = find_java_source('jdk', jdk_sources.jdk_dir, class_name)
+        else:
+            # 完整的 JDK 源码在后台准备，此前需要的类也在后台单独反编译，请求中不运行 jadx；
+            # 未完成时返回 PENDING，页面显示占位内容（进度见 /api/jdk/status）
+            jdk_sources.warm_up()
+            ret = jdk_sources.class_source(class_name)
 
     return ret
 
@@ -544,6 +831,8 @@ def _resolve_audit_file(proj_root: str, raw_path: str, file_hash: str, lang):
       suffix after the hash directory and join with proj_root.
     - Otherwise, fall back to treating it as a relative path under proj_root
       with traversal protection.
+    For Java, PENDING is returned while the source is still being decompiled
+    in the background.
     """
     if not raw_path:
         return None
@@ -637,18 +926,18 @@ def _build_audit_context_for_ai(file_hash: str, idx: int = 0):
     try:
         conn = get_connect(); conn.row_factory = sqlite3.Row
         cur = conn.cursor()
-        cur.execute("SELECT filename, language, analysis_result FROM results WHERE file_hash = ?", (file_hash,))
+        cur.execute("SELECT filename, language, chain_count FROM results WHERE file_hash = ?", (file_hash,))
         row = cur.fetchone(); cur.close(); conn.close()
         if not row:
             return None, []
         language = row['language']
         name = os.path.splitext(row['filename'])[0]
-        data = json.loads(row['analysis_result']) if row['analysis_result'] else None
-        raw_list = data if isinstance(data, list) else (data.get('chains') if isinstance(data, dict) else [])
-        if not raw_list:
+        chain_count = row['chain_count'] or 0
+        if not chain_count:
             return {'project': name, 'language': language, 'chain_index': 0, 'length': 0, 'entry': '', 'sink': ''}, []
-        idx = max(0, min(idx, len(raw_list) - 1))
-        ch = raw_list[idx]
+        # 只读取需要的一条链
+        idx = max(0, min(idx, chain_count - 1))
+        ch = db_get_chain(file_hash, idx)
         if isinstance(ch, dict):
             stack = ch.get('gc_stack') or ch.get('funcStack') or ch.get('path') or ch.get('nodes')
             if isinstance(stack, list) and stack and isinstance(stack[0], dict):
@@ -690,6 +979,8 @@ def _build_audit_context_for_ai(file_hash: str, idx: int = 0):
                 except Exception:
                     pass
             abs_path = _resolve_audit_file(proj_root, raw_path, file_hash, language) if raw_path else None
+            if abs_path is PENDING:
+                abs_path = None
             display_rel = None; file_name = None
             if abs_path:
                 try:
@@ -700,7 +991,9 @@ def _build_audit_context_for_ai(file_hash: str, idx: int = 0):
                 try:
                     if language == 'Java' and display_rel:
                         rel_norm = str(display_rel).replace('\\', '/')
-                        if rel_norm.startswith('decompiled/'):
+                        if rel_norm.startswith('../'):
+                            display_rel = java_source_display(abs_path)
+                        elif rel_norm.startswith('decompiled/'):
                             display_rel = rel_norm[len('decompiled/') :]
                         elif rel_norm.startswith('/decompiled/'):
                             display_rel = rel_norm[len('/decompiled/') :]
@@ -783,18 +1076,18 @@ def audit():
     try:
         conn = get_connect(); conn.row_factory = sqlite3.Row
         cur = conn.cursor()
-        cur.execute("SELECT filename, language, analysis_result FROM results WHERE file_hash = ?", (file_hash,))
+        cur.execute("SELECT filename, language, chain_count FROM results WHERE file_hash = ?", (file_hash,))
         row = cur.fetchone(); cur.close(); conn.close()
         if not row:
             return render_template('audit.html', meta={'project':'未知','language':lang or '未知','chain_index':0,'length':0,'entry':'','sink':''}, steps=[])
         language = lang or row['language']
         name = os.path.splitext(row['filename'])[0]
-        data = json.loads(row['analysis_result']) if row['analysis_result'] else None
-        raw_list = data if isinstance(data, list) else (data.get('chains') if isinstance(data, dict) else [])
-        if not raw_list:
+        chain_count = row['chain_count'] or 0
+        if not chain_count:
             return render_template('audit.html', meta={'project': name, 'language': language, 'chain_index': 0, 'length': 0, 'entry': '', 'sink': ''}, steps=[])
-        idx = max(0, min(idx, len(raw_list) - 1))
-        ch = raw_list[idx]
+        # 只读取需要的一条链
+        idx = max(0, min(idx, chain_count - 1))
+        ch = db_get_chain(file_hash, idx)
         if isinstance(ch, dict):
             stack = ch.get('gc_stack') or ch.get('funcStack') or ch.get('path') or ch.get('nodes')
             if isinstance(stack, list) and stack and isinstance(stack[0], dict):
@@ -839,6 +1132,10 @@ def audit():
                     pass
             # Prefer robust resolver that can handle absolute paths from other machines
             abs_path = _resolve_audit_file(proj_root, raw_path, file_hash, language) if raw_path else None
+            # 源码正在后台反编译时先显示占位内容
+            pending = abs_path is PENDING
+            if pending:
+                abs_path = None
             display_rel = None
             file_name = None
             if abs_path:
@@ -850,7 +1147,9 @@ def audit():
                 try:
                     if language == 'Java' and display_rel:
                         rel_norm = str(display_rel).replace('\\', '/')
-                        if rel_norm.startswith('decompiled/'):
+                        if rel_norm.startswith('../'):
+                            display_rel = java_source_display(abs_path)
+                        elif rel_norm.startswith('decompiled/'):
                             display_rel = rel_norm[len('decompiled/'):]
                         elif rel_norm.startswith('/decompiled/'):
                             display_rel = rel_norm[len('/decompiled/'):]
@@ -886,6 +1185,7 @@ def audit():
                 'file_name': file_name,
                 'line': line_no,
                 'found': bool(snippet),
+                'pending': pending,
                 'func_name': snippet.get('func_name') if snippet else None,
                 'start_line': snippet.get('start_line') if snippet else None,
                 'end_line': snippet.get('end_line') if snippet else None,
@@ -955,6 +1255,11 @@ def api_ai_health():
         'AI_API_KEY_configured': bool(os.environ.get('AI_API_KEY'))
     })
 
+@app.route('/api/jdk/status', methods=['GET'])
+def api_jdk_status():
+    """JDK 源码的准备状态：ready / running / failed / missing"""
+    return jsonify({'state': jdk_sources.state(), 'error': jdk_sources.error})
+
 # === AI 总结接口：对单条链生成结构化摘要 ===
 @app.route('/api/ai/summary', methods=['POST'])
 def api_ai_summary():
@@ -1037,16 +1342,16 @@ def analyze():
         analyzed = is_analyzed(file_hash)
         filename = secure_filename(uploaded.filename)
 
+        # 分析失败的项目可以重新上传分析，其它状态（pending/queued/running）视为正在分析
         if analyzed:
-            if analyzed['status'] == 'completed':
-                return redirect(url_for('result', file_hash=file_hash)) # TODO
-            flash(f"文件 {filename} 正在分析中，请稍后查看结果")
-            return redirect(url_for('analyze'))
+            if analyzed['status'] == 'finished':
+                return redirect(url_for('project_view', hash=file_hash))
+            if analyzed['status'] != 'failed':
+                flash(f"文件 {filename} 正在分析中，请稍后查看结果")
+                return redirect(url_for('analyze'))
 
         ext = ext_of(filename)
         allowed = ALLOWED_EXT.get(lang, set())
-        db_start_analyze(file_hash, filename, lang, "pending")
-
         if ext not in allowed:
             flash(f"文件类型不允许：{filename}（期望 {', '.join(sorted(allowed))}）")
             return redirect(url_for("analyze"))
@@ -1058,6 +1363,14 @@ def analyze():
             save_path = os.path.join(PHP_DIR, filename)
             extract_dest = os.path.join(PHP_DIR, file_hash)
 
+        if analyzed:
+            # 清除上次上传解压的文件，重新解压
+            shutil.rmtree(extract_dest, ignore_errors=True)
+            db_restart_analyze(file_hash, filename, lang)
+            print(f"{filename} 上次分析失败，重新分析")
+        else:
+            db_start_analyze(file_hash, filename, lang, "pending")
+
         save_file(uploaded, save_path)
         os.makedirs(extract_dest, exist_ok=True)
 
@@ -1069,15 +1382,8 @@ def analyze():
             os.remove(save_path)
         elif ext == ".jar":
             shutil.move(save_path, extract_dest)
-        
-        decompile_java(extract_dest)
-        
-        analysis_thread = threading.Thread(
-            target=gc_scan,
-            args=(extract_dest, lang, file_hash, filename),
-            daemon=True
-        )
-        analysis_thread.start()
+
+        scheduler.submit(file_hash, filename, lang, extract_dest)
 
         flash(f"{filename} 已提交分析，正在处理中...")
         return redirect(url_for('analyze'))
@@ -1086,4 +1392,6 @@ def analyze():
    return render_template("analyze.html", limited_records=limited_records)
 
 if __name__ == '__main__':
+    scheduler.start()
+    jdk_sources.start()
     app.run(host='0.0.0.0', port=9000, debug=True)
\ No newline at end of file
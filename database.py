@@ -1,15 +1,21 @@
 import sqlite3
 import os
+import time
+import json
 
 DB_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'results.db')
 
+# 数据库结构版本（PRAGMA user_version），低于该版本时 init_db 执行迁移
+SCHEMA_VERSION = 1
+
 def get_connect():
     return sqlite3.connect(DB_PATH)
 
 def init_db():
     conn = get_connect()
     c = conn.cursor()
-    # 创建文件分析结果表
+    # 创建文件分析结果表，每个上传的项目一行，找到的链保存在 chains / chain_steps 表中
+    # analysis_result 仅保留给旧版本的数据，迁移后为空
     c.execute('''
     CREATE TABLE IF NOT EXISTS results (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -17,12 +23,160 @@ def init_db():
         filename TEXT NOT NULL,
         language TEXT NOT NULL,
         analysis_result TEXT,
-        status TEXT DEFAULT 'pending'
+        status TEXT DEFAULT 'pending',
+        chain_count INTEGER DEFAULT 0,
+        updated_at REAL
+    )
+    ''')
+    # updated_at 为项目的链最后一次变化（写入/清空/扫描结束）的时间，用作链图谱的缓存版本
+    _ensure_columns(c, 'results', {'chain_count': 'INTEGER DEFAULT 0', 'updated_at': 'REAL'})
+    # 创建分析任务队列表，gunicorn worker 重启后未完成的任务仍可继续调度
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        file_hash TEXT UNIQUE NOT NULL,
+        filename TEXT NOT NULL,
+        language TEXT NOT NULL,
+        project_path TEXT NOT NULL,
+        status TEXT DEFAULT 'queued',
+        owner_pid INTEGER,
+        owner_start INTEGER,
+        attempts INTEGER DEFAULT 0,
+        mem_estimate INTEGER,
+        heap_mb INTEGER,
+        mem_reserved INTEGER DEFAULT 0,
+        scan_pid INTEGER,
+        scan_start INTEGER,
+        created_at REAL,
+        started_at REAL,
+        finished_at REAL,
+        phase TEXT,
+        progress_done INTEGER,
+        progress_total INTEGER,
+        chains_found INTEGER DEFAULT 0,
+        progress_at REAL
+    )
+    ''')
+    # 旧版本创建的 jobs 表补齐新增列
+    # owner_start / scan_start 为领取者进程与扫描子进程的启动时间，用于识别被复用的 pid
+    _ensure_columns(c, 'jobs', {
+        'owner_start': 'INTEGER',
+        'scan_start': 'INTEGER',
+        'mem_estimate': 'INTEGER',
+        'heap_mb': 'INTEGER',
+        'mem_reserved': 'INTEGER DEFAULT 0',
+        'scan_pid': 'INTEGER',
+        'phase': 'TEXT',
+        'progress_done': 'INTEGER',
+        'progress_total': 'INTEGER',
+        'chains_found': 'INTEGER DEFAULT 0',
+        'progress_at': 'REAL',
+    })
+    c.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, language)')
+    # 找到的链，seq 为链在项目结果中的序号（PHP 扫描过程中逐批写入），data 为该链的原始 JSON，
+    # graph 为转换好的前端图谱 JSON（扫描结束时生成）
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS chains (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        file_hash TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        vuln_type TEXT,
+        entry TEXT,
+        sink TEXT,
+        length INTEGER,
+        data TEXT NOT NULL,
+        graph TEXT,
+        UNIQUE (file_hash, seq)
+    )
+    ''')
+    _ensure_columns(c, 'chains', {'vuln_type': 'TEXT', 'graph': 'TEXT'})
+    # 链中的每一步（方法签名），pos 从 0 开始
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS chain_steps (
+        chain_id INTEGER NOT NULL,
+        pos INTEGER NOT NULL,
+        label TEXT NOT NULL,
+        PRIMARY KEY (chain_id, pos)
+    )
+    ''')
+    # (file_hash, seq) 由 UNIQUE 约束建立索引
+    c.execute('CREATE INDEX IF NOT EXISTS idx_chains_entry ON chains (entry)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_chains_sink ON chains (sink)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_chains_vuln_type ON chains (vuln_type)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_chain_steps_label ON chain_steps (label)')
+    # Java 反编译源码的类名索引，scope 为项目 hash 或 'jdk'，path 为相对反编译目录的路径
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS class_files (
+        scope TEXT NOT NULL,
+        name TEXT NOT NULL,
+        simple TEXT NOT NULL,
+        path TEXT NOT NULL,
+        digest TEXT,
+        PRIMARY KEY (scope, name)
+    )
+    ''')
+    # digest 为类所在 jar 的 md5（项目 jar 的索引），用作按需反编译的缓存 key
+    _ensure_columns(c, 'class_files', {'digest': 'TEXT'})
+    c.execute('CREATE INDEX IF NOT EXISTS idx_class_files_simple ON class_files (scope, simple)')
+    # 已建立类名索引的反编译目录
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS class_indexes (
+        scope TEXT PRIMARY KEY,
+        root TEXT NOT NULL,
+        class_count INTEGER NOT NULL,
+        built_at REAL NOT NULL
     )
     ''')
     conn.commit()
+
+    if c.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+        _migrate_result_blobs(conn)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.commit()
     conn.close()
 
+def _migrate_result_blobs(conn):
+    """将旧版本保存在 results.analysis_result 中的整个结果拆分写入 chains / chain_steps 表，
+    并为已写入 chains 表、还没有步骤记录的链补齐 chain_steps"""
+    with conn:
+        rows = conn.execute(
+            'SELECT file_hash, analysis_result FROM results WHERE analysis_result IS NOT NULL').fetchall()
+        for file_hash, blob in rows:
+            try:
+                gcs = chain_list(json.loads(blob))
+            except Exception:
+                try:
+                    # 兼容转义为 "" 的旧数据
+                    gcs = chain_list(json.loads(blob.replace('""', '"')))
+                except Exception:
+                    print(f'[warning] {file_hash} 的分析结果无法解析，保留原数据')
+                    continue
+            if not conn.execute('SELECT 1 FROM chains WHERE file_hash = ? LIMIT 1', (file_hash,)).fetchone():
+                _insert_chains(conn, file_hash, 0, gcs)
+            conn.execute('UPDATE results SET analysis_result = NULL WHERE file_hash = ?', (file_hash,))
+
+        rows = conn.execute('''
+            SELECT id, data FROM chains
+            WHERE NOT EXISTS (SELECT 1 FROM chain_steps WHERE chain_id = chains.id)
+            ''').fetchall()
+        for chain_id, data in rows:
+            ch = json.loads(data)
+            conn.execute('UPDATE chains SET vuln_type = ? WHERE id = ?', (chain_vuln_type(ch), chain_id))
+            conn.executemany('INSERT INTO chain_steps (chain_id, pos, label) VALUES (?, ?, ?)',
+                             [(chain_id, pos, label) for pos, label in enumerate(chain_labels(ch))])
+
+        conn.execute('''
+            UPDATE results
+            SET chain_count = (SELECT COUNT(*) FROM chains WHERE chains.file_hash = results.file_hash)
+            ''')
+
+def _ensure_columns(cursor, table, columns):
+    cursor.execute(f'PRAGMA table_info({table})')
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, decl in columns.items():
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {decl}')
+
 def is_analyzed(hash):
     conn = get_connect()
     conn.row_factory = sqlite3.Row
@@ -41,6 +195,7 @@ def is_analyzed(hash):
     return records
 
 def get_limited_results(limit=3):
+    """最近提交的 limit 个项目，以及所有仍在处理中（pending）的项目，按提交时间倒序"""
     conn = get_connect()
     
     conn.row_factory = sqlite3.Row
@@ -49,7 +204,8 @@ def get_limited_results(limit=3):
     cursor.execute("""
         SELECT file_hash, filename, language, status 
         FROM results 
-        LIMIT ?
+        WHERE status = 'pending' OR id IN (SELECT id FROM results ORDER BY id DESC LIMIT ?)
+        ORDER BY id DESC
         """, (limit,))
     
     records = [dict(row) for row in cursor.fetchall()]
@@ -67,14 +223,407 @@ def db_start_analyze(hash, name, lang, status):
     conn.commit()
     conn.close()
 
-def db_finish_analyze(hash, gcs_str):
+def db_finish_analyze(hash):
     conn = get_connect()
     conn.execute('''
         UPDATE results
-        SET status = ?, analysis_result = ?
+        SET status = ?, updated_at = ?
         WHERE file_hash = ?
-        ''', ('finished', gcs_str, hash))
+        ''', ('finished', time.time(), hash))
     conn.commit()
     conn.close()
 
-init_db()
\ No newline at end of file
+def db_fail_analyze(hash):
+    now = time.time()
+    conn = get_connect()
+    with conn:
+        conn.execute('''
+            UPDATE results
+            SET status = ?, updated_at = ?
+            WHERE file_hash = ?
+            ''', ('failed', now, hash))
+        conn.execute('UPDATE jobs SET finished_at = ? WHERE file_hash = ?', (now, hash))
+    conn.close()
+
+def db_restart_analyze(hash, name, lang):
+    """重新分析失败的项目：清除上次的任务记录，项目回到 pending 状态，之后可重新入队"""
+    conn = get_connect()
+    with conn:
+        conn.execute("DELETE FROM jobs WHERE file_hash = ? AND status != 'running'", (hash,))
+        conn.execute('''
+            UPDATE results
+            SET filename = ?, language = ?, status = 'pending', updated_at = ?
+            WHERE file_hash = ?
+            ''', (name, lang, time.time(), hash))
+    conn.close()
+
+# ===== 链 =====
+def chain_list(data):
+    """分析结果中的链列表，兼容 [chain, ...] 与 {"chains": [chain, ...]} 两种格式"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and isinstance(data.get('chains'), list):
+        return data['chains']
+    return []
+
+def chain_labels(ch):
+    """链中各步骤的标签，兼容 PHP 的 gc_stack 与 Java 结果的 funcStack/path/nodes 及纯列表格式"""
+    if isinstance(ch, dict):
+        stack = ch.get('gc_stack') or ch.get('funcStack') or ch.get('path') or ch.get('nodes')
+        if isinstance(stack, list) and stack and isinstance(stack[0], dict):
+            stack = [(n.get('label') or n.get('name') or str(n)) for n in stack]
+    elif isinstance(ch, list):
+        stack = ch
+    else:
+        stack = None
+    return [str(label) for label in stack] if isinstance(stack, list) else []
+
+def chain_vuln_type(ch):
+    if isinstance(ch, dict):
+        return ch.get('vuln_type') or ch.get('vulType')
+    return None
+
+def _insert_chains(conn, hash, start_seq, gcs):
+    for i, ch in enumerate(gcs):
+        labels = chain_labels(ch)
+        cur = conn.execute('''
+            INSERT INTO chains (file_hash, seq, vuln_type, entry, sink, length, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (hash, start_seq + i, chain_vuln_type(ch), labels[0] if labels else '',
+                  labels[-1] if labels else '', len(labels), json.dumps(ch)))
+        conn.executemany('INSERT INTO chain_steps (chain_id, pos, label) VALUES (?, ?, ?)',
+                         [(cur.lastrowid, pos, label) for pos, label in enumerate(labels)])
+    conn.execute('''
+        UPDATE results
+        SET chain_count = (SELECT COUNT(*) FROM chains WHERE file_hash = ?), updated_at = ?
+        WHERE file_hash = ?
+        ''', (hash, time.time(), hash))
+
+def db_clear_chains(hash):
+    conn = get_connect()
+    with conn:
+        conn.execute('''
+            DELETE FROM chain_steps
+            WHERE chain_id IN (SELECT id FROM chains WHERE file_hash = ?)
+            ''', (hash,))
+        conn.execute('DELETE FROM chains WHERE file_hash = ?', (hash,))
+        conn.execute('UPDATE results SET chain_count = 0, updated_at = ? WHERE file_hash = ?', (time.time(), hash))
+    conn.close()
+
+def db_insert_chains(hash, start_seq, gcs):
+    """在一个事务中写入一批链（及其步骤），序号从 start_seq 开始"""
+    conn = get_connect()
+    try:
+        with conn:
+            _insert_chains(conn, hash, start_seq, gcs)
+    finally:
+        conn.close()
+
+def db_get_chains(hash):
+    """按序号返回项目的所有链，没有时返回空列表"""
+    conn = get_connect()
+    try:
+        rows = conn.execute('SELECT data FROM chains WHERE file_hash = ? ORDER BY seq', (hash,)).fetchall()
+    finally:
+        conn.close()
+    return [json.loads(row[0]) for row in rows]
+
+def db_get_chain(hash, seq):
+    """返回项目中序号为 seq 的链，不存在时返回 None"""
+    conn = get_connect()
+    try:
+        row = conn.execute('SELECT data FROM chains WHERE file_hash = ? AND seq = ?', (hash, seq)).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row is not None else None
+
+def _like_pattern(text):
+    """子串匹配的 LIKE 模式（配合 ESCAPE '\\'）"""
+    return '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def _chain_filters(entry=None, sink=None, vuln_type=None):
+    """链的筛选条件：入口、sink 按子串匹配，漏洞类型精确匹配"""
+    where, params = [], []
+    if entry:
+        where.append("entry LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(entry))
+    if sink:
+        where.append("sink LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(sink))
+    if vuln_type:
+        where.append('vuln_type = ?')
+        params.append(vuln_type)
+    return where, params
+
+def db_list_chains(hash, entry=None, sink=None, vuln_type=None, offset=0, limit=None, with_graph=False):
+    """按序号返回项目中符合条件的链的概要（不含链的完整数据），以及符合条件的链总数
+    with_graph 为 True 时同时返回每条链的图谱 JSON（graph，未生成时为 None）
+    """
+    where, params = _chain_filters(entry, sink, vuln_type)
+    cond = ' AND '.join(['file_hash = ?'] + where)
+    conn = get_connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        total = conn.execute(f'SELECT COUNT(*) FROM chains WHERE {cond}', [hash] + params).fetchone()[0]
+        rows = conn.execute(f'''
+            SELECT seq, vuln_type, entry, sink, length{', graph' if with_graph else ''} FROM chains
+            WHERE {cond} ORDER BY seq LIMIT ? OFFSET ?
+            ''', [hash] + params + [-1 if limit is None else limit, offset]).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows], total
+
+def db_get_chain_graph(hash, seq):
+    """返回项目中序号为 seq 的链的 (原始 JSON, 图谱 JSON)，图谱未生成时为 None；链不存在时返回 None"""
+    conn = get_connect()
+    try:
+        row = conn.execute('SELECT data, graph FROM chains WHERE file_hash = ? AND seq = ?', (hash, seq)).fetchone()
+    finally:
+        conn.close()
+    return tuple(row) if row is not None else None
+
+def db_chains_without_graph(hash):
+    """返回项目中还没有生成图谱的链 [(seq, 原始 JSON), ...]"""
+    conn = get_connect()
+    try:
+        rows = conn.execute(
+            'SELECT seq, data FROM chains WHERE file_hash = ? AND graph IS NULL ORDER BY seq', (hash,)).fetchall()
+    finally:
+        conn.close()
+    return rows
+
+def db_set_chain_graphs(hash, graphs):
+    """保存链的图谱，graphs: [(seq, 图谱 JSON), ...]"""
+    conn = get_connect()
+    try:
+        with conn:
+            conn.executemany('UPDATE chains SET graph = ? WHERE file_hash = ? AND seq = ?',
+                             [(graph, hash, seq) for seq, graph in graphs])
+    finally:
+        conn.close()
+
+def db_list_projects(language=None, entry=None, sink=None, offset=0, limit=20):
+    """分页返回已完成（或已找到链）的项目及符合条件的项目总数
+    指定 entry/sink 时只返回含有匹配链的项目，chain_count 为匹配的链数
+    """
+    where = ["(status = 'finished' OR chain_count > 0)"]
+    params = []
+    if language:
+        where.append('language = ?')
+        params.append(language)
+    chain_where, chain_params = _chain_filters(entry, sink)
+    if chain_where:
+        count_expr = f'''(SELECT COUNT(*) FROM chains
+            WHERE chains.file_hash = results.file_hash AND {' AND '.join(chain_where)})'''
+        where.append(f'{count_expr} > 0')
+        params += chain_params
+    else:
+        count_expr = 'chain_count'
+    cond = ' AND '.join(where)
+    conn = get_connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        total = conn.execute(f'SELECT COUNT(*) FROM results WHERE {cond}', params).fetchone()[0]
+        rows = conn.execute(f'''
+            SELECT file_hash, filename, language, status, {count_expr} AS chain_count FROM results
+            WHERE {cond} ORDER BY id DESC LIMIT ? OFFSET ?
+            ''', chain_params + params + [limit, offset]).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows], total
+
+def db_project_stats():
+    """按语言统计已完成（或已找到链）的项目数和链数"""
+    conn = get_connect()
+    try:
+        rows = conn.execute('''
+            SELECT language, COUNT(*), COALESCE(SUM(chain_count), 0) FROM results
+            WHERE status = 'finished' OR chain_count > 0
+            GROUP BY language
+            ''').fetchall()
+    finally:
+        conn.close()
+    return {language: {'projects': projects, 'chains': chains} for language, projects, chains in rows}
+
+# ===== 分析任务队列 =====
+def db_enqueue_job(hash, name, lang, project_path, mem_estimate=None, heap_mb=None):
+    conn = get_connect()
+    conn.execute('''
+        INSERT OR IGNORE INTO jobs (file_hash, filename, language, project_path, status,
+                                    mem_estimate, heap_mb, created_at)
+        VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)
+        ''', (hash, name, lang, project_path, mem_estimate, heap_mb, time.time()))
+    conn.commit()
+    conn.close()
+
+def db_claim_job(lang, limit, owner_pid, admit=None, owner_start=None):
+    """在同一个写事务内检查该语言正在运行的任务数并领取最早入队的任务，
+    多个 gunicorn worker 同时调度时也不会超过并发上限。领取不到时返回 None。
+
+    admit(need_mb, reserved_mb, running_count) 用于内存准入判断，
+    reserved_mb 为所有运行中任务的内存预留之和；返回 False 时任务继续排队。
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        running = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'running' AND language = ?", (lang,)).fetchone()[0]
+        if running >= limit:
+            conn.execute('COMMIT')
+            return None
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' AND language = ? ORDER BY id LIMIT 1", (lang,)).fetchone()
+        if row is None:
+            conn.execute('COMMIT')
+            return None
+        if admit is not None:
+            reserved, running_all = conn.execute(
+                "SELECT COALESCE(SUM(mem_reserved), 0), COUNT(*) FROM jobs WHERE status = 'running'").fetchone()
+            if not admit(row['mem_estimate'], reserved, running_all):
+                conn.execute('COMMIT')
+                return None
+        now = time.time()
+        conn.execute('''
+            UPDATE jobs
+            SET status = 'running', owner_pid = ?, owner_start = ?, attempts = attempts + 1, started_at = ?,
+                mem_reserved = ?, scan_pid = NULL, scan_start = NULL,
+                phase = NULL, progress_done = NULL, progress_total = NULL, chains_found = 0, progress_at = ?
+            WHERE id = ?
+            ''', (owner_pid, owner_start, now, row['mem_estimate'] or 0, now, row['id']))
+        conn.execute('COMMIT')
+        job = dict(row)
+        job['status'] = 'running'
+        job['owner_pid'] = owner_pid
+        job['owner_start'] = owner_start
+        job['attempts'] += 1
+        job['mem_reserved'] = row['mem_estimate'] or 0
+        return job
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+def db_finish_job(job_id, status):
+    conn = get_connect()
+    conn.execute('''
+        UPDATE jobs
+        SET status = ?, finished_at = ?, mem_reserved = 0, scan_pid = NULL, scan_start = NULL
+        WHERE id = ?
+        ''', (status, time.time(), job_id))
+    conn.commit()
+    conn.close()
+
+def db_running_jobs():
+    conn = get_connect()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM jobs WHERE status = 'running'")
+    records = [dict(row) for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return records
+
+def db_requeue_job(job_id, status='queued'):
+    conn = get_connect()
+    conn.execute('''
+        UPDATE jobs
+        SET status = ?, owner_pid = NULL, owner_start = NULL, started_at = NULL, mem_reserved = 0,
+            scan_pid = NULL, scan_start = NULL
+        WHERE id = ? AND status = 'running'
+        ''', (status, job_id))
+    conn.commit()
+    conn.close()
+
+def db_set_job_pid(job_id, scan_pid, scan_start=None):
+    conn = get_connect()
+    conn.execute('UPDATE jobs SET scan_pid = ?, scan_start = ? WHERE id = ?', (scan_pid, scan_start, job_id))
+    conn.commit()
+    conn.close()
+
+def db_update_job_progress(job_id, phase, done=None, total=None, chains=None):
+    """记录运行中任务的进度：阶段（decompile/parse/search）、已处理数/总数、已找到的链数"""
+    conn = get_connect()
+    conn.execute('''
+        UPDATE jobs
+        SET phase = ?, progress_done = ?, progress_total = ?,
+            chains_found = COALESCE(?, chains_found), progress_at = ?
+        WHERE id = ? AND status = 'running'
+        ''', (phase, done, total, chains, time.time(), job_id))
+    conn.commit()
+    conn.close()
+
+def db_job_progress(hash):
+    """返回文件对应任务的状态与进度，没有任务时返回 None"""
+    conn = get_connect()
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute('''
+            SELECT status, phase, progress_done, progress_total, chains_found,
+                   created_at, started_at, finished_at, progress_at
+            FROM jobs WHERE file_hash = ?
+            ''', (hash,)).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row is not None else None
+
+def db_update_job_memory(job_id, mem_reserved):
+    conn = get_connect()
+    conn.execute("UPDATE jobs SET mem_reserved = ? WHERE id = ? AND status = 'running'", (mem_reserved, job_id))
+    conn.commit()
+    conn.close()
+
+
+# ===== Java 类名索引 =====
+def db_replace_class_index(scope, root, classes, digests=None):
+    """重建 scope 的类名索引，classes: [(类名, 简单类名, 相对路径), ...]，同名类保留第一个
+    digests: {相对路径: 文件的 md5}，与类一起保存
+    """
+    digests = digests or {}
+    conn = get_connect()
+    try:
+        with conn:
+            conn.execute('DELETE FROM class_files WHERE scope = ?', (scope,))
+            conn.executemany('INSERT OR IGNORE INTO class_files (scope, name, simple, path, digest) VALUES (?, ?, ?, ?, ?)',
+                             [(scope, name, simple, path, digests.get(path)) for name, simple, path in classes])
+            conn.execute('''
+                INSERT OR REPLACE INTO class_indexes (scope, root, class_count, built_at)
+                VALUES (?, ?, ?, ?)
+                ''', (scope, root, len(classes), time.time()))
+    finally:
+        conn.close()
+
+def db_class_index_root(scope):
+    """返回建立 scope 类名索引时的反编译目录，尚未建立索引时返回 None"""
+    conn = get_connect()
+    try:
+        row = conn.execute('SELECT root FROM class_indexes WHERE scope = ?', (scope,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row is not None else None
+
+def db_find_class_file(scope, name):
+    """按类名查找类及其所在文件：先精确匹配类名，再在同名（简单类名）的类中找以 name 结尾或包含 name 的类
+    返回 (完整类名, 相对路径, 文件的 md5)，找不到时返回 None
+    """
+    simple = name.rsplit('/', 1)[-1]
+    conn = get_connect()
+    try:
+        row = conn.execute('SELECT name, path, digest FROM class_files WHERE scope = ? AND name = ?',
+                           (scope, name)).fetchone()
+        if row is not None:
+            return tuple(row)
+        rows = conn.execute('SELECT name, path, digest FROM class_files WHERE scope = ? AND simple = ? ORDER BY name',
+                            (scope, simple)).fetchall()
+    finally:
+        conn.close()
+    for row in rows:
+        if row[0].endswith('/' + name):
+            return tuple(row)
+    for row in rows:
+        if name in row[0]:
+            return tuple(row)
+    return None
+
+init_db()
@@ -0,0 +1,301 @@
+import os
+import re
+import sys
+import shutil
+import subprocess
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from scheduler import kill_scan, process_start_time, pid_alive
+
+try:
+    import fcntl
+except ImportError:  # Windows 上只在进程内加锁
+    fcntl = None
+
+# 以下配置在创建 JdkSources / ClassDecompiler 时从环境变量读取（app.py 会先加载 .env）
+# GCSCAN_JDK_WARMUP：为 1 时 worker 启动后即在后台反编译整个 rt.jar，
+#   否则在第一次需要 JDK 源码时才开始
+# GCSCAN_DECOMPILE_WORKERS：批量反编译单个类时同时运行的 jadx 数量
+
+# 源码正在后台反编译时 request() / class_source() 的返回值，调用方先显示占位内容，稍后再读取
+PENDING = object()
+
+
+def jadx_command(args):
+    """按平台选择 jadx 启动脚本"""
+    if os.name == 'nt':
+        return ["cmd", "/c", "jadx.bat"] + args
+    return ["./jadx"] + args
+
+
+def run_jadx(tool_dir, args, on_start=None):
+    """运行 jadx 并输出其日志，返回退出码
+    jadx 以新的会话启动，所在 worker 意外退出后可按进程组结束它；on_start(pid) 在启动后调用
+    """
+    if os.name != 'nt':
+        # Try to ensure executable permission (best-effort; ignore failures)
+        try:
+            jadx_path = os.path.join(tool_dir, "jadx")
+            if os.path.exists(jadx_path):
+                os.chmod(jadx_path, os.stat(jadx_path).st_mode | 0o111)
+        except Exception:
+            pass
+    with subprocess.Popen(jadx_command(args), cwd=tool_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          text=True, start_new_session=True) as proc:
+        if on_start is not None:
+            on_start(proc.pid)
+        for line in proc.stdout:
+            print(line, end='')
+            sys.stdout.flush()
+    return proc.returncode
+
+
+class ClassDecompiler:
+    """按需单独反编译 jar 中的类（jadx --single-class）。
+
+    结果缓存在 <cache_dir>/<key>/<类名>.java，key 一般为 jar 的 md5，
+    相同的 jar（如多个项目共同依赖的库）共用缓存；先输出到临时目录再移动，
+    其它进程不会读到写了一半的文件。
+    source() 在调用线程中反编译（扫描结束时的预先反编译），request() 只提交后台反编译，
+    供 HTTP 请求使用。
+    """
+
+    def __init__(self, cache_dir, tool_dir, workers=None):
+        self.cache_dir = cache_dir
+        self.tool_dir = tool_dir
+        if workers is None:
+            workers = int(os.environ.get('GCSCAN_DECOMPILE_WORKERS', 4))
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._class_locks = {}
+        # jar 中不存在（单独反编译失败）的类，不再重复尝试
+        self._missing = set()
+        # 已提交后台反编译、尚未完成的类
+        self._queued = set()
+        self._pool = None
+        self._pool_pid = None
+
+    def cache_path(self, class_name, key=''):
+        return os.path.join(self.cache_dir, key, class_name + ".java")
+
+    def source(self, jar_path, class_name, key=''):
+        """单独反编译 jar 中的一个类（如 org/apache/Foo）并缓存，返回源码路径，失败时返回 None"""
+        path = self.cache_path(class_name, key)
+        if os.path.isfile(path):
+            return path
+        if (key, class_name) in self._missing or not os.path.isfile(jar_path):
+            return None
+        with self._lock:
+            class_lock = self._class_locks.setdefault((key, class_name), threading.Lock())
+        try:
+            with class_lock:
+                if os.path.isfile(path):
+                    return path
+                return self._decompile(jar_path, class_name, key, path)
+        finally:
+            # 类已缓存（或确认不存在）后不再需要它的锁，之后的调用直接读取缓存
+            with self._lock:
+                if self._class_locks.get((key, class_name)) is class_lock:
+                    del self._class_locks[(key, class_name)]
+
+    def _decompile(self, jar_path, class_name, key, path):
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{os.getpid()}-{threading.get_ident()}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        try:
+            try:
+                run_jadx(self.tool_dir, ["--single-class", class_name.replace('/', '.'),
+                                         "--single-class-output", tmp_dir, jar_path])
+            except OSError:
+                traceback.print_exc()
+                return None
+            output = None
+            for root, _, files in os.walk(tmp_dir):
+                for file in files:
+                    if file.endswith(".java"):
+                        output = os.path.join(root, file)
+                        break
+                if output:
+                    break
+            if output is None:
+                self._missing.add((key, class_name))
+                return None
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(output, path)
+            return path
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def request(self, jar_path, class_name, key=''):
+        """不阻塞调用方的 source()：已缓存时返回源码路径，类不存在时返回 None，
+        否则提交后台反编译并返回 PENDING"""
+        path = self.cache_path(class_name, key)
+        if os.path.isfile(path):
+            return path
+        if (key, class_name) in self._missing or not os.path.isfile(jar_path):
+            return None
+        with self._lock:
+            if (key, class_name) not in self._queued:
+                # 线程池在使用它的进程中创建，gunicorn worker fork 后不会沿用 master 中的线程
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers)
+                    self._pool_pid = os.getpid()
+                    self._queued.clear()
+                self._queued.add((key, class_name))
+                self._pool.submit(self._background, jar_path, class_name, key)
+        return PENDING
+
+    def _background(self, jar_path, class_name, key):
+        try:
+            self.source(jar_path, class_name, key)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                self._queued.discard((key, class_name))
+
+    def source_many(self, items, on_done=None):
+        """并行反编译多个类，items: [(jar_path, 类名, key), ...]
+        每个类完成后调用 on_done(完成数, 总数)，返回 {(key, 类名): 源码路径或 None}
+        """
+        items = list(items)
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [(key, class_name, pool.submit(self.source, jar_path, class_name, key))
+                       for jar_path, class_name, key in items]
+            for done, (key, class_name, future) in enumerate(futures, 1):
+                try:
+                    results[(key, class_name)] = future.result()
+                except Exception:
+                    traceback.print_exc()
+                    results[(key, class_name)] = None
+                if on_done is not None:
+                    on_done(done, len(items))
+        return results
+
+
+class JdkSources:
+    """JDK（rt.jar）反编译源码的管理。
+
+    整个 rt.jar 的反编译耗时数分钟，在后台线程中进行（warm_up），先输出到临时目录，
+    完成后再重命名为 jdk_dir，因此 jdk_dir 存在即表示反编译已完成。
+    多个 gunicorn worker 之间通过 lock_path 上的文件锁保证只有一个进程在反编译。
+    jadx 的 pid 记录在 pid_path 中：反编译中途 worker 意外退出时，下一次 warm_up 取得锁后
+    先结束遗留的 jadx 并删除其临时目录，再重新开始。
+    完整的反编译结果就绪前，需要的类通过 ClassDecompiler 单独反编译，缓存在 class_dir 中。
+    """
+
+    def __init__(self, base_dir, jar_path, tool_dir, on_ready=None):
+        self.jar_path = jar_path
+        self.tool_dir = tool_dir
+        self.jdk_dir = os.path.join(base_dir, "jdk")
+        self.class_dir = os.path.join(base_dir, "jdk-classes")
+        self.lock_path = os.path.join(base_dir, "jdk.lock")
+        self.pid_path = os.path.join(base_dir, "jdk.pid")
+        # 反编译完成后调用 on_ready(jdk_dir)，用于建立类名索引
+        self.on_ready = on_ready
+        self.warm_up_on_start = os.environ.get('GCSCAN_JDK_WARMUP', '0') == '1'
+        self.classes = ClassDecompiler(self.class_dir, tool_dir)
+        self.error = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def ready(self):
+        return os.path.isdir(self.jdk_dir)
+
+    def busy(self):
+        """本进程是否正在反编译 JDK"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def state(self):
+        """ready / running / failed / missing"""
+        if self.ready():
+            return 'ready'
+        if self._thread is not None and self._thread.is_alive():
+            return 'running'
+        if self._locked_elsewhere():
+            return 'running'
+        return 'failed' if self.error else 'missing'
+
+    def _locked_elsewhere(self):
+        if fcntl is None or not os.path.exists(self.lock_path):
+            return False
+        with open(self.lock_path, 'a') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return True
+            fcntl.flock(f, fcntl.LOCK_UN)
+        return False
+
+    def start(self):
+        """worker 启动时调用，GCSCAN_JDK_WARMUP=1 时开始后台反编译"""
+        if self.warm_up_on_start:
+            self.warm_up()
+
+    def warm_up(self):
+        """在后台线程中反编译整个 rt.jar（已完成或正在进行时直接返回）"""
+        with self._lock:
+            if self.ready() or (self._thread is not None and self._thread.is_alive()):
+                return
+            self.error = None
+            self._thread = threading.Thread(target=self._warm_up, name='jdk-warm-up', daemon=True)
+            self._thread.start()
+
+    def _warm_up(self):
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # 其它 worker 正在反编译
+                    return
+            tmp_dir = f"{self.jdk_dir}.tmp-{os.getpid()}"
+            try:
+                if self.ready():
+                    return
+                self._clean_stale()
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                print(f"decompiling {self.jar_path} in background")
+                if run_jadx(self.tool_dir, ["-d", tmp_dir, self.jar_path], on_start=self._save_pid) != 0 \
+                        and not os.path.isdir(tmp_dir):
+                    raise RuntimeError("jadx 反编译 rt.jar 失败")
+                os.rename(tmp_dir, self.jdk_dir)
+                if self.on_ready is not None:
+                    self.on_ready(self.jdk_dir)
+            except Exception as e:
+                self.error = str(e)
+                traceback.print_exc()
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                try:
+                    os.remove(self.pid_path)
+                except FileNotFoundError:
+                    pass
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save_pid(self, pid):
+        with open(self.pid_path, 'w') as f:
+            f.write(f"{pid} {process_start_time(pid) or ''}")
+
+    def _clean_stale(self):
+        """持有文件锁时调用：结束上次意外中断的反编译遗留的 jadx，删除已退出进程的临时目录"""
+        try:
+            with open(self.pid_path, 'r') as f:
+                fields = f.read().split()
+            kill_scan(int(fields[0]), int(fields[1]) if len(fields) > 1 else None)
+        except (OSError, ValueError, IndexError):
+            pass
+        base_dir = os.path.dirname(self.jdk_dir)
+        prefix = os.path.basename(self.jdk_dir) + '.tmp-'
+        for name in os.listdir(base_dir):
+            m = re.fullmatch(re.escape(prefix) + r'(\d+)', name)
+            if m and (int(m.group(1)) == os.getpid() or not pid_alive(int(m.group(1)))):
+                shutil.rmtree(os.path.join(base_dir, name), ignore_errors=True)
+
+    def class_source(self, class_name):
+        """rt.jar 中一个类（如 java/util/HashMap）单独反编译的源码路径，
+        尚未缓存时在后台反编译并返回 PENDING，rt.jar 中没有该类时返回 None"""
+        return self.classes.request(self.jar_path, class_name)
@@ -1,15 +1,10 @@
 document.addEventListener('DOMContentLoaded', () => {
-  // 读取后端注入的项目数据
-  const projectsFromServer = (() => {
-    try {
-      const el = document.getElementById('projects-json');
-      if (el && el.textContent && el.textContent.trim()) {
-        return JSON.parse(el.textContent);
-      }
-    } catch (e) { console.warn('projects-json parse failed:', e); }
-    return null;
-  })();
+  // 项目与调用链通过分页接口按需加载：/api/projects、/api/projects/<hash>/chains[/<seq>]
+  const apiUrl = document.querySelector('script[data-api-url]')?.dataset.apiUrl || '/api/projects';
+  const PROJECT_PAGE_SIZE = 10;
+  const CHAIN_PAGE_SIZE = 50;
 
+  // 数据库中没有任何项目时展示的示例数据（链直接内嵌在项目中）
   const sampleProjects = [
     {
       id: 'p1', name: 'Example-Java', language: 'Java',
@@ -30,7 +25,48 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   ];
 
-  const projects = projectsFromServer || sampleProjects;
+  let sampleMode = false;
+  let projectPage = 1, projectTotal = 0, projectStats = {};
+  let currentProject = null;
+  // 当前项目当前页的链概要 {seq, entry, sink, length, vuln_type[, graph]}
+  let chainPage = 1, chainTotal = 0, chainItems = [], chainQuery = '';
+
+  async function fetchJSON(url) {
+    const resp = await fetch(url, { headers: { 'Accept': 'application/json' } });
+    if (!resp.ok) throw new Error(`${resp.status} ${url}`);
+    return resp.json();
+  }
+
+  // 筛选条件（语言、入口、Sink），空值不提交
+  const filterForm = document.getElementById('project-filter');
+  function filterParams() {
+    const params = new URLSearchParams();
+    if (!filterForm) return params;
+    new FormData(filterForm).forEach((v, k) => {
+      const s = String(v).trim();
+      if (s) params.set(k, s);
+    });
+    return params;
+  }
+
+  function updatePager(prefix, page, size, total) {
+    const info = document.getElementById(`${prefix}-page-info`);
+    const prev = document.getElementById(`${prefix}-prev`);
+    const next = document.getElementById(`${prefix}-next`);
+    const pages = Math.max(1, Math.ceil(total / size));
+    if (info) info.textContent = total ? `第 ${page} / ${pages} 页` : '';
+    if (prev) prev.disabled = page <= 1;
+    if (next) next.disabled = page >= pages;
+  }
+
+  // 方法签名的短名，用于下拉菜单
+  function shortLabel(label) {
+    const s = String(label || '');
+    if (s.includes('#')) return s.split('#', 2)[1];
+    if (s.includes('::')) return s.split('::', 2)[1];
+    const m = s.match(/([A-Za-z_$][A-Za-z0-9_$<>]*)\s*(?:\(|>|$)/g);
+    return m ? m[m.length - 1].replace(/[\s(>]+$/, '') : s;
+  }
 
   // UI 元素
   const projectListEl = document.getElementById('project-list');
@@ -87,34 +123,35 @@ document.addEventListener('DOMContentLoaded', () => {
     });
   }
 
+
   // 渲染项目列表
-  function renderProjectList(items) {
+  function renderProjectList(items, offset = 0) {
     projectListEl.innerHTML = '';
+    projectCountEl.textContent = `${projectTotal} 个`;
     if (!items || items.length === 0) {
       projectListEl.innerHTML = '<div class="text-sm text-gray-500 py-8 text-center">暂无项目</div>';
-      projectCountEl.textContent = '0 个';
       return;
     }
-    projectCountEl.textContent = `${items.length} 个`;
     const projUrl = (document.getElementById('project-btn')?.dataset.projectUrl) || '/project';
     items.forEach((p, idx) => {
       const el = document.createElement('div');
       el.className = 'py-3 px-2 cursor-pointer list-hover';
       const hash = encodeURIComponent(p.file_hash || '');
+      const count = p.chains ? p.chains.length : (p.chain_count || 0);
       el.innerHTML = `
         <div class="flex items-center justify-between">
           <div>
             <div class="text-sm font-medium text-gray-900">${p.name}</div>
-            <div class="text-xs text-gray-500 mt-0.5">语言：${p.language} · 链：${p.chains?.length || 0}</div>
+            <div class="text-xs text-gray-500 mt-0.5">语言：${p.language} · 链：${count}</div>
           </div>
           <div class="flex items-center gap-2">
             <a class="text-primary text-xs hover:text-accent" href="${projUrl}?hash=${hash}" onclick="event.stopPropagation()">
               <i class="fa fa-list-alt mr-0.5"></i> 项目分析
             </a>
-            <div class="chip">${idx + 1}</div>
+            <div class="chip">${offset + idx + 1}</div>
           </div>
         </div>`;
-      el.addEventListener('click', () => selectProject(p));
+      el.addEventListener('click', () => selectProject(p, el));
       projectListEl.appendChild(el);
     });
   }
@@ -196,11 +233,12 @@ document.addEventListener('DOMContentLoaded', () => {
     // （如果你文件中还有 container.addEventListener('mousemove', ...) 相关代码，直接移除）
   }
 
-  function renderGraph(project, chainIdx = 0) {
+  // graphs: 要显示的链的图谱，useAll 为 true 时合并显示
+  function renderGraph(project, graphs, useAll = false) {
     const container = document.getElementById('graph');
     const sk = document.getElementById('graph-skeleton');
 
-    if (!project || !project.chains || project.chains.length === 0) {
+    if (!project || !graphs || graphs.length === 0) {
       graphTitleEl.textContent = '（无数据）';
       graphMetaEl.textContent = '0 节点 · 0 边';
       container.innerHTML = '<div class="h-full flex items-center justify-center text-gray-400">暂无调用链</div>';
@@ -208,7 +246,6 @@ document.addEventListener('DOMContentLoaded', () => {
     }
     graphTitleEl.textContent = `${project.name}`;
 
-  const useAll = (chainIdx === 'all');
   // 大图合并时显示骨架屏，提升感知速度
   if (sk) sk.classList.toggle('hidden', !useAll);
     let nodes, edges;
@@ -219,7 +256,7 @@ document.addEventListener('DOMContentLoaded', () => {
       const edgePairs = [];
       const typeRank = { 'entry': 2, 'gadget': 1, 'sink': 0 };
 
-      project.chains.forEach(ch => {
+      graphs.forEach(ch => {
         const localIdToLabel = new Map(ch.nodes.map(n => [n.id, n.label]));
         ch.nodes.forEach(n => {
           const key = n.label;
@@ -250,7 +287,7 @@ document.addEventListener('DOMContentLoaded', () => {
         label: e.label
       })));
     } else {
-      const chain = project.chains[chainIdx];
+      const chain = graphs[0];
       nodes = new vis.DataSet(chain.nodes.map(n => ({
         id: n.id, label: (n.short || n.label), title: n.label, color: colorForType(n.type)
       })));
@@ -339,19 +376,28 @@ document.addEventListener('DOMContentLoaded', () => {
 
   if (window.Chart) Chart.register(valueLabelPlugin, centerTextPlugin);
 
-  function computeStats(ps) {
+  // 按语言统计全部项目（来自 /api/projects 的 stats，不受分页与筛选影响）
+  function computeStats() {
     const byLang = {};
-    let totalChains = 0;
-    ps.forEach(p => {
-      byLang[p.language] = (byLang[p.language] || 0) + 1;
-      totalChains += (p.chains?.length || 0);
+    let totalProjects = 0, totalChains = 0;
+    if (sampleMode) {
+      sampleProjects.forEach(p => {
+        byLang[p.language] = (byLang[p.language] || 0) + 1;
+        totalChains += p.chains.length;
+      });
+      return { byLang, totalProjects: sampleProjects.length, totalChains };
+    }
+    Object.entries(projectStats).forEach(([lang, s]) => {
+      byLang[lang] = s.projects;
+      totalProjects += s.projects;
+      totalChains += s.chains;
     });
-    return { byLang, totalProjects: ps.length, totalChains };
+    return { byLang, totalProjects, totalChains };
   }
 
   function updateCharts() {
     if (!window.Chart || !pieCtx || !barCtx) return;
-    const stats = computeStats(projects);
+    const stats = computeStats();
     const labels = Object.keys(stats.byLang);
     const data = Object.values(stats.byLang);
     // 项目主色：与站点主题保持一致（#008080 为主，逐步明亮）
@@ -415,6 +461,7 @@ document.addEventListener('DOMContentLoaded', () => {
     });
   }
 
+
   // 交互
   document.getElementById('fit-btn').addEventListener('click', () => network && network.fit());
   document.getElementById('focus-entry-btn').addEventListener('click', () => {
@@ -423,50 +470,159 @@ document.addEventListener('DOMContentLoaded', () => {
     const entry = nodes.find(n => n.color === '#10b981');
     if (entry) network.focus(entry.id, { scale: 1.2, animation: true });
   });
-  // 删除多余的调试与残留代码，改用统一流程构建下拉
 
-  chainSelect.addEventListener('change', (e) => {
-    const val = e.target.value;
-    renderGraph(currentProject, val === 'all' ? 'all' : parseInt(val, 10));
-  });
+  chainSelect.addEventListener('change', (e) => showChain(e.target.value));
 
-  function selectProject(p) {
-    currentProject = p;
-    // 更新“项目分析”按钮的可用性
-    const projBtn = document.getElementById('project-btn');
-    if (projBtn) {
-      projBtn.disabled = !p?.file_hash;
-      projBtn.classList.toggle('opacity-50', !p?.file_hash);
+  // 加载一页项目，默认选中第一个
+  async function loadProjects(page = 1) {
+    const params = filterParams();
+    params.set('page', String(page));
+    params.set('per_page', String(PROJECT_PAGE_SIZE));
+    let data;
+    try {
+      data = await fetchJSON(`${apiUrl}?${params.toString()}`);
+    } catch (e) {
+      console.warn('load projects failed:', e);
+      return;
+    }
+    projectStats = data.stats || {};
+    projectTotal = data.total || 0;
+    projectPage = data.page || page;
+    let items = data.items || [];
+    // 数据库中还没有任何项目时使用示例数据
+    sampleMode = !Object.keys(projectStats).length;
+    if (sampleMode) {
+      items = sampleProjects;
+      projectTotal = items.length;
+    }
+    renderProjectList(items, (projectPage - 1) * PROJECT_PAGE_SIZE);
+    updatePager('project', projectPage, PROJECT_PAGE_SIZE, projectTotal);
+    updateCharts();
+    if (items.length) {
+      selectProject(items[0], projectListEl.firstElementChild);
+    } else {
+      currentProject = null;
+      chainItems = []; chainTotal = 0;
+      buildChainSelect();
+      updatePager('chain', 1, CHAIN_PAGE_SIZE, 0);
+      renderGraph(null, []);
     }
-    chainSelect.innerHTML = '<option value="all">全部链路</option>';
-    (p.chains || []).forEach((ch, idx) => {
+  }
+
+  function chainsUrl(p) {
+    return `${apiUrl}/${encodeURIComponent(p.file_hash)}/chains`;
+  }
+
+  // 加载当前项目的一页链概要（按入口/Sink 筛选），默认显示第一条链
+  async function loadChains(page = 1) {
+    const p = currentProject;
+    if (!p) return;
+    if (p.chains) {
+      // 示例数据：链已内嵌
+      chainItems = p.chains.map((ch, i) => ({ seq: i, entry: ch.entry, sink: '', graph: ch }));
+      chainTotal = chainItems.length;
+      chainPage = 1;
+    } else {
+      const params = filterParams();
+      params.delete('language');
+      params.set('page', String(page));
+      params.set('per_page', String(CHAIN_PAGE_SIZE));
+      let data;
+      try {
+        data = await fetchJSON(`${chainsUrl(p)}?${params.toString()}`);
+      } catch (e) {
+        console.warn('load chains failed:', e);
+        return;
+      }
+      if (currentProject !== p) return; // 加载期间切换了项目
+      chainQuery = params.toString();
+      chainItems = data.items || [];
+      chainTotal = data.total || 0;
+      chainPage = data.page || page;
+    }
+    buildChainSelect();
+    updatePager('chain', chainPage, CHAIN_PAGE_SIZE, chainTotal);
+    showChain(chainItems.length ? String(chainItems[0].seq) : 'all');
+  }
+
+  function buildChainSelect() {
+    chainSelect.innerHTML = '<option value="all">全部链路（本页）</option>';
+    chainItems.forEach((ch) => {
       const opt = document.createElement('option');
-      opt.value = String(idx);
-      const label = ch.name ? `链 ${idx + 1}: ${ch.name}` : `链 ${idx + 1}: ${ch.entry}`;
-      opt.textContent = label;
-      opt.title = ch.name ? `入口: ${ch.entry}` : label;
+      opt.value = String(ch.seq);
+      const entry = ch.graph ? ch.graph.entry : shortLabel(ch.entry);
+      opt.textContent = `链 ${ch.seq + 1}: ${entry}`;
+      opt.title = ch.sink ? `入口: ${ch.entry}\nSink: ${ch.sink}` : opt.textContent;
       chainSelect.appendChild(opt);
     });
     // 默认只渲染第 1 条链，提升首屏速度
-    if ((p.chains || []).length > 0) {
-      chainSelect.value = '0';
-      const firstOpt = Array.from(chainSelect.options).find(o => o.value === '0');
-      if (chainTrigger && firstOpt) chainTrigger.textContent = firstOpt.textContent;
-    } else {
-      if (chainTrigger) chainTrigger.textContent = '全部链路';
-    }
+    chainSelect.value = chainItems.length ? String(chainItems[0].seq) : 'all';
+    const selected = chainSelect.options[chainSelect.selectedIndex];
+    if (chainTrigger && selected) chainTrigger.textContent = selected.textContent;
     // 重建自定义菜单（会根据当前 selected 高亮）
     rebuildMenuFromSelect();
-    renderGraph(p, (p.chains && p.chains.length) ? 0 : 'all');
-    updateCharts();
   }
 
+  // 显示一条链（按序号）或本页全部链路，图谱在首次查看时才向后端请求
+  async function showChain(val) {
+    const p = currentProject;
+    if (!p) return;
+    let graphs = [];
+    try {
+      if (val === 'all') {
+        if (chainItems.some(ch => !ch.graph)) {
+          const data = await fetchJSON(`${chainsUrl(p)}?${chainQuery}&graph=1`);
+          const bySeq = new Map((data.items || []).map(ch => [ch.seq, ch.graph]));
+          chainItems.forEach(ch => { if (!ch.graph) ch.graph = bySeq.get(ch.seq); });
+        }
+        graphs = chainItems.map(ch => ch.graph).filter(Boolean);
+      } else {
+        const item = chainItems.find(ch => String(ch.seq) === String(val));
+        if (item) {
+          if (!item.graph) item.graph = await fetchJSON(`${chainsUrl(p)}/${item.seq}`);
+          graphs = [item.graph];
+        }
+      }
+    } catch (e) {
+      console.warn('load chain graph failed:', e);
+    }
+    if (currentProject !== p) return;
+    renderGraph(p, graphs, val === 'all');
+  }
+
+  function selectProject(p, el) {
+    currentProject = p;
+    Array.from(projectListEl.children).forEach(c => c.classList.toggle('list-active', c === el));
+    // 更新“项目分析”按钮的可用性
+    const projBtn = document.getElementById('project-btn');
+    if (projBtn) {
+      projBtn.disabled = !p?.file_hash;
+      projBtn.classList.toggle('opacity-50', !p?.file_hash);
+    }
+    chainItems = [];
+    buildChainSelect();
+    loadChains(1);
+  }
+
+  // 筛选与分页
+  if (filterForm) {
+    let timer = null;
+    const reload = () => { clearTimeout(timer); timer = setTimeout(() => loadProjects(1), 300); };
+    filterForm.addEventListener('input', reload);
+    filterForm.addEventListener('change', reload);
+    filterForm.addEventListener('submit', (e) => { e.preventDefault(); loadProjects(1); });
+  }
+  document.getElementById('project-prev')?.addEventListener('click', () => loadProjects(projectPage - 1));
+  document.getElementById('project-next')?.addEventListener('click', () => loadProjects(projectPage + 1));
+  document.getElementById('chain-prev')?.addEventListener('click', () => loadChains(chainPage - 1));
+  document.getElementById('chain-next')?.addEventListener('click', () => loadChains(chainPage + 1));
+
     // 在线审计
     const auditBtn = document.getElementById('audit-btn');
     if (auditBtn) {
       auditBtn.addEventListener('click', () => {
         if (!currentProject) return;
-        let idx = 0;
+        let idx = chainItems.length ? chainItems[0].seq : 0;
         if (chainSelect && chainSelect.value !== 'all') {
           idx = parseInt(chainSelect.value, 10) || 0;
         }
@@ -491,14 +647,7 @@ document.addEventListener('DOMContentLoaded', () => {
       });
     }
 
-  // 初始化
-  let currentProject = null;
-  renderProjectList(projects);
-  if (projects.length) {
-    selectProject(projects[0]);
-    updateCharts();
-  }
-
-  // 初次生成菜单（即使没有项目也不会报错）
+  // 初始化（即使没有项目也生成菜单，不会报错）
   rebuildMenuFromSelect();
-});
\ No newline at end of file
+  loadProjects(1);
+});
@@ -3,4 +3,17 @@ workers = 4
 worker_class = "gevent"
 preload_app = True
 max_requests = 1000
-timeout = 120
\ No newline at end of file
+timeout = 120
+
+def post_fork(server, worker):
+    # preload_app 模式下应用在 master 中加载，调度线程需要在每个 worker fork 之后启动
+    from app import scheduler, jdk_sources
+    scheduler.start()
+    jdk_sources.start()
+
+def pre_request(worker, req):
+    # worker 按 max_requests 重启时会中断其领取的扫描（调度器结束遗留的扫描进程后重新入队）
+    # 和正在进行的 JDK 反编译，有扫描或 JDK 反编译在运行时推迟重启，结束后的下一个请求再重启
+    from app import scheduler, jdk_sources
+    if (scheduler.busy() or jdk_sources.busy()) and worker.max_requests:
+        worker.nr = min(worker.nr, worker.max_requests - 2)
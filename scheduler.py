@@ -0,0 +1,195 @@
+import os
+import sys
+import time
+import signal
+import threading
+import traceback
+from database import *
+from admission import AdmissionController, process_tree_rss_mb
+
+# 以下配置在创建调度器时从环境变量读取（app.py 会先加载 .env）
+# GCSCAN_JAVA_WORKERS / GCSCAN_PHP_WORKERS：各语言同时运行的扫描数量上限，
+#   所有 gunicorn worker 共享，由 results.db 中的 jobs 表保证
+# GCSCAN_POLL_INTERVAL：轮询队列的间隔（秒），其它 worker 入队的任务最迟在一个间隔后被领取
+# GCSCAN_MAX_ATTEMPTS：同一任务因 worker 意外退出被重新入队的最大次数，
+#   避免反复拖垮服务的任务无限重试
+
+# 结束遗留的扫描进程时，SIGTERM 后等待其退出的时间（秒），超时后 SIGKILL
+KILL_GRACE = 10
+
+
+def _proc_stat(pid):
+    """/proc/<pid>/stat 中的 (状态, 启动时间)，启动时间为系统启动后的时钟滴答数；无法读取时返回 None"""
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            stat = f.read()
+        # 进程名可能包含空格和括号，从最后一个 ')' 之后开始解析
+        fields = stat[stat.rindex(')') + 2:].split()
+        return fields[0], int(fields[19])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def process_start_time(pid):
+    """进程的启动时间，与 pid 一起记录，用于识别被系统复用的 pid；无法读取时返回 None"""
+    stat = _proc_stat(pid) if pid else None
+    return stat[1] if stat is not None else None
+
+
+def pid_alive(pid, start_time=None):
+    """进程是否仍在运行；给出 start_time 时，pid 已被其它进程复用也视为已退出"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    except OSError:
+        return False
+    stat = _proc_stat(pid)
+    if stat is None:
+        return True
+    state, started = stat
+    # 已退出、尚未被回收的僵尸进程
+    if state in ('Z', 'X'):
+        return False
+    return start_time is None or started == start_time
+
+
+def kill_scan(pid, start_time=None, grace=KILL_GRACE):
+    """结束遗留的扫描进程及其子进程并等待其退出。
+
+    扫描子进程以新的会话启动（进程组号即 pid），领取任务的 worker 退出后仍会继续运行；
+    重新入队前须先结束它，否则新的扫描会与之同时写入同一个输出目录。
+    """
+    # 无法确认启动时间时，pid 可能已被无关的进程复用，不发送信号
+    if start_time is None or not pid_alive(pid, start_time):
+        return
+    for sig, wait in ((signal.SIGTERM, grace), (signal.SIGKILL, grace)):
+        try:
+            os.killpg(pid, sig)
+        except ProcessLookupError:
+            return
+        except OSError:
+            # 旧版本启动的扫描没有独立的进程组
+            try:
+                os.kill(pid, sig)
+            except OSError:
+                return
+        deadline = time.time() + wait
+        while time.time() < deadline:
+            if not pid_alive(pid, start_time):
+                return
+            time.sleep(0.2)
+    print(f'[warning] 扫描进程 {pid} 未能结束')
+
+
+class JobScheduler:
+    """持久化的分析任务调度器。
+
+    上传接口只负责把任务写入 jobs 表；每个 worker 进程内的调度线程按语言的并发上限
+    从队列中领取任务，并在独立线程中调用 runner(job) 完成扫描。
+    任务状态保存在 results.db 中，worker 重启后仍处于 queued 的任务会被继续调度，
+    而领取者进程已经退出的 running 任务在结束其遗留的扫描进程后重新放回队列。
+    领取任务前还需要通过 AdmissionController 的内存准入检查。
+    """
+
+    def __init__(self, runner, limits=None, poll_interval=None, admission=None):
+        self.runner = runner
+        self.admission = admission or AdmissionController()
+        self.limits = limits or {
+            'Java': int(os.environ.get('GCSCAN_JAVA_WORKERS', 1)),
+            'PHP': int(os.environ.get('GCSCAN_PHP_WORKERS', 2)),
+        }
+        if poll_interval is None:
+            poll_interval = float(os.environ.get('GCSCAN_POLL_INTERVAL', 3))
+        self.poll_interval = poll_interval
+        self.max_attempts = int(os.environ.get('GCSCAN_MAX_ATTEMPTS', 3))
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._start_time = None
+        self._active = 0
+
+    def start(self):
+        """在当前进程中启动调度线程（可重复调用，fork 后的子进程会重新启动）"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._start_time = process_start_time(self._pid)
+            self._active = 0
+        t = threading.Thread(target=self._dispatch_loop, daemon=True)
+        t.start()
+
+    def submit(self, file_hash, filename, lang, project_path):
+        mem_estimate, heap_mb = self.admission.estimate(lang, project_path)
+        db_enqueue_job(file_hash, filename, lang, project_path, mem_estimate, heap_mb)
+        self._wakeup.set()
+
+    def busy(self):
+        """本进程是否有正在运行的扫描"""
+        return self._active > 0
+
+    def _dispatch_loop(self):
+        while True:
+            try:
+                self.requeue_orphans()
+                self.track_memory()
+                self.dispatch()
+            except Exception:
+                traceback.print_exc()
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def requeue_orphans(self):
+        """领取者进程已不存在（或 pid 已被复用）的 running 任务，结束其遗留的扫描进程后
+        重新入队（超过重试次数则标记失败）"""
+        for job in db_running_jobs():
+            if pid_alive(job['owner_pid'], job['owner_start']):
+                continue
+            kill_scan(job['scan_pid'], job['scan_start'])
+            if job['attempts'] >= self.max_attempts:
+                db_requeue_job(job['id'], 'failed')
+                db_fail_analyze(job['file_hash'])
+                print(f"{job['filename']} 多次中断，放弃分析")
+            else:
+                db_requeue_job(job['id'])
+                print(f"{job['filename']} 重新加入分析队列")
+            sys.stdout.flush()
+
+    def track_memory(self):
+        """按扫描进程树的实际 RSS 上调本进程所领取任务的内存预留"""
+        for job in db_running_jobs():
+            if job['owner_pid'] != os.getpid() or not job['scan_pid']:
+                continue
+            rss = process_tree_rss_mb(job['scan_pid'])
+            reserved = max(job['mem_estimate'] or 0, rss)
+            if reserved != job['mem_reserved']:
+                db_update_job_memory(job['id'], reserved)
+
+    def dispatch(self):
+        for lang, limit in self.limits.items():
+            while True:
+                job = db_claim_job(lang, limit, os.getpid(), self.admission.admit, self._start_time)
+                if job is None:
+                    break
+                with self._lock:
+                    self._active += 1
+                t = threading.Thread(target=self._run, args=(job,), daemon=True)
+                t.start()
+
+    def _run(self, job):
+        status = 'done'
+        try:
+            self.runner(job)
+        except Exception:
+            traceback.print_exc()
+            status = 'failed'
+            db_fail_analyze(job['file_hash'])
+        db_finish_job(job['id'], status)
+        with self._lock:
+            self._active -= 1
+        self._wakeup.set()
@@ -0,0 +1,298 @@
+'''
+POP链状态的撤销日志
+
+call_possible_methods、call_implement_methods需要在同一个POP链状态上依次尝试多个候选类，
+每个分支执行完后要恢复到分支开始前的状态，贪心法选中的分支的最终状态再作用到当前状态上。
+
+分支开始时调用checkpoint()，之后第一次修改某个"旧"对象或容器（在当前检查点之前创建）时，
+记录它的浅拷贝快照；分支结束时rollback()按快照逆序恢复。分支内新建的对象在回滚后不再被状态引用，
+不需要记录。因此一次分支的代价只与它实际修改过的对象数量相关，而不是整个状态的大小。
+'''
+
+from collections import OrderedDict
+
+
+class Journal:
+    '''
+    - .epoch: 单调递增的计数，对象创建时记录当前值
+    - .level: 最内层检查点的epoch，epoch小于它的对象是旧对象，修改前需要记录快照
+    - .log: 快照记录 [(对象, 快照, 原记录标记), ...]
+    - .marks: 检查点栈 [(log长度, 外层level), ...]
+    '''
+
+    def __init__(self):
+        self.epoch = 0
+        self.level = 0
+        self.log = []
+        self.marks = []
+
+    def checkpoint(self):
+        '''
+        开始一个分支，可以嵌套
+        '''
+        self.epoch += 1
+        self.marks.append((len(self.log), self.level))
+        self.level = self.epoch
+
+    def touch(self, obj):
+        '''
+        obj即将被修改，旧对象在当前检查点内第一次修改时记录快照
+        '''
+        d = obj.__dict__
+        if d['_epoch'] < self.level and d['_jmark'] != self.level:
+            self.log.append((obj, obj._snapshot(), d['_jmark']))
+            d['_jmark'] = self.level
+
+    def rollback(self, keep_redo=False):
+        '''
+        回滚到最近的检查点
+        keep_redo为True时，返回分支修改过的对象在回滚前的最终状态，可用replay()重新作用到状态上
+        '''
+        start, outer = self.marks.pop()
+        entries = self.log[start:]
+        del self.log[start:]
+
+        redo = None
+        if keep_redo:
+            redo = []
+            saved = set()
+            for obj, _, _ in entries:
+                if id(obj) not in saved:
+                    saved.add(id(obj))
+                    redo.append((obj, obj._snapshot()))
+
+        for obj, state, mark in reversed(entries):
+            obj._restore(state)
+            obj.__dict__['_jmark'] = mark
+
+        self.level = outer
+        return redo
+
+    def replay(self, redo):
+        '''
+        将rollback(keep_redo=True)得到的最终状态作用到当前状态上（在外层检查点中同样会被记录）
+        '''
+        for obj, state in redo:
+            self.touch(obj)
+            mark = obj.__dict__['_jmark']
+            obj._restore(state)
+            obj.__dict__['_jmark'] = mark
+
+
+journal = Journal()
+
+
+def _init_journaled(obj):
+    d = obj.__dict__
+    d['_epoch'] = journal.epoch
+    d['_jmark'] = -1
+
+
+class JournaledObject:
+    '''
+    修改属性前记录快照的对象
+    '''
+
+    def __new__(cls, *args, **kwargs):
+        obj = object.__new__(cls)
+        _init_journaled(obj)
+        return obj
+
+    def __setstate__(self, state):
+        # 复制得到的是新对象
+        self.__dict__.update(state)
+        _init_journaled(self)
+
+    def __setattr__(self, name, value):
+        journal.touch(self)
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        journal.touch(self)
+        object.__delattr__(self, name)
+
+    def _snapshot(self):
+        return self.__dict__.copy()
+
+    def _restore(self, state):
+        d = self.__dict__
+        d.clear()
+        d.update(state)
+
+
+class JournaledDict(dict):
+    '''
+    修改前记录快照的dict，用于对象的属性字典
+    '''
+
+    def __new__(cls, *args, **kwargs):
+        obj = dict.__new__(cls)
+        _init_journaled(obj)
+        return obj
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        _init_journaled(self)
+
+    def __setitem__(self, key, value):
+        journal.touch(self)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        journal.touch(self)
+        dict.__delitem__(self, key)
+
+    def __ior__(self, other):
+        journal.touch(self)
+        return dict.__ior__(self, other)
+
+    def pop(self, *args):
+        journal.touch(self)
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        journal.touch(self)
+        return dict.popitem(self)
+
+    def clear(self):
+        journal.touch(self)
+        dict.clear(self)
+
+    def update(self, *args, **kwargs):
+        journal.touch(self)
+        dict.update(self, *args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        journal.touch(self)
+        return dict.setdefault(self, key, default)
+
+    def _snapshot(self):
+        return dict.copy(self)
+
+    def _restore(self, state):
+        dict.clear(self)
+        dict.update(self, state)
+
+
+class JournaledOrderedDict(OrderedDict):
+    '''
+    修改前记录快照的OrderedDict，用于PHPArray的元素（需要保留顺序）
+    '''
+
+    def __new__(cls, *args, **kwargs):
+        obj = OrderedDict.__new__(cls)
+        _init_journaled(obj)
+        return obj
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        _init_journaled(self)
+
+    def __setitem__(self, key, value):
+        journal.touch(self)
+        OrderedDict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        journal.touch(self)
+        OrderedDict.__delitem__(self, key)
+
+    def __ior__(self, other):
+        journal.touch(self)
+        return OrderedDict.__ior__(self, other)
+
+    def pop(self, *args):
+        journal.touch(self)
+        return OrderedDict.pop(self, *args)
+
+    def popitem(self, last=True):
+        journal.touch(self)
+        return OrderedDict.popitem(self, last)
+
+    def clear(self):
+        journal.touch(self)
+        OrderedDict.clear(self)
+
+    def update(self, *args, **kwargs):
+        journal.touch(self)
+        OrderedDict.update(self, *args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        journal.touch(self)
+        return OrderedDict.setdefault(self, key, default)
+
+    def move_to_end(self, key, last=True):
+        journal.touch(self)
+        OrderedDict.move_to_end(self, key, last)
+
+    def _snapshot(self):
+        return list(OrderedDict.items(self))
+
+    def _restore(self, state):
+        OrderedDict.clear(self)
+        for key, value in state:
+            OrderedDict.__setitem__(self, key, value)
+
+
+class JournaledList(list):
+    '''
+    修改前记录快照的list，用于POPInfo中的调用栈
+    '''
+
+    def __new__(cls, *args, **kwargs):
+        obj = list.__new__(cls)
+        _init_journaled(obj)
+        return obj
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        _init_journaled(self)
+
+    def __setitem__(self, index, value):
+        journal.touch(self)
+        list.__setitem__(self, index, value)
+
+    def __delitem__(self, index):
+        journal.touch(self)
+        list.__delitem__(self, index)
+
+    def __iadd__(self, other):
+        journal.touch(self)
+        return list.__iadd__(self, other)
+
+    def append(self, value):
+        journal.touch(self)
+        list.append(self, value)
+
+    def extend(self, values):
+        journal.touch(self)
+        list.extend(self, values)
+
+    def insert(self, index, value):
+        journal.touch(self)
+        list.insert(self, index, value)
+
+    def pop(self, *args):
+        journal.touch(self)
+        return list.pop(self, *args)
+
+    def remove(self, value):
+        journal.touch(self)
+        list.remove(self, value)
+
+    def clear(self):
+        journal.touch(self)
+        list.clear(self)
+
+    def sort(self, *args, **kwargs):
+        journal.touch(self)
+        list.sort(self, *args, **kwargs)
+
+    def reverse(self):
+        journal.touch(self)
+        list.reverse(self)
+
+    def _snapshot(self):
+        return list(self)
+
+    def _restore(self, state):
+        list.__setitem__(self, slice(None), state)
@@ -33,6 +33,8 @@ def exit_handler(signum, frame):
     '''
     捕获ctrl c
     '''
+    # 写入缓冲中已找到的链
+    result_writer.flush()
     if graph_gen:
         print('[message] Call Graph generating...')
         cg_collector.save2neo4j()
@@ -49,6 +51,35 @@ signal.signal(signal.SIGINT, exit_handler)
 signal.signal(signal.SIGTERM, exit_handler)
 
 
+# AST结点类型 -> ASTExecutor中对应的处理方法
+node_handlers = {}
+
+
+def handles(*node_types):
+    '''
+    将ASTExecutor的方法注册为指定类型AST结点的处理方法，execute_ast按结点类型直接分发
+    '''
+    def register(func):
+        for node_type in node_types:
+            node_handlers[node_type] = func
+        return func
+    return register
+
+
+# sink表的检查方式 -> ASTExecutor中对应的检查方法
+sink_check_handlers = {}
+
+
+def sink_check(check):
+    '''
+    将ASTExecutor的方法注册为sink表中一种检查方式的检查方法
+    '''
+    def register(func):
+        sink_check_handlers[check] = func
+        return func
+    return register
+
+
 class ASTExecutor:
 
     cur_key = ''  # 当前key值
@@ -94,9 +125,7 @@ class ASTExecutor:
                     if attr not in inst.attr:
                         inst.attr[attr] = ControllableInstance()
                         # 记录root index
-                        tmp_index = copy.copy(inst.index)
-                        tmp_index.append('attr:'+attr)
-                        inst.attr[attr].index = tmp_index
+                        inst.attr[attr].index = inst.index + (attr_step(attr),)
 
                 if inst == None:
                     return None
@@ -166,209 +195,90 @@ class ASTExecutor:
         if type(funcname) != str:
             return
 
-        # 任意文件读取
-        if funcname in file_read_func:
-            if type(par_li[0]) == ControllableInstance:
-                par_li[0] = self.tostr(par_li[0], node.params[0].node)
-            if type(par_li[0]) != str:
-                return
-            if 'SOURCE_TOKEN' in par_li[0]:
-                self.pop_log_report('任意文件读取(Arbitrary file reading)', node)
-
-        # 任意文件读取2
-        if funcname == 'fread':
-            if type(par_li[0]) == ControllableInstance:
-                self.pop_log_report('任意文件读取(Arbitrary file reading)', node)
-
-        # 任意文件删除
-        elif funcname in file_del_func:
-            if type(par_li[0]) == ControllableInstance:
-                par_li[0] = self.tostr(par_li[0], node.params[0].node)
-            if type(par_li[0]) != str:
-                return
-            if 'SOURCE_TOKEN' in par_li[0]:
-                self.pop_log_report('任意文件删除(Arbitrary file deletion)', node)
-
-        # 文件敏感操作1
-        elif funcname in file_sensitive_func1:
-            if type(par_li[0]) == ControllableInstance:
-                par_li[0] = self.tostr(par_li[0], node.params[0].node)
-            if type(par_li[0]) != str:
-                return
-            if 'SOURCE_TOKEN' in par_li[0]:
-                self.pop_log_report('文件敏感操作(File sensitive operation)', node)
-
-        # 文件敏感操作2
-        elif funcname in file_sensitive_func2:
-            for i in range(2):
-                if type(par_li[i]) == ControllableInstance:
-                    par_li[i] = self.tostr(par_li[i], node.params[i].node)
-                if type(par_li[i]) != str:
-                    return
-            if 'SOURCE_TOKEN' in par_li[0] and 'SOURCE_TOKEN' in par_li[1]:
-                self.pop_log_report('文件敏感操作(File sensitive operation)', node)
-
-        # 代码执行
-        elif funcname in code_rce:
-            if type(par_li[0]) == ControllableInstance:
-                par_li[0] = self.tostr(par_li[0], node.params[0].node)
-            if type(par_li[0]) != str:
-                return
-            if 'SOURCE_TOKEN' in par_li[0]:
-                self.pop_log_report(
-                    '任意代码执行(Arbitrary code execution)', node)
-
-        # preg_replace代码执行
-        elif funcname == 'preg_replace':
-            for i in range(2):
-                if type(par_li[i]) == ControllableInstance:
-                    par_li[i] = self.tostr(par_li[i], node.params[i].node)
-                if type(par_li[i]) != str:
-                    return
-            if 'SOURCE_TOKEN' in par_li[0] and 'SOURCE_TOKEN' in par_li[1]:
-                self.pop_log_report(
-                    'Preg_replace任意代码执行(Preg_replace arbitrary code execution)', node)
-
-        # preg_replace_callback代码执行
-        elif funcname == 'preg_replace_callback':
-            for i in range(1, 3):
-                if type(par_li[i]) == ControllableInstance:
-                    par_li[i] = self.tostr(par_li[i], node.params[i].node)
-                if type(par_li[i]) != str:
-                    return
-            if 'SOURCE_TOKEN' in par_li[1] and 'SOURCE_TOKEN' in par_li[2]:
-                self.pop_log_report(
-                    'Preg_replace_callback任意代码执行(Preg_replace_callback arbitrary code execution)', node)
-
-        # 系统命令注入
-        elif funcname in sys_rce:
-            if type(par_li[0]) == ControllableInstance:
-                par_li[0] = self.tostr(par_li[0], node.params[0].node)
-            if type(par_li[0]) != str:
-                return
-            if 'SOURCE_TOKEN' in par_li[0]:
-                self.pop_log_report('系统命令注入(Command injection)', node)
-
-        # mail参数注入
-        elif funcname == 'mail':
-            if len(par_li) > 4:
-                if type(par_li[4]) == ControllableInstance:
-                    par_li[4] = self.tostr(par_li[4], node.params[4].node)
-                if 'SOURCE_TOKEN' in par_li[4]:
-                    self.pop_log_report(
-                        'mail()选项注入(mail() options injection)', node)
-
-        # 任意文件写入
-        elif funcname == 'file_put_contents':
-            for i in range(2):
-                if type(par_li[i]) == ControllableInstance:
-                    par_li[i] = self.tostr(par_li[i], node.params[i].node)
-                if type(par_li[i]) != str:
-                    return
+        # 一次查表得到漏洞类型、污点参数位置和检查方法
+        sink = sink_dispatch.get(funcname)
+        if sink is None:
+            # 代码执行2
+            if 'SOURCE_TOKEN' in funcname:
+                self.pop_log_report('任意函数调用(Arbitrary function called)', node)
+            return
 
-            if type(par_li[1]) == str and 'SOURCE_TOKEN' in par_li[1]:
-                if 'SOURCE_TOKEN' in par_li[0] or par_li[0][-4:] == '.php':
-                    self.pop_log_report(
-                        '任意文件写入(Arbitrary file write)', node)
+        vtype, args, check = sink
+        if max(args) >= len(par_li):
+            return
+        check(self, vtype, args, par_li, node)
 
-        elif funcname == 'simplexml_load_string':  # XXE1
-            if type(par_li[0]) == ControllableInstance:
-                par_li[0] = self.tostr(par_li[0], node.params[0].node)
-            if type(par_li[0]) != str:
-                return
-            if 'SOURCE_TOKEN' in par_li[0]:
-                self.pop_log_report('XXE', node)
+    def sink_str_args(self, args, par_li, node):
+        '''
+        依次将污点参数转为字符串（原地替换par_li中的参数），有参数不是字符串时返回False
+        '''
+        for i in args:
+            if type(par_li[i]) == ControllableInstance:
+                par_li[i] = self.tostr(par_li[i], node.params[i].node)
+            if type(par_li[i]) != str:
+                return False
+        return True
+
+    @sink_check('tainted')
+    def check_sink_tainted(self, vtype, args, par_li, node):
+        if not self.sink_str_args(args, par_li, node):
+            return
+        if all('SOURCE_TOKEN' in par_li[i] for i in args):
+            self.pop_log_report(vtype, node)
 
-        elif funcname == 'simplexml_load_file':  # XXE2
-            if type(par_li[0]) == ControllableInstance:
-                par_li[0] = self.tostr(par_li[0], node.params[0].node)
-            if type(par_li[0]) != str:
-                return
-            if 'SOURCE_TOKEN' in par_li[0]:
-                self.pop_log_report('XXE', node)
-
-        # ssrf 1
-        elif funcname in ssrf_func:
-            if type(par_li[0]) == ControllableInstance:
-                par_li[0] = self.tostr(par_li[0], node.params[0].node)
-            if type(par_li[0]) != str:
-                return
-            if 'SOURCE_TOKEN' in par_li[0]:
-                self.pop_log_report('SSRF', node)
-
-        # SQL注入
-        elif funcname in sqli_func2:
-            if type(par_li[0]) == ControllableInstance:
-                par_li[0] = self.tostr(par_li[0], node.params[0].node)
-            if type(par_li[0]) != str:
-                return
-            if 'SOURCE_TOKEN' in par_li[0]:
-                self.pop_log_report('SQL注入(SQL injection)', node)
-
-        # XSS
-        elif funcname in xss_func:
-            if type(par_li[0]) == ControllableInstance:
-                par_li[0] = self.tostr(par_li[0], node.params[0].node)
-            if type(par_li[0]) != str:
-                return
-            if 'SOURCE_TOKEN' in par_li[0]:
-                # 去掉print_r(xxx, True) 的情况
-                if len(par_li) == 1 or not par_li[1]:
-                    self.pop_log_report('XSS', node)
-
-        # 文件上传
-        # 第二个参数（目标文件名）可控或者结尾是php，则能够上传php文件
-        elif funcname == 'move_uploaded_file':
-            if type(par_li[1]) == ControllableInstance:
-                par_li[1] = self.tostr(par_li[1], node.params[1].node)
-            if type(par_li[1]) != str:
-                return
-            if 'SOURCE_TOKEN' in par_li[1] or par_li[1][-4:] == '.php':
-                self.pop_log_report('文件上传(File uploading)', node)
-
-        # 代码执行2
-        elif 'SOURCE_TOKEN' in funcname:
-            self.pop_log_report('任意函数调用(Arbitrary function called)', node)
-
-        # SQL注入
-        elif funcname in sqli_func:
-            if type(par_li[1]) == ControllableInstance:
-                par_li[1] = self.tostr(par_li[1], node.params[1].node)
-            if type(par_li[1]) != str:
+    @sink_check('xss')
+    def check_sink_xss(self, vtype, args, par_li, node):
+        if not self.sink_str_args(args, par_li, node):
+            return
+        if all('SOURCE_TOKEN' in par_li[i] for i in args):
+            # 去掉print_r(xxx, True) 的情况
+            if len(par_li) == 1 or not par_li[1]:
+                self.pop_log_report(vtype, node)
+
+    @sink_check('file_write')
+    def check_sink_file_write(self, vtype, args, par_li, node):
+        if not self.sink_str_args(args, par_li, node):
+            return
+        filename = par_li[args[0]]
+        # 文件内容可控，且文件名可控或者结尾是php
+        if all('SOURCE_TOKEN' in par_li[i] for i in args[1:]):
+            if 'SOURCE_TOKEN' in filename or filename[-4:] == '.php':
+                self.pop_log_report(vtype, node)
+
+    @sink_check('controllable')
+    def check_sink_controllable(self, vtype, args, par_li, node):
+        if any(type(par_li[i]) == ControllableInstance for i in args):
+            self.pop_log_report(vtype, node)
+
+    @sink_check('file_handle')
+    def check_sink_file_handle(self, vtype, args, par_li, node):
+        handle, content = args
+
+        if type(par_li[handle]) == ControllableInstance:
+            if not self.sink_str_args((content,), par_li, node):
                 return
-            if 'SOURCE_TOKEN' in par_li[1]:
-                self.pop_log_report('SQL注入(SQL injection)', node)
+            if 'SOURCE_TOKEN' in par_li[content]:
+                self.pop_log_report(vtype, node)
 
-        # 任意文件写入2
-        elif funcname == 'fputs' or funcname == 'fwrite':
+        elif type(par_li[handle]) == PHPInstance:
+            t_filename = par_li[handle].attr['filename']
+            # 文件名可控
+            if 'SOURCE_TOKEN' in t_filename or t_filename[-4:] == '.php':
+                # 文件内容可控
+                if 'SOURCE_TOKEN' in par_li[content]:
+                    self.pop_log_report(vtype, node)
 
-            if type(par_li[0]) == ControllableInstance:
-                if type(par_li[1]) == ControllableInstance:
-                    par_li[1] = self.tostr(par_li[1], node.params[1].node)
-                if type(par_li[1]) != str:
-                    return
-                if 'SOURCE_TOKEN' in par_li[1]:
-                    self.pop_log_report('任意文件写入(Arbitrary file write)', node)
+    @sink_check('curl_handle')
+    def check_sink_curl_handle(self, vtype, args, par_li, node):
+        handle = args[0]
 
-            elif type(par_li[0]) == PHPInstance:
-                t_filename = par_li[0].attr['filename']
-                # 文件名可控
-                if 'SOURCE_TOKEN' in t_filename or t_filename[-4:] == '.php':
-                    # 文件内容可控
-                    if 'SOURCE_TOKEN' in par_li[1]:
-                        self.pop_log_report(
-                            '任意文件写入(Arbitrary file write)', node)
+        if type(par_li[handle]) == ControllableInstance:
+            self.pop_log_report(vtype, node)
 
-        # ssrf 2
-        elif funcname == 'curl_exec':
-
-            if type(par_li[0]) == ControllableInstance:
-                self.pop_log_report('SSRF', node)
-
-            elif type(par_li[0]) == PHPInstance:
-                tmp_attr = par_li[0].attr
-                if 'SOURCE_TOKEN' in tmp_attr['url']:
-                    self.pop_log_report('SSRF', node)
+        elif type(par_li[handle]) == PHPInstance:
+            tmp_attr = par_li[handle].attr
+            if 'SOURCE_TOKEN' in tmp_attr['url']:
+                self.pop_log_report(vtype, node)
 
     def call_func(self, funcname, par_li, node):
         '''
@@ -784,7 +694,7 @@ class ASTExecutor:
         '''
         根据方法名和参数个数，调用可能的方法
         存在并行执行（但在方法执行内部已经申请了新AST执行器了，这里不需要再申请）
-        会在原receiver的复制体上进行
+        各分支在当前POP链信息上执行，执行后通过journal回滚
         此外，如果外层需要返回值，则在本方法中就要把返回值对应的receiver和key都赋值成对应的值
         '''
         ret_val = None
@@ -889,15 +799,11 @@ class ASTExecutor:
             if tmp not in next_classes_normal:
                 next_classes.insert(0, tmp)
 
-        # target上下文
-        if len(next_classes) > 0:
-            pop_dict['target'] = copy.deepcopy(
-                pop_dict[self.cur_key])  # 复制POP链信息
-            pop_dict['target'].root.key = 'target'
-
         # 调用每个可能的方法，贪心法获取可控的返回值
-        # 执行在复制体上进行，meet之后的返回值对应的root储存到当前root
+        # 各分支都在当前POP链信息上执行，执行前设置journal检查点，执行后回滚，
+        # meet的分支在回滚前保留其最终状态，全部分支结束后再作用到当前状态上
         ret_prior = 0  # 初始化返回值优先级
+        target_redo = None  # meet分支的最终状态
         for i in range(len(next_classes)):
             if methodname in class_dict[next_classes[i]]:
                 realname = methodname
@@ -914,54 +820,56 @@ class ASTExecutor:
 
             # 新建key的主要目的：在向内执行方法的时候，会对可控对象进行修改，
             # 在这里为了保留可控变量，需要新建key；对于其他调用魔术方法的情况同样需要
-            # 处理时假设向内执行都没有副作用
+            # 处理时假设向内执行都没有副作用（由journal回滚保证）
             new_key = random_string()  # 生成新key
-            pop_dict[new_key] = copy.deepcopy(
-                pop_dict[self.cur_key])  # 复制POP链信息
-            pop_dict[new_key].root.key = new_key
+            journal.checkpoint()
+            pop_dict[new_key] = pop_dict[self.cur_key]
 
             jmp_node[new_key] = copy.copy(jmp_node[self.cur_key])
 
-            # 获取复制后的receiver
-            t_receiver = self.get_inner_inst(receiver.index,
-                                             target_inst=pop_dict[new_key].root)
+            meet = False
+            try:
+                t_receiver = self.get_inner_inst(receiver.index,
+                                                 target_inst=pop_dict[new_key].root)
 
-            # 由于分支执行等情况导致index对应的对象不匹配的情况，需要进行修正
-            if type(t_receiver) != type(receiver):
-                t_ref = self.get_inner_inst(
-                    receiver.index, True, pop_dict[new_key].root)
-                t_ref.ref[t_ref.key] = copy.deepcopy(receiver)
-                t_receiver = t_ref.ref[t_ref.key]
+                # 由于分支执行等情况导致index对应的对象不匹配的情况，需要进行修正
+                if type(t_receiver) != type(receiver):
+                    t_ref = self.get_inner_inst(
+                        receiver.index, True, pop_dict[new_key].root)
+                    t_ref.ref[t_ref.key] = copy.deepcopy(receiver)
+                    t_receiver = t_ref.ref[t_ref.key]
 
-            if type(t_receiver) != ControllableInstance:
-                continue
+                if type(t_receiver) != ControllableInstance:
+                    continue
 
-            # 对receiver的类名进行赋值
-            t_receiver.classname = next_classes[i]
-            try:  # 捕捉异常，防止栈信息因中断导致不弹出
-                tmp_ret = self.call_method(
-                    t_receiver, realname, tmp_par_li, node, new_key)
-            except Exception:
-                pass
-
-            # 贪心法meet
-            tmp_prior = self.get_priority(tmp_ret)  # 获取临时返回值的保留优先级
-            if tmp_prior > ret_prior:  # 优先级高时，meet到target
-                ret_val = tmp_ret
-                pop_dict['target'] = pop_dict[new_key]
-                ret_prior = tmp_prior
-            else:  # 否则不meet
-                pass
+                # 对receiver的类名进行赋值
+                t_receiver.classname = next_classes[i]
+                try:  # 捕捉异常，防止栈信息因中断导致不弹出
+                    tmp_ret = self.call_method(
+                        t_receiver, realname, tmp_par_li, node, new_key)
+                except Exception:
+                    pass
 
-            # 执行结束，删除新key
-            del pop_dict[new_key]
-            del jmp_node[new_key]
+                # 贪心法meet
+                tmp_prior = self.get_priority(tmp_ret)  # 获取临时返回值的保留优先级
+                if tmp_prior > ret_prior:  # 优先级高时，meet到target
+                    ret_val = tmp_ret
+                    ret_prior = tmp_prior
+                    meet = True
+            finally:
+                # 执行结束，回滚分支并删除新key
+                redo = journal.rollback(keep_redo=meet)
+                if meet:
+                    target_redo = redo
+                del pop_dict[new_key]
+                del jmp_node[new_key]
+
+        if target_redo is not None:
+            journal.replay(target_redo)
 
         if len(next_classes) > 0:
-            # target同步到cur_key
-            pop_dict[self.cur_key] = pop_dict['target']
             # 同步局部变量
-            self.update_local_vars('target', self.local_var)
+            self.update_local_vars(self.cur_key, self.local_var)
 
         if firstJmpRM:
             pop_dict[self.cur_key].firstJmpIndex = None
@@ -993,7 +901,7 @@ class ASTExecutor:
         '''
         根据接口类型，调用可能的方法
         存在并行执行（但在方法执行内部已经申请了新AST执行器了，这里不需要再申请）
-        会在原receiver的复制体上进行
+        各分支在当前POP链信息上执行，执行后通过journal回滚
         此外，如果外层需要返回值，则在本方法中就要把返回值对应的receiver和key都赋值成对应的值
         '''
         ret_val = None
@@ -1068,84 +976,76 @@ class ASTExecutor:
         if impl in attr_func_dict:
             next_classes = attr_func_dict[impl]
 
-        # target上下文
-        if len(next_classes) > 0:
-            pop_dict['target'] = copy.deepcopy(
-                pop_dict[self.cur_key])  # 复制POP链信息
-            pop_dict['target'].root.key = 'target'
-
-        # 调用每个可能的方法，贪心法获取可控的返回值
-        # 执行在复制体上进行，meet之后的返回值对应的root储存到当前root
+        # 调用每个可能的方法，各分支都在当前POP链信息上执行，执行后回滚
         for i in range(len(next_classes)):
             # 新建key的主要目的：在向内执行方法的时候，会对可控对象进行修改，
             # 在这里为了保留可控变量，需要新建key；对于其他调用魔术方法的情况同样需要
-            # 处理时假设向内执行都没有副作用
+            # 处理时假设向内执行都没有副作用（由journal回滚保证）
             new_key = random_string()  # 生成新key
-            pop_dict[new_key] = copy.deepcopy(
-                pop_dict[self.cur_key])  # 复制POP链信息
-            pop_dict[new_key].root.key = new_key
+            journal.checkpoint()
+            pop_dict[new_key] = pop_dict[self.cur_key]
 
             jmp_node[new_key] = copy.copy(jmp_node[self.cur_key])
 
-            # 获取复制后的receiver
-            t_receiver = self.get_inner_inst(receiver.index, True,
-                                             target_inst=pop_dict[new_key].root)
+            try:
+                # 获取分支中的receiver
+                t_receiver = self.get_inner_inst(receiver.index, True,
+                                                 target_inst=pop_dict[new_key].root)
 
-            if type(t_receiver) != VarRef:
-                continue
+                if type(t_receiver) != VarRef:
+                    continue
 
-            # implememt相关的receiver比较特殊，比如数组，这里用一个“假”receiver来代替
-            fake_rec = ControllableInstance()
-            fake_rec.index = receiver.index
-            t_receiver.setValue(fake_rec)
+                # implememt相关的receiver比较特殊，比如数组，这里用一个“假”receiver来代替
+                fake_rec = ControllableInstance()
+                fake_rec.index = receiver.index
+                t_receiver.setValue(fake_rec)
 
-            t_receiver = t_receiver.ref[t_receiver.key]
+                t_receiver = t_receiver.ref[t_receiver.key]
 
-            if type(t_receiver) != ControllableInstance:
-                continue
+                if type(t_receiver) != ControllableInstance:
+                    continue
 
-            # 对receiver的类名进行赋值
-            t_receiver.classname = next_classes[i]
+                # 对receiver的类名进行赋值
+                t_receiver.classname = next_classes[i]
 
-            if impl == '!iterator':
-                try:  # 捕捉异常，防止栈信息因中断导致不弹出
-                    # rewind (指针移动到第一个元素)
-                    self.call_method(t_receiver, 'rewind',
-                                     par_li, node, new_key)
-                    # valid（验证当前array是否valid，返回True/False）
-                    valid_res = self.call_method(t_receiver, 'valid',
-                                                 par_li, node, new_key)
-                    if valid_res != False:  # valid结果非False时才继续执行
-                        self.call_method(t_receiver, 'current',
+                if impl == '!iterator':
+                    try:  # 捕捉异常，防止栈信息因中断导致不弹出
+                        # rewind (指针移动到第一个元素)
+                        self.call_method(t_receiver, 'rewind',
                                          par_li, node, new_key)
-                        self.call_method(t_receiver, 'key',
+                        # valid（验证当前array是否valid，返回True/False）
+                        valid_res = self.call_method(t_receiver, 'valid',
+                                                     par_li, node, new_key)
+                        if valid_res != False:  # valid结果非False时才继续执行
+                            self.call_method(t_receiver, 'current',
+                                             par_li, node, new_key)
+                            self.call_method(t_receiver, 'key',
+                                             par_li, node, new_key)
+                            self.call_method(t_receiver, 'next',
+                                             par_li, node, new_key)
+                    except Exception:
+                        pass
+                elif mtd == 'set':  # offsetSet：设置key对应元素
+                    try:  # 捕捉异常，防止栈信息因中断导致不弹出
+                        self.call_method(t_receiver, 'offsetSet',
                                          par_li, node, new_key)
-                        self.call_method(t_receiver, 'next',
+                    except Exception:
+                        pass
+                elif mtd == 'get':  # offsetGet：获取key对应元素
+                    try:  # 捕捉异常，防止栈信息因中断导致不弹出
+                        self.call_method(t_receiver, 'offsetGet',
                                          par_li, node, new_key)
-                except Exception:
-                    pass
-            elif mtd == 'set':  # offsetSet：设置key对应元素
-                try:  # 捕捉异常，防止栈信息因中断导致不弹出
-                    self.call_method(t_receiver, 'offsetSet',
-                                     par_li, node, new_key)
-                except Exception:
-                    pass
-            elif mtd == 'get':  # offsetGet：获取key对应元素
-                try:  # 捕捉异常，防止栈信息因中断导致不弹出
-                    self.call_method(t_receiver, 'offsetGet',
-                                     par_li, node, new_key)
-                except Exception:
-                    pass
-
-            # 执行结束，删除新key
-            del pop_dict[new_key]
-            del jmp_node[new_key]
+                    except Exception:
+                        pass
+            finally:
+                # 执行结束，回滚分支并删除新key
+                journal.rollback()
+                del pop_dict[new_key]
+                del jmp_node[new_key]
 
         if len(next_classes) > 0:
-            # target同步到cur_key
-            pop_dict[self.cur_key] = pop_dict['target']
             # 同步局部变量
-            self.update_local_vars('target', self.local_var)
+            self.update_local_vars(self.cur_key, self.local_var)
 
         if firstJmpRM:
             pop_dict[self.cur_key].firstJmpIndex = None
@@ -1185,15 +1085,13 @@ class ASTExecutor:
         if len(indexes) == 0:
             return root
 
-        tmp_indexes = copy.copy(indexes)
-
         if get_ref:  # 如果是获取ref，只索引到倒数第二层
-            tmp_indexes = tmp_indexes[:-1]
+            tmp_indexes = indexes[:-1]
+        else:
+            tmp_indexes = indexes
 
         # 获取索引对应的对象
-        for index in tmp_indexes:
-            vtype, ind = index.split(':')
-
+        for vtype, ind in tmp_indexes:
             try:
                 if vtype == 'attr':
                     root = root.attr[ind]
@@ -1204,7 +1102,7 @@ class ASTExecutor:
 
         if get_ref:  # 返回ref
             # 获取倒数一级索引
-            vtype, ind = indexes[-1].split(':')
+            vtype, ind = indexes[-1]
             if vtype == 'attr':
                 inst = VarRef(root.attr, ind)
             elif vtype == 'key':
@@ -1233,33 +1131,26 @@ class ASTExecutor:
             # 由于call_possible_methods会产生"副作用"，最外层的可控变量引用可能被覆盖，
             # 导致controllable_assign对应该保留值的局部变量赋值失败，这里对当前局部变量进行备份
 
-            root_bak = copy.deepcopy(pop_dict[self.cur_key].root)  # 备份当前root
-            local_var_bak = copy.deepcopy(self.local_var)  # 备份当前局部变量
+            # toString的执行在journal检查点内进行，结束后回滚root等状态，局部变量字典单独备份
+            journal.checkpoint()
+            local_var_bak = LocalVarDict(self.local_var)  # 备份当前局部变量
             val_ind = val.index  # 记录val的index
 
-            # 备份的root同步到备份的局部变量
-            for varname in local_var_bak:
-
-                if type(local_var_bak[varname]) == ControllableInstance:
-                    local_var_bak[varname] = self.get_inner_inst(local_var_bak[varname].index,
-                                                                 target_inst=root_bak)
-                elif type(local_var_bak[varname]) == PHPArray:
-                    for tmpkey in local_var_bak[varname]:
-                        if type(local_var_bak[varname][tmpkey]) == ControllableInstance:
-                            local_var_bak[varname][tmpkey] = self.get_inner_inst(local_var_bak[varname][tmpkey].index,
-                                                                                 target_inst=root_bak)
-
             node = ToStringNode(node)
 
             try:  # 这里防止报错后返回source字符串失败，进行异常处理
                 self.call_possible_methods(val, '__toString', [], node)
-
+            except Exception as e:
+                return source_token
+            finally:
                 # 执行结束，还原局部变量、root
-                del self.local_var
-                del pop_dict[self.cur_key].root
+                journal.rollback()
                 self.local_var = local_var_bak
-                pop_dict[self.cur_key].root = root_bak
-                val = self.get_inner_inst(val_ind, target_inst=root_bak)
+
+            try:
+                # root同步到局部变量
+                self.update_local_vars(self.cur_key, self.local_var)
+                val = self.get_inner_inst(val_ind)
 
                 # 将可控对象赋值为SOURCE，并返回
                 return self.controllable_assign(val, source_token)
@@ -1307,9 +1198,7 @@ class ASTExecutor:
         inst_ref.ref[inst_ref.key][offset] = ControllableInstance()
 
         # 记录root index
-        tmp_index = copy.copy(controllable.index)
-        tmp_index.append(f'key:{offset}')
-        inst_ref.ref[inst_ref.key][offset].index = tmp_index
+        inst_ref.ref[inst_ref.key][offset].index = controllable.index + (key_step(offset),)
 
         # 同步局部变量
         for varname in self.local_var:
@@ -1381,8 +1270,6 @@ class ASTExecutor:
         报告并记录查找到的可利用链
         '''
 
-        global find_num
-
         sinkLineno = f'''"{node.sourcefile}", line {node.lineno}'''
 
         # 记录PM summary
@@ -1447,6 +1334,8 @@ class ASTExecutor:
                         return
 
         # 确认要记录该链时
+        if not claim_chain():
+            return
 
         # 记录sink筛选信息
         if filter_sink:
@@ -1465,18 +1354,15 @@ class ASTExecutor:
         store_key = random_string()
         # patch生成
         if patch_generate:
-            with open(patch_file, 'a') as fw:
-                patch = autoPatch.get_patch(jmp_node[self.cur_key])
-                if patch == None:
-                    sugg = self.wakeup_suggest()
-                    print(json.dumps(
-                        {store_key: sugg}), file=fw)
-                    unable2patch_entry.add(json.dumps(
-                        pop_dict[self.cur_key].normalInfo[:entry_depth]))
-                else:
-                    print(json.dumps(
-                        {store_key: patch}), file=fw)
-                    patch_collect.add(json.dumps(patch))
+            patch = autoPatch.get_patch(jmp_node[self.cur_key])
+            if patch == None:
+                sugg = self.wakeup_suggest()
+                result_writer.write(patch_file, json.dumps({store_key: sugg}))
+                unable2patch_entry.add(json.dumps(
+                    pop_dict[self.cur_key].normalInfo[:entry_depth]))
+            else:
+                result_writer.write(patch_file, json.dumps({store_key: patch}))
+                patch_collect.add(json.dumps(patch))
 
         # 记录sink信息
         vul_info = {}
@@ -1490,21 +1376,13 @@ class ASTExecutor:
         vul_info['funcStack'] = pop_dict[self.cur_key].normalInfo
         vul_info['callStack'] = pop_dict[self.cur_key].callsiteInfo
 
-        with open(result_file, 'a', encoding='utf8') as fw:
-            print(json.dumps(vul_info, ensure_ascii=False), end='', file=fw)
-            print(file=fw)
-
-        find_num += 1
-
-        # 记录当前时间
-        info_log(time.time())
-        print(json.dumps(vul_info, ensure_ascii=False))
+        # 写入结果文件并输出到stdout（缓冲，定期写入）
+        result_writer.add_chain(result_file, vul_info)
 
     def pop_log_report_summary(self, summ: PMSummary, node):
         '''
         根据summary信息报告漏洞
         '''
-        global find_num
 
         # 记录调用图
         if len(summ.sinkInfo) > 0 and graph_gen:
@@ -1585,6 +1463,8 @@ class ASTExecutor:
                             return
 
             # 确认要记录该链时
+            if not claim_chain():
+                return
 
             # 记录sink筛选信息
             if filter_sink:
@@ -1602,17 +1482,15 @@ class ASTExecutor:
             store_key = random_string()
             # patch生成
             if patch_generate:
-                with open(patch_file, 'a') as fw:
-                    patch = autoPatch.get_patch(jmpNode)
-                    if patch == None:
-                        sugg = self.wakeup_suggest()
-                        print(json.dumps(
-                            {store_key: sugg}), file=fw)
-                        unable2patch_entry.add(
-                            json.dumps(normalInfo[:entry_depth]))
-                    else:
-                        print(json.dumps({store_key: patch}), file=fw)
-                        patch_collect.add(json.dumps(patch))
+                patch = autoPatch.get_patch(jmpNode)
+                if patch == None:
+                    sugg = self.wakeup_suggest()
+                    result_writer.write(patch_file, json.dumps({store_key: sugg}))
+                    unable2patch_entry.add(
+                        json.dumps(normalInfo[:entry_depth]))
+                else:
+                    result_writer.write(patch_file, json.dumps({store_key: patch}))
+                    patch_collect.add(json.dumps(patch))
 
             # 记录sink信息
             vul_info = {}
@@ -1625,23 +1503,15 @@ class ASTExecutor:
             vul_info['funcStack'] = normalInfo
             vul_info['callStack'] = callsiteInfo
 
-            with open(result_file, 'a', encoding='utf8') as fw:
-                print(json.dumps(vul_info, ensure_ascii=False), end='', file=fw)
-                print(file=fw)
-
-            find_num += 1
-
-            # 记录当前时间
-            info_log(time.time())
-            print(json.dumps(vul_info, ensure_ascii=False))
+            # 写入结果文件并输出到stdout（缓冲，定期写入）
+            result_writer.add_chain(result_file, vul_info)
 
     def wakeup_get_attr(self):
         '''
         在wakeup suggest时获取对应的属性名
         '''
         attr = '$this'
-        for jmp in pop_dict[self.cur_key].firstJmpIndex:
-            tp, key = jmp.split(':')
+        for tp, key in pop_dict[self.cur_key].firstJmpIndex:
             if tp == 'attr':
                 attr += '->'+key
             elif tp == 'key':
@@ -1677,7 +1547,7 @@ class ASTExecutor:
             if cond_node.op == 'instanceof':
                 inst = self.execute_ast(cond_node.left)
                 if type(inst) == ControllableInstance:
-                    condition_stack[-1].add(str(inst.index))
+                    condition_stack[-1].add(inst.index)
             else:
                 self.push_condition_rec(cond_node.left)
                 self.push_condition_rec(cond_node.right)
@@ -1685,11 +1555,11 @@ class ASTExecutor:
             if cond_node.name in ('in_array', '\in_array'):
                 tmp = self.execute_ast(cond_node.params[0].node)
                 if type(tmp) == ControllableInstance:
-                    condition_stack[-1].add(str(tmp.index))
+                    condition_stack[-1].add(tmp.index)
             elif cond_node.name in ('is_array', '\is_array'):
                 tmp = self.execute_ast(cond_node.params[0].node)
                 if type(tmp) == ControllableInstance:
-                    condition_stack[-1].add(str(tmp.index))
+                    condition_stack[-1].add(tmp.index)
 
     def check_in_cond(self, index):
         '''
@@ -1698,9 +1568,8 @@ class ASTExecutor:
         global condition_stack
 
         res = False
-        ind_str = str(index)
         for cond_set in condition_stack:
-            if ind_str in cond_set:
+            if index in cond_set:
                 res = True
 
         return res
@@ -1790,988 +1659,1383 @@ class ASTExecutor:
         if len(pop_dict[self.cur_key].possibleInfo) > max_pm_length:
             return ret_val
 
-        # AST模拟执行
+        # AST模拟执行，按结点类型分发到对应的处理方法
+        handler = node_handlers.get(type(node))
+        if handler is None:
+            return ret_val
 
         try:
-            # 基本元素
-            if type(node) == str:
-                return node
-            elif type(node) == int:
-                return node
-            elif type(node) == float:
-                return node
-
-            # list
-            # 迭代执行
-            elif type(node) == list:
-                for vnode in node:
-                    ret = self.execute_ast(vnode)
-                    if type(ret_val) == ReturnValue:  # ret_val已有值，根据情况保留
-                        if type(ret_val.val) == ControllableInstance:  # 贪心法
-                            continue
-                        elif type(ret) == ReturnValue:
-                            # 既有True又有False
-                            if (ret_val.val == True and ret.val == False) or (ret_val.val == False and ret.val == True):
-                                ret_val = ReturnValue(None)
-                            else:  # 否则用当前执行结果代替之前的结果
-                                ret_val = ret
-                    elif type(ret) == ReturnValue:  # ret_val没有赋值，list仅收集返回值的情况
-                        ret_val = ret
-
-            # Block
-            # 贪心法
-            elif type(node) == phpast.Block:
-                for vexpr in node.nodes:  # 迭代执行
-                    ret = self.execute_ast(vexpr)
-                    # 贪心法
-                    if type(ret_val) == ReturnValue and type(ret_val.val) == ControllableInstance:
-                        pass
-                    # list仅收集返回值的情况
-                    elif type(ret) == ReturnValue:
-                        ret_val = ret
+            return handler(self, node)
+        except Exception as e:
+            pass
+            # with open(log_file, 'a') as fw:
+            #     print('[- error]', type(e),
+            #           f'''"{node.sourcefile}", line {node.lineno}''', file=fw)
+            # print(traceback.format_exc(), file=fw)
 
-            elif type(node) == phpast.Variable:
+        # self.check_local_var_ctrl()
+        return ret_val
 
-                if type(node.name) == str:  # 最后一层
-                    return self.local_var[node.name[1:]]  # 去掉$号
+    # 基本元素
+    @handles(str, int, float)
+    def exec_scalar(self, node):
+        return node
 
-                else:  # 递归解析
-                    return self.local_var[self.execute_ast(node.name)]
+    # list
+    # 迭代执行
+    @handles(list)
+    def exec_list(self, node):
+        ret_val = None
+        try:
+            for vnode in node:
+                ret = self.execute_ast(vnode)
+                if type(ret_val) == ReturnValue:  # ret_val已有值，根据情况保留
+                    if type(ret_val.val) == ControllableInstance:  # 贪心法
+                        continue
+                    elif type(ret) == ReturnValue:
+                        # 既有True又有False
+                        if (ret_val.val == True and ret.val == False) or (ret_val.val == False and ret.val == True):
+                            ret_val = ReturnValue(None)
+                        else:  # 否则用当前执行结果代替之前的结果
+                            ret_val = ret
+                elif type(ret) == ReturnValue:  # ret_val没有赋值，list仅收集返回值的情况
+                    ret_val = ret
+        except Exception:
+            pass
+        return ret_val
 
-            elif type(node) == phpast.Array:
-                tmp_arr = PHPArray()
+    # Block
+    # 贪心法
+    @handles(phpast.Block)
+    def exec_block(self, node):
+        ret_val = None
+        try:
+            for vexpr in node.nodes:  # 迭代执行
+                ret = self.execute_ast(vexpr)
+                # 贪心法
+                if type(ret_val) == ReturnValue and type(ret_val.val) == ControllableInstance:
+                    pass
+                # list仅收集返回值的情况
+                elif type(ret) == ReturnValue:
+                    ret_val = ret
+        except Exception:
+            pass
+        return ret_val
 
-                if len(node.nodes) > 0:
-                    for vnode in node.nodes:
-                        # 无key值
-                        if vnode.key == None:
-                            tmp_arr.append(self.execute_ast(vnode.value))
-                        # 有key值
-                        else:
-                            tmpkey = self.execute_ast(vnode.key)
-                            tmp_arr[tmpkey] = self.execute_ast(vnode.value)
+    @handles(phpast.Variable)
+    def exec_variable(self, node):
+        if type(node.name) == str:  # 最后一层
+            return self.local_var[node.name[1:]]  # 去掉$号
 
-                return tmp_arr
+        else:  # 递归解析
+            return self.local_var[self.execute_ast(node.name)]
 
-            elif type(node) == phpast.ArrayElement:
-                print('ArrayElement')
+    @handles(phpast.Array)
+    def exec_array(self, node):
+        tmp_arr = PHPArray()
 
-            elif type(node) == phpast.ArrayOffset:  # 获取数组元素
+        if len(node.nodes) > 0:
+            for vnode in node.nodes:
+                # 无key值
+                if vnode.key == None:
+                    tmp_arr.append(self.execute_ast(vnode.value))
+                # 有key值
+                else:
+                    tmpkey = self.execute_ast(vnode.key)
+                    tmp_arr[tmpkey] = self.execute_ast(vnode.value)
 
-                tmp_arr = self.execute_ast(
-                    node.node)
-                offset = self.execute_ast(node.expr)
+        return tmp_arr
 
-                if offset in (None, 'DONTCARE'):
-                    if type(tmp_arr) == ControllableInstance or (type(tmp_arr) == PHPArray and tmp_arr.isControllable):
-                        pass
-                    else:
-                        return ret_val
+    @handles(phpast.ArrayElement)
+    def exec_array_element(self, node):
+        print('ArrayElement')
 
-                # 数组的offset只能是字符串或int
-                if type(offset) == ControllableInstance and offset.classname == None:
-                    offset = self.controllable_assign(offset, source_token)
+    # 获取数组元素
+    @handles(phpast.ArrayOffset)
+    def exec_array_offset(self, node):
+        ret_val = None
+        try:
+            tmp_arr = self.execute_ast(
+                node.node)
+            offset = self.execute_ast(node.expr)
 
-                if type(tmp_arr) == ControllableInstance and tmp_arr.classname == None:  # 可控对象
-                    # ArrayAccess
+            if offset in (None, 'DONTCARE'):
+                if type(tmp_arr) == ControllableInstance or (type(tmp_arr) == PHPArray and tmp_arr.isControllable):
+                    pass
+                else:
+                    return ret_val
+
+            # 数组的offset只能是字符串或int
+            if type(offset) == ControllableInstance and offset.classname == None:
+                offset = self.controllable_assign(offset, source_token)
+
+            if type(tmp_arr) == ControllableInstance and tmp_arr.classname == None:  # 可控对象
+                # ArrayAccess
+                tnode = ArrayAccessNode(node.node)
+                self.call_implement_methods(
+                    tmp_arr, '!arrayaccess-get', [], tnode)
+                tmp_arr = self.controllable_arr_assign(tmp_arr, offset)
+                if tmp_arr in (None, 'DONTCARE'):
+                    return None
+                return tmp_arr[offset]
+            elif type(tmp_arr) == PHPArray and tmp_arr.isControllable:  # 可控数组
+                # ArrayAccess
+                if not tmp_arr.isSanitized:
                     tnode = ArrayAccessNode(node.node)
                     self.call_implement_methods(
                         tmp_arr, '!arrayaccess-get', [], tnode)
-                    tmp_arr = self.controllable_arr_assign(tmp_arr, offset)
-                    if tmp_arr in (None, 'DONTCARE'):
-                        return None
-                    return tmp_arr[offset]
-                elif type(tmp_arr) == PHPArray and tmp_arr.isControllable:  # 可控数组
-                    # ArrayAccess
-                    if not tmp_arr.isSanitized:
-                        tnode = ArrayAccessNode(node.node)
-                        self.call_implement_methods(
-                            tmp_arr, '!arrayaccess-get', [], tnode)
-                    tmp_ctrl = ControllableInstance()
-                    tmp_ctrl.index = copy.copy(tmp_arr.index)
-                    tmp_ctrl.index.append(f'key:{offset}')
-                    tmp_arr[offset] = tmp_ctrl
+                tmp_ctrl = ControllableInstance()
+                tmp_ctrl.index = tmp_arr.index + (key_step(offset),)
+                tmp_arr[offset] = tmp_ctrl
+                return tmp_arr[offset]
+            else:  # 一般情况
+                if type(tmp_arr) == PHPArray and offset in tmp_arr:
                     return tmp_arr[offset]
-                else:  # 一般情况
-                    if type(tmp_arr) == PHPArray and offset in tmp_arr:
-                        return tmp_arr[offset]
+        except Exception:
+            pass
+        return ret_val
 
-            # 赋值语句
-            # 普通赋值、this->xxx->xxx=xxx和this->xxx=xxx的处理、__set的处理
-            elif type(node) == phpast.Assignment:
-                val = self.execute_ast(node.expr)
-                var = self.get_varref(node.node, True)
-                ret_val = val
+    # 赋值语句
+    # 普通赋值、this->xxx->xxx=xxx和this->xxx=xxx的处理、__set的处理
+    @handles(phpast.Assignment)
+    def exec_assignment(self, node):
+        ret_val = None
+        try:
+            val = self.execute_ast(node.expr)
+            var = self.get_varref(node.node, True)
+            ret_val = val
 
-                if var in (None, 'NOTFOUND') or var.ref == None or type(var.ref) == str or var.key == None:  # 不关心的赋值
-                    return ret_val
+            if var in (None, 'NOTFOUND') or var.ref == None or type(var.ref) == str or var.key == None:  # 不关心的赋值
+                return ret_val
 
-                base = None
-                if type(node.node) == phpast.ObjectProperty:  # 属性赋值
-                    base = self.execute_ast(node.node.node)
+            base = None
+            if type(node.node) == phpast.ObjectProperty:  # 属性赋值
+                base = self.execute_ast(node.node.node)
 
-                # base可控，并且base未被赋值为具体类，触发__set
-                if type(base) == ControllableInstance and base.classname == None:
-                    attrname = self.execute_ast(node.node.name)
-                    # __set参数为$attrname, $value
-                    self.call_possible_methods(
-                        base, '__set', [attrname, val], node)
+            # base可控，并且base未被赋值为具体类，触发__set
+            if type(base) == ControllableInstance and base.classname == None:
+                attrname = self.execute_ast(node.node.name)
+                # __set参数为$attrname, $value
+                self.call_possible_methods(
+                    base, '__set', [attrname, val], node)
 
-                # 一般情况
-                else:
-                    #  前一层的key为可控对象（还未赋值），比如 arr[$this->a] = xxx;
-                    #  直接把$this->a赋值为任意值
-                    if type(var.key) == ControllableInstance and var.key.classname == None:
-                        self.controllable_assign(var.key, source_token)
-                        var.key = source_token
-
-                    # 贪心法，保护if、catch分支中的可控变量被覆盖
-                    if hasattr(node, 'parent') and var.key != None:
-                        # if
-                        if type(var.ref[var.key]) == ControllableInstance or \
-                            (type(var.ref[var.key]) == str and source_token in var.ref[var.key]) or \
-                                (type(val) == str and val != source_token):
-                            if hasattr(node.parent, 'parent') and type(node.parent.parent) in (phpast.If, phpast.ElseIf, phpast.Else):
-                                return ret_val
-                        # catch
-                        if type(node.parent) == phpast.Catch:
-                            if val == None:
-                                return ret_val
-
-                        # foreach
-                        if hasattr(node.parent, 'parent') and type(node.parent.parent) == phpast.Foreach:
-                            if val == None:
-                                return ret_val
-
-                    # 赋值，贪心法，不覆盖可控对象
-                    if type(var.ref[var.key]) != ControllableInstance:
-                        var.setValue(val)
-                    else:  # 否则仅在if作用域里过滤
-                        condition_stack[-1].add(str(var.ref[var.key].index))
+            # 一般情况
+            else:
+                #  前一层的key为可控对象（还未赋值），比如 arr[$this->a] = xxx;
+                #  直接把$this->a赋值为任意值
+                if type(var.key) == ControllableInstance and var.key.classname == None:
+                    self.controllable_assign(var.key, source_token)
+                    var.key = source_token
+
+                # 贪心法，保护if、catch分支中的可控变量被覆盖
+                if hasattr(node, 'parent') and var.key != None:
+                    # if
+                    if type(var.ref[var.key]) == ControllableInstance or \
+                        (type(var.ref[var.key]) == str and source_token in var.ref[var.key]) or \
+                            (type(val) == str and val != source_token):
+                        if hasattr(node.parent, 'parent') and type(node.parent.parent) in (phpast.If, phpast.ElseIf, phpast.Else):
+                            return ret_val
+                    # catch
+                    if type(node.parent) == phpast.Catch:
+                        if val == None:
+                            return ret_val
 
-                return ret_val
+                    # foreach
+                    if hasattr(node.parent, 'parent') and type(node.parent.parent) == phpast.Foreach:
+                        if val == None:
+                            return ret_val
 
-            # If
-            elif type(node) == phpast.If:
-                condition = self.execute_ast(node.expr)  # 条件的运算在新栈建立前
-                if condition != True:  # 当条件运算恒真时，将不再存在if隔离
-                    condition_stack.append(set())
-                self.push_condition_rec(node.expr)
-                # 如果确认条件为false则不执行if
-                if condition == False:
-                    pass
-                else:
-                    ret_val = self.execute_ast(node.node)
-                if condition != True:
-                    condition_stack.pop()  # 还原条件栈
-                # 如果确认条件为true则不执行elseif和else
-                if condition == True:
-                    pass
-                else:
-                    for elseif in node.elseifs:
-                        condition = self.execute_ast(elseif.expr)
-                        if condition != True:  # 当条件运算恒真时，将不再存在if隔离
-                            condition_stack.append(set())
-                        self.push_condition_rec(elseif.expr)
-                        # 如果确认条件为false则不执行
-                        if condition == False:
-                            pass
-                        else:
-                            # 贪心法
-                            tmp_ret = self.execute_ast(elseif.node)
-                            if type(ret_val) == ReturnValue and type(ret_val.val) == ControllableInstance:
-                                pass
-                            else:
-                                ret_val = tmp_ret
-                        if condition != True:
-                            condition_stack.pop()  # 还原条件栈
-                    else_ = node.else_
-                    if else_ != None:
+                # 赋值，贪心法，不覆盖可控对象
+                if type(var.ref[var.key]) != ControllableInstance:
+                    var.setValue(val)
+                else:  # 否则仅在if作用域里过滤
+                    condition_stack[-1].add(var.ref[var.key].index)
+
+            return ret_val
+        except Exception:
+            pass
+        return ret_val
+
+    # If
+    @handles(phpast.If)
+    def exec_if(self, node):
+        ret_val = None
+        try:
+            condition = self.execute_ast(node.expr)  # 条件的运算在新栈建立前
+            if condition != True:  # 当条件运算恒真时，将不再存在if隔离
+                condition_stack.append(set())
+            self.push_condition_rec(node.expr)
+            # 如果确认条件为false则不执行if
+            if condition == False:
+                pass
+            else:
+                ret_val = self.execute_ast(node.node)
+            if condition != True:
+                condition_stack.pop()  # 还原条件栈
+            # 如果确认条件为true则不执行elseif和else
+            if condition == True:
+                pass
+            else:
+                for elseif in node.elseifs:
+                    condition = self.execute_ast(elseif.expr)
+                    if condition != True:  # 当条件运算恒真时，将不再存在if隔离
+                        condition_stack.append(set())
+                    self.push_condition_rec(elseif.expr)
+                    # 如果确认条件为false则不执行
+                    if condition == False:
+                        pass
+                    else:
                         # 贪心法
-                        tmp_ret = self.execute_ast(else_.node)
+                        tmp_ret = self.execute_ast(elseif.node)
                         if type(ret_val) == ReturnValue and type(ret_val.val) == ControllableInstance:
                             pass
                         else:
                             ret_val = tmp_ret
+                    if condition != True:
+                        condition_stack.pop()  # 还原条件栈
+                else_ = node.else_
+                if else_ != None:
+                    # 贪心法
+                    tmp_ret = self.execute_ast(else_.node)
+                    if type(ret_val) == ReturnValue and type(ret_val.val) == ControllableInstance:
+                        pass
+                    else:
+                        ret_val = tmp_ret
+        except Exception:
+            pass
+        return ret_val
 
-            #  while
-            elif type(node) == phpast.While:
-                expr = []
-                expr.append(node.expr)
-                expr += node.node.nodes
-
-                for vexpr in expr:  # 迭代每个结点
-                    ret = self.execute_ast(vexpr)
-                    if type(ret) == ReturnValue:  # 优先收集返回值
-                        ret_val = ret
-
-            # DoWhile
-            elif type(node) == phpast.DoWhile:
-                expr = []
-                expr.append(node.expr)
-                expr += node.node.nodes
-
-                for vexpr in expr:  # 迭代每个结点
-                    ret = self.execute_ast(vexpr)
-                    if type(ret) == ReturnValue:  # 优先收集返回值
-                        ret_val = ret
-
-            # Switch
-            elif type(node) == phpast.Switch:
-                expr = []
-                expr.append(node.expr)
-                expr += node.nodes
-
-                for vexpr in expr:  # 迭代每个结点
-                    ret = self.execute_ast(vexpr)
-                    if type(ret) == ReturnValue:  # 优先收集返回值
-                        ret_val = ret
-
-            # For
-            elif type(node) == phpast.For:
-                # 对for的执行体进行递归寻找
-                ret_val = self.execute_ast(node.node)
+    #  while
+    @handles(phpast.While)
+    def exec_while(self, node):
+        ret_val = None
+        try:
+            expr = []
+            expr.append(node.expr)
+            expr += node.node.nodes
+
+            for vexpr in expr:  # 迭代每个结点
+                ret = self.execute_ast(vexpr)
+                if type(ret) == ReturnValue:  # 优先收集返回值
+                    ret_val = ret
+        except Exception:
+            pass
+        return ret_val
 
-            # Foreach
-            elif type(node) == phpast.Foreach:
-                arr = self.execute_ast(node.expr)
-                # 对iteratoraggregate特殊接口进行处理
-                if hasattr(arr, 'classname'):
-                    if arr.classname in class_dict and '!iteratoraggregate' in class_dict[arr.classname]:
-                        arr = self.call_method(arr, 'getIterator', [], node)
-                arr_len = 0
-                if type(arr) in (ControllableInstance, PHPArray):
-                    if node.keyvar != None:  # 取key时
-                        keyvar = node.keyvar.name[1:]
-                        valvar = node.valvar.name.name[1:]
-                        if (type(arr) == ControllableInstance and arr.classname == None) or (type(arr) == PHPArray and arr.isControllable):
-                            if not node.valvar.is_ref:  # 引用时不触发iterator
-                                # Iterator
-                                tnode = IteratorNode(node.expr)
-                                self.call_implement_methods(
-                                    arr, '!iterator', [], tnode)
-
-                            offset = source_token
-                            arr = self.controllable_arr_assign(arr, offset)
-
-                        # php的数组比较特殊，即可表达数组也可表达字典
-                        if type(arr) == PHPArray:
-                            if arr.isControllable and len(arr) == 0:
-                                tmp = arr[source_token]
-
-                            for keyval in arr:  # 获取第一个元素
-                                valval = arr[keyval]
-                                break
-                        else:
-                            return ret_val
+    # DoWhile
+    @handles(phpast.DoWhile)
+    def exec_do_while(self, node):
+        ret_val = None
+        try:
+            expr = []
+            expr.append(node.expr)
+            expr += node.node.nodes
+
+            for vexpr in expr:  # 迭代每个结点
+                ret = self.execute_ast(vexpr)
+                if type(ret) == ReturnValue:  # 优先收集返回值
+                    ret_val = ret
+        except Exception:
+            pass
+        return ret_val
 
-                        if len(arr) > 0:
-                            self.local_var[keyvar] = keyval
-                            self.local_var[valvar] = valval
-                            arr_len = 1
-
-                    else:  # 不取key时
-                        if (type(arr) == ControllableInstance and arr.classname == None) or (type(arr) == PHPArray and arr.isControllable):
-                            if not node.valvar.is_ref:  # 引用时不触发iterator
-                                # Iterator
-                                tnode = IteratorNode(node.expr)
-                                self.call_implement_methods(
-                                    arr, '!iterator', [], tnode)
-                            arr = self.controllable_arr_assign(arr, 0)
-
-                        if type(arr) != PHPArray:
-                            return ret_val
+    # Switch
+    @handles(phpast.Switch)
+    def exec_switch(self, node):
+        ret_val = None
+        try:
+            expr = []
+            expr.append(node.expr)
+            expr += node.nodes
+
+            for vexpr in expr:  # 迭代每个结点
+                ret = self.execute_ast(vexpr)
+                if type(ret) == ReturnValue:  # 优先收集返回值
+                    ret_val = ret
+        except Exception:
+            pass
+        return ret_val
 
+    # For
+    @handles(phpast.For)
+    def exec_for(self, node):
+        ret_val = None
+        try:
+            # 对for的执行体进行递归寻找
+            ret_val = self.execute_ast(node.node)
+        except Exception:
+            pass
+        return ret_val
+
+    # Foreach
+    @handles(phpast.Foreach)
+    def exec_foreach(self, node):
+        ret_val = None
+        try:
+            arr = self.execute_ast(node.expr)
+            # 对iteratoraggregate特殊接口进行处理
+            if hasattr(arr, 'classname'):
+                if arr.classname in class_dict and '!iteratoraggregate' in class_dict[arr.classname]:
+                    arr = self.call_method(arr, 'getIterator', [], node)
+            arr_len = 0
+            if type(arr) in (ControllableInstance, PHPArray):
+                if node.keyvar != None:  # 取key时
+                    keyvar = node.keyvar.name[1:]
+                    valvar = node.valvar.name.name[1:]
+                    if (type(arr) == ControllableInstance and arr.classname == None) or (type(arr) == PHPArray and arr.isControllable):
+                        if not node.valvar.is_ref:  # 引用时不触发iterator
+                            # Iterator
+                            tnode = IteratorNode(node.expr)
+                            self.call_implement_methods(
+                                arr, '!iterator', [], tnode)
+
+                        offset = source_token
+                        arr = self.controllable_arr_assign(arr, offset)
+
+                    # php的数组比较特殊，即可表达数组也可表达字典
+                    if type(arr) == PHPArray:
                         if arr.isControllable and len(arr) == 0:
-                            tmp = arr[0]
+                            tmp = arr[source_token]
 
-                        valvar = node.valvar.name.name[1:]
-                        if len(arr) > 0:
-                            for vkey in arr:
-                                self.local_var[valvar] = arr[vkey]
-                            arr_len = 1
+                        for keyval in arr:  # 获取第一个元素
+                            valval = arr[keyval]
+                            break
+                    else:
+                        return ret_val
 
-                # if arr_len > 0:
-                # 对foreach的执行体进行递归寻找
-                ret_val = self.execute_ast(node.node)
+                    if len(arr) > 0:
+                        self.local_var[keyvar] = keyval
+                        self.local_var[valvar] = valval
+                        arr_len = 1
+
+                else:  # 不取key时
+                    if (type(arr) == ControllableInstance and arr.classname == None) or (type(arr) == PHPArray and arr.isControllable):
+                        if not node.valvar.is_ref:  # 引用时不触发iterator
+                            # Iterator
+                            tnode = IteratorNode(node.expr)
+                            self.call_implement_methods(
+                                arr, '!iterator', [], tnode)
+                        arr = self.controllable_arr_assign(arr, 0)
+
+                    if type(arr) != PHPArray:
+                        return ret_val
 
-            elif type(node) == phpast.Function:
-                ret_val = self.execute_ast(node.nodes)
+                    if arr.isControllable and len(arr) == 0:
+                        tmp = arr[0]
 
-            elif type(node) == phpast.Method:
-                ret_val = self.execute_ast(node.nodes)
+                    valvar = node.valvar.name.name[1:]
+                    if len(arr) > 0:
+                        for vkey in arr:
+                            self.local_var[valvar] = arr[vkey]
+                        arr_len = 1
 
-            elif type(node) == phpast.Eval:
-                # check sink
-                expr = self.execute_ast(node.expr)
-                expr = self.tostr(expr, node.expr)
-                if 'SOURCE_TOKEN' in expr:
-                    self.pop_log_report('EVAL命令执行(Eval code execution)', node)
+            # if arr_len > 0:
+            # 对foreach的执行体进行递归寻找
+            ret_val = self.execute_ast(node.node)
+        except Exception:
+            pass
+        return ret_val
 
-            elif type(node) == phpast.Include:
-                # check sink
-                expr = self.execute_ast(node.expr)
-                if 'SOURCE_TOKEN' in expr:
-                    self.pop_log_report('文件包含(File inclusion)', node)
+    @handles(phpast.Function)
+    def exec_function(self, node):
+        ret_val = None
+        try:
+            ret_val = self.execute_ast(node.nodes)
+        except Exception:
+            pass
+        return ret_val
 
-            elif type(node) == phpast.Require:
-                # check sink
-                expr = self.execute_ast(node.expr)
-                if 'SOURCE_TOKEN' in expr:
-                    self.pop_log_report('文件包含(File inclusion)', node)
+    @handles(phpast.Method)
+    def exec_method(self, node):
+        ret_val = None
+        try:
+            ret_val = self.execute_ast(node.nodes)
+        except Exception:
+            pass
+        return ret_val
 
-            elif type(node) == phpast.Exit:
-                condition_stack[-2].update(condition_stack[-1])  # 最后一层条件向上一层浮动
-                # check sink
-                echoed = self.tostr(self.execute_ast(node.expr), node.expr)
-                if 'SOURCE_TOKEN' in echoed:  # XSS
-                    self.pop_log_report('XSS', node)
+    @handles(phpast.Eval)
+    def exec_eval(self, node):
+        # check sink
+        expr = self.execute_ast(node.expr)
+        expr = self.tostr(expr, node.expr)
+        if 'SOURCE_TOKEN' in expr:
+            self.pop_log_report('EVAL命令执行(Eval code execution)', node)
+
+    @handles(phpast.Include)
+    def exec_include(self, node):
+        # check sink
+        expr = self.execute_ast(node.expr)
+        if 'SOURCE_TOKEN' in expr:
+            self.pop_log_report('文件包含(File inclusion)', node)
+
+    @handles(phpast.Require)
+    def exec_require(self, node):
+        # check sink
+        expr = self.execute_ast(node.expr)
+        if 'SOURCE_TOKEN' in expr:
+            self.pop_log_report('文件包含(File inclusion)', node)
+
+    @handles(phpast.Exit)
+    def exec_exit(self, node):
+        condition_stack[-2].update(condition_stack[-1])  # 最后一层条件向上一层浮动
+        # check sink
+        echoed = self.tostr(self.execute_ast(node.expr), node.expr)
+        if 'SOURCE_TOKEN' in echoed:  # XSS
+            self.pop_log_report('XSS', node)
+
+    # 函数调用
+    @handles(phpast.FunctionCall)
+    def exec_function_call(self, node):
+        ret_val = None
+        try:
+            # 获取函数名
+            funcname = self.execute_ast(node.name)
+
+            # 获取参数
+            par_li = []
+            for vp in node.params:
+                par_li.append(self.execute_ast(vp.node))
+
+            # call_user_func
+            if funcname == 'call_user_func':
+                receiver = None
+                method = None
+
+                # call_user_func([$this, 'method'], xxx);
+                if type(par_li[0]) == PHPArray:
+                    receiver = par_li[0][0]
+                    method = par_li[0][1]
+                    par_li = par_li[1:]
+
+                # call_user_func($this->attr, xxx);
+                elif type(par_li[0]) == ControllableInstance and par_li[0].classname == None:
+                    self.pop_log_report(
+                        '任意函数调用(Arbitrary function called)', node)
+                    return ret_val
 
-            # 函数调用
-            elif type(node) == phpast.FunctionCall:
+                # call_user_func($this->method, xxx);
+                elif type(par_li[0]) == phpast.Method:
+                    receiver = self.execute_ast(node.params[0].node.node)
+                    method = node.params[0].node.name
+                    par_li = par_li[1:]
 
-                # 获取函数名
-                funcname = self.execute_ast(node.name)
+                # call_user_func('sprintf', xxx);
+                elif type(par_li[0]) == str:
+                    return self.call_func(par_li[0], par_li[1:], node)
 
-                # 获取参数
-                par_li = []
-                for vp in node.params:
-                    par_li.append(self.execute_ast(vp.node))
+                if type(receiver) == ControllableInstance and receiver.classname == None:
+                    ret_val = self.call_possible_methods(
+                        receiver, method, par_li, node)
+                else:
+                    ret_val = self.call_method(
+                        receiver, method, par_li, node)
 
-                # call_user_func
-                if funcname == 'call_user_func':
-                    receiver = None
-                    method = None
-
-                    # call_user_func([$this, 'method'], xxx);
-                    if type(par_li[0]) == PHPArray:
-                        receiver = par_li[0][0]
-                        method = par_li[0][1]
-                        par_li = par_li[1:]
-
-                    # call_user_func($this->attr, xxx);
-                    elif type(par_li[0]) == ControllableInstance and par_li[0].classname == None:
-                        self.pop_log_report(
-                            '任意函数调用(Arbitrary function called)', node)
-                        return ret_val
+            elif funcname == 'call_user_func_array':
+                receiver = None
+                method = None
 
-                    # call_user_func($this->method, xxx);
-                    elif type(par_li[0]) == phpast.Method:
-                        receiver = self.execute_ast(node.params[0].node.node)
-                        method = node.params[0].node.name
-                        par_li = par_li[1:]
+                # call_user_func_array([$this, 'method'], xxx);
+                if type(par_li[0]) == PHPArray:
+                    receiver = par_li[0][0]
+                    method = par_li[0][1]
+                    par_li = par_li[1]
 
-                    # call_user_func('sprintf', xxx);
-                    elif type(par_li[0]) == str:
-                        return self.call_func(par_li[0], par_li[1:], node)
+                # call_user_func_array($this->attr, xxx);
+                elif type(par_li[0]) == ControllableInstance and par_li[0].classname == None:
+                    self.pop_log_report(
+                        '任意函数调用(Arbitrary function called)', node)
+                    return ret_val
 
-                    if type(receiver) == ControllableInstance and receiver.classname == None:
-                        ret_val = self.call_possible_methods(
-                            receiver, method, par_li, node)
-                    else:
-                        ret_val = self.call_method(
-                            receiver, method, par_li, node)
-
-                elif funcname == 'call_user_func_array':
-                    receiver = None
-                    method = None
-
-                    # call_user_func_array([$this, 'method'], xxx);
-                    if type(par_li[0]) == PHPArray:
-                        receiver = par_li[0][0]
-                        method = par_li[0][1]
-                        par_li = par_li[1]
-
-                    # call_user_func_array($this->attr, xxx);
-                    elif type(par_li[0]) == ControllableInstance and par_li[0].classname == None:
-                        self.pop_log_report(
-                            '任意函数调用(Arbitrary function called)', node)
-                        return ret_val
+                # call_user_func_array($this->method, xxx);
+                elif type(par_li[0]) == phpast.Method:
+                    receiver = self.execute_ast(node.params[0].node.node)
+                    method = node.params[0].node.name
+                    par_li = par_li[1]
 
-                    # call_user_func_array($this->method, xxx);
-                    elif type(par_li[0]) == phpast.Method:
-                        receiver = self.execute_ast(node.params[0].node.node)
-                        method = node.params[0].node.name
-                        par_li = par_li[1]
+                # call_user_func_array('sprintf', xxx);
+                elif type(par_li[0]) == str:
+                    return self.call_func(par_li[0], par_li[1], node)
 
-                    # call_user_func_array('sprintf', xxx);
-                    elif type(par_li[0]) == str:
-                        return self.call_func(par_li[0], par_li[1], node)
+                if type(par_li) == str:
+                    par_li = []
 
-                    if type(par_li) == str:
-                        par_li = []
+                if type(receiver) == ControllableInstance and receiver.classname == None:
+                    # if type(receiver) == ControllableInstance:
+                    ret_val = self.call_possible_methods(
+                        receiver, method, par_li, node)
+                else:
+                    ret_val = self.call_method(
+                        receiver, method, par_li, node)
 
-                    if type(receiver) == ControllableInstance and receiver.classname == None:
-                        # if type(receiver) == ControllableInstance:
-                        ret_val = self.call_possible_methods(
-                            receiver, method, par_li, node)
-                    else:
-                        ret_val = self.call_method(
-                            receiver, method, par_li, node)
+            elif type(funcname) == ControllableInstance:  # __invoke
+                self.pop_log_report(
+                    '任意函数调用(Arbitrary function called)', node)
+                ret_val = self.call_possible_methods(
+                    funcname, '__invoke', par_li, node)
 
-                elif type(funcname) == ControllableInstance:  # __invoke
-                    self.pop_log_report(
-                        '任意函数调用(Arbitrary function called)', node)
-                    ret_val = self.call_possible_methods(
-                        funcname, '__invoke', par_li, node)
+            else:  # 普通的函数调用
+                ret_val = self.call_func(funcname, par_li, node)
+        except Exception:
+            pass
+        return ret_val
 
-                else:  # 普通的函数调用
-                    ret_val = self.call_func(funcname, par_li, node)
+    # 方法调用
+    @handles(phpast.MethodCall)
+    def exec_method_call(self, node):
+        ret_val = None
+        try:
+            # 获取参数，由于该过程可能会影响receiver，所以先获取参数再获取receiver
+            par_li = []
+            for vp in node.params:
+                if type(vp.node) == phpast.UnaryOp and vp.node.op == '...':  # ...操作
+                    par_li = self.execute_ast(vp.node.expr)
+                    break
+                else:
+                    par_li.append(self.execute_ast(vp.node))
 
-            # 方法调用
-            elif type(node) == phpast.MethodCall:
+            receiver = self.execute_ast(node.node)
+            methodname = self.execute_ast(node.name)
 
-                # 获取参数，由于该过程可能会影响receiver，所以先获取参数再获取receiver
-                par_li = []
-                for vp in node.params:
-                    if type(vp.node) == phpast.UnaryOp and vp.node.op == '...':  # ...操作
-                        par_li = self.execute_ast(vp.node.expr)
-                        break
-                    else:
-                        par_li.append(self.execute_ast(vp.node))
+            # 可控对象，并且没有明确类名，触发方法寻找
+            if type(receiver) == ControllableInstance and receiver.classname == None:
+                ret_val = self.call_possible_methods(
+                    receiver, methodname, par_li, node)
+
+            # 一般对象
+            elif type(receiver) == PHPInstance or type(receiver) == ControllableInstance:
+                return self.call_method(receiver, methodname, par_li, node)
+        except Exception:
+            pass
+        return ret_val
+
+    # Echo
+    @handles(phpast.Echo)
+    def exec_echo(self, node):
+        # check sink
+        for vexpr in node.nodes:  # 迭代执行，并且字符串化
+            echoed = self.tostr(self.execute_ast(vexpr), vexpr)
+            if 'SOURCE_TOKEN' in echoed:  # XSS
+                self.pop_log_report('XSS', node)
+
+    # Print
+    @handles(phpast.Print)
+    def exec_print(self, node):
+        echoed = self.tostr(self.execute_ast(node.node), node.node)
+        if 'SOURCE_TOKEN' in echoed:  # XSS
+            self.pop_log_report('XSS', node)
+
+    # Return
+    @handles(phpast.Return)
+    def exec_return(self, node):
+        ret_val = None
+        try:
+            cond_offset = len(condition_stack) - 1
+            func_offset = cond_stack_depth[-1] - 1
+            # 确保存在if层，而不是直接在函数调用层上浮，否则上浮的作用域过大
+            if cond_offset > func_offset:
+                condition_stack[cond_offset -
+                                1].update(condition_stack[cond_offset])  # 最后一层条件向上一层浮动
+            ret_val = ReturnValue(self.execute_ast(node.node))
+        except Exception:
+            pass
+        return ret_val
 
-                receiver = self.execute_ast(node.node)
-                methodname = self.execute_ast(node.name)
+    # isset(this->xxx->xxx)的处理（跳转去__isset）
+    @handles(phpast.IsSet)
+    def exec_is_set(self, node):
+        for inner_node in node.nodes:
 
-                # 可控对象，并且没有明确类名，触发方法寻找
-                if type(receiver) == ControllableInstance and receiver.classname == None:
-                    ret_val = self.call_possible_methods(
-                        receiver, methodname, par_li, node)
+            if type(inner_node) == phpast.ObjectProperty:  # 只处理获取属性的语句
 
-                # 一般对象
-                elif type(receiver) == PHPInstance or type(receiver) == ControllableInstance:
-                    return self.call_method(receiver, methodname, par_li, node)
+                inst = self.execute_ast(inner_node.node)
+                attrname = self.execute_ast(inner_node.name)
 
-            # Echo
-            elif type(node) == phpast.Echo:
-                # check sink
-                for vexpr in node.nodes:  # 迭代执行，并且字符串化
-                    echoed = self.tostr(self.execute_ast(vexpr), vexpr)
-                    if 'SOURCE_TOKEN' in echoed:  # XSS
-                        self.pop_log_report('XSS', node)
+                # 可控对象，并且没有具体类名，说明可以任意赋值，可以触发__isset
+                if type(inst) == ControllableInstance and inst.classname == None:
+                    # if type(inst) == ControllableInstance:
 
-            # Print
-            elif type(node) == phpast.Print:
-                echoed = self.tostr(self.execute_ast(node.node), node.node)
-                if 'SOURCE_TOKEN' in echoed:  # XSS
-                    self.pop_log_report('XSS', node)
+                    self.call_possible_methods(
+                        inst, '__isset', [attrname], node)  # __isset的参数为属性名
 
-            # Return
-            elif type(node) == phpast.Return:
-                cond_offset = len(condition_stack) - 1
-                func_offset = cond_stack_depth[-1] - 1
-                # 确保存在if层，而不是直接在函数调用层上浮，否则上浮的作用域过大
-                if cond_offset > func_offset:
-                    condition_stack[cond_offset -
-                                    1].update(condition_stack[cond_offset])  # 最后一层条件向上一层浮动
-                ret_val = ReturnValue(self.execute_ast(node.node))
+    # unset(this->xxx->xxx)的处理（跳转去__unset）
+    @handles(phpast.Unset)
+    def exec_unset(self, node):
+        for inner_node in node.nodes:
 
-            # isset(this->xxx->xxx)的处理（跳转去__isset）
-            elif type(node) == phpast.IsSet:
+            if type(inner_node) == phpast.ObjectProperty:  # 只处理获取属性的语句
 
-                for inner_node in node.nodes:
+                inst = self.execute_ast(inner_node.node)
+                attrname = self.execute_ast(inner_node.name)
 
-                    if type(inner_node) == phpast.ObjectProperty:  # 只处理获取属性的语句
+                # 可控对象，并且没有具体类名，说明可以任意赋值，可以触发__unset
+                if type(inst) == ControllableInstance and inst.classname == None:
+                    # if type(inst) == ControllableInstance:
 
-                        inst = self.execute_ast(inner_node.node)
-                        attrname = self.execute_ast(inner_node.name)
+                    self.call_possible_methods(
+                        inst, '__unset', [attrname], node)  # __unset的参数为属性名
+
+    # this->xxx->xxx和this->xxx的处理 （__get）
+    @handles(phpast.ObjectProperty)
+    def exec_object_property(self, node):
+        ret_val = None
+        try:
+            inst = self.execute_ast(node.node)
+            attrname = self.execute_ast(node.name)
 
-                        # 可控对象，并且没有具体类名，说明可以任意赋值，可以触发__isset
-                        if type(inst) == ControllableInstance and inst.classname == None:
-                            # if type(inst) == ControllableInstance:
+            if type(inst) == str:
+                return 'DONTCARE'
 
-                            self.call_possible_methods(
-                                inst, '__isset', [attrname], node)  # __isset的参数为属性名
+            if type(attrname) == ControllableInstance and attrname.classname == None:
+                attrname = self.controllable_assign(attrname, source_token)
 
-            # unset(this->xxx->xxx)的处理（跳转去__unset）
-            elif type(node) == phpast.Unset:
+            if attrname == None:
+                attrname = 'NOTFOUND'
 
-                for inner_node in node.nodes:
+            if type(inst) == ControllableInstance:  # 可控对象，属性可以任意赋值
+                if inst.classname != None:  # 已有类名，不触发__get
+                    if '$'+attrname in class_dict[inst.classname]:
+                        # 静态类属性不可控
+                        if 'static' in class_dict[inst.classname]['$'+attrname].parent.modifiers:
+                            return 'DONTCARE'
 
-                    if type(inner_node) == phpast.ObjectProperty:  # 只处理获取属性的语句
+                    if attrname not in inst.attr:  # 没有赋值时
+                        # 生成新的可控对象
+                        inst.attr[attrname] = ControllableInstance()
+                        # 记录root index
+                        inst.attr[attrname].index = inst.index + (attr_step(attrname),)
 
-                        inst = self.execute_ast(inner_node.node)
-                        attrname = self.execute_ast(inner_node.name)
+                    ret_val = inst.attr[attrname]
 
-                        # 可控对象，并且没有具体类名，说明可以任意赋值，可以触发__unset
-                        if type(inst) == ControllableInstance and inst.classname == None:
-                            # if type(inst) == ControllableInstance:
+                else:  # 没有具体类名，说明可以任意赋值，可以触发__get
+                    self.call_possible_methods(
+                        inst, '__get', [attrname], node)  # __get的参数为属性名
 
-                            self.call_possible_methods(
-                                inst, '__unset', [attrname], node)  # __unset的参数为属性名
+                    # 除了调用__get，也可以生成新的可控对象
+                    # 这里的逻辑相当于并行执行了__get和返回任意一个对象，不遵循一般的ast执行
+                    # 原理是考虑到__get有效返回值的情况可以被返回可控变量覆盖到，同时也是为了能够触发toString
+                    inst.attr[attrname] = ControllableInstance()
 
-            # this->xxx->xxx和this->xxx的处理 （__get）
-            elif type(node) == phpast.ObjectProperty:
+                    # 记录root index
+                    inst.attr[attrname].index = inst.index + (attr_step(attrname),)
 
-                inst = self.execute_ast(node.node)
-                attrname = self.execute_ast(node.name)
+                    ret_val = inst.attr[attrname]
 
-                if type(inst) == str:
-                    return 'DONTCARE'
+            # 一般的成员属性
+            elif type(inst) == PHPInstance and attrname in inst.attr:
+                ret_val = inst.attr[attrname]
 
-                if type(attrname) == ControllableInstance and attrname.classname == None:
-                    attrname = self.controllable_assign(attrname, source_token)
+            # 成员属性/方法
+            else:
 
                 if attrname == None:
-                    attrname = 'NOTFOUND'
-
-                if type(inst) == ControllableInstance:  # 可控对象，属性可以任意赋值
-                    if inst.classname != None:  # 已有类名，不触发__get
-                        if '$'+attrname in class_dict[inst.classname]:
-                            # 静态类属性不可控
-                            if 'static' in class_dict[inst.classname]['$'+attrname].parent.modifiers:
-                                return 'DONTCARE'
-
-                        if attrname not in inst.attr:  # 没有赋值时
-                            # 生成新的可控对象
-                            inst.attr[attrname] = ControllableInstance()
-                            # 记录root index
-                            tmp_index = copy.copy(inst.index)
-                            tmp_index.append('attr:'+attrname)
-                            inst.attr[attrname].index = tmp_index
-
-                        ret_val = inst.attr[attrname]
-
-                    else:  # 没有具体类名，说明可以任意赋值，可以触发__get
-                        self.call_possible_methods(
-                            inst, '__get', [attrname], node)  # __get的参数为属性名
-
-                        # 除了调用__get，也可以生成新的可控对象
-                        # 这里的逻辑相当于并行执行了__get和返回任意一个对象，不遵循一般的ast执行
-                        # 原理是考虑到__get有效返回值的情况可以被返回可控变量覆盖到，同时也是为了能够触发toString
-                        inst.attr[attrname] = ControllableInstance()
+                    return ret_val
 
-                        # 记录root index
-                        tmp_index = copy.copy(inst.index)
-                        tmp_index.append('attr:'+attrname)
-                        inst.attr[attrname].index = tmp_index
+                if inst == None:
+                    return ret_val
+
+                # 不存在该属性
+                if '$'+attrname not in class_dict[inst.classname]:
+                    return 'NOTFOUND'
 
-                        ret_val = inst.attr[attrname]
+                tmp = class_dict[inst.classname]['$'+attrname]
 
-                # 一般的成员属性
-                elif type(inst) == PHPInstance and attrname in inst.attr:
+                # 成员属性
+                if type(tmp) == phpast.ClassVariable:
+                    inst.attr[attrname] = 'NOTFOUND'
                     ret_val = inst.attr[attrname]
 
-                # 成员属性/方法
+                # 成员方法
                 else:
+                    ret_val = tmp
+        except Exception:
+            pass
+        return ret_val
 
-                    if attrname == None:
-                        return ret_val
+    # AssignOp  += -= ...
+    @handles(phpast.AssignOp)
+    def exec_assign_op(self, node):
+        ret_val = None
+        try:
+            if node.op == '.=':
+                var = self.get_varref(node.left, True)
+                var_t = self.execute_ast(node.left)
+                val = self.execute_ast(node.right)
+                val = self.tostr(var_t, node.left) + \
+                    self.tostr(val, node.right)
+                if var in (None, 'NOTFOUND') or var.ref == None or type(var.ref) == str or var.key == None:  # 不关心的赋值
+                    return ret_val
+                # 赋值，贪心法，不覆盖可控对象
+                if type(var.ref[var.key]) != ControllableInstance:
+                    var.setValue(val)
+                else:  # 否则仅在if作用域里过滤
+                    condition_stack[-1].add(var.ref[var.key].index)
+                return ret_val
+            else:
+                right = self.execute_ast(node.right)
+        except Exception:
+            pass
+        return ret_val
 
-                    if inst == None:
-                        return ret_val
+    # UnaryOp  -xx +xx ...
+    @handles(phpast.UnaryOp)
+    def exec_unary_op(self, node):
+        ret_val = None
+        try:
+            tmp = self.execute_ast(node.expr)
+            if node.op == '-':
+                ret_val = -tmp
+        except Exception:
+            pass
+        return ret_val
 
-                    # 不存在该属性
-                    if '$'+attrname not in class_dict[inst.classname]:
-                        return 'NOTFOUND'
+    # BinaryOp xx >= xx
+    @handles(phpast.BinaryOp)
+    def exec_binary_op(self, node):
+        ret_val = None
+        try:
+            # 字符串拼接，先执行拼接的两个表达式，再分别调用tostr，最后拼接
+            if node.op == '.':
+                left = self.execute_ast(node.left)
+                right = self.execute_ast(node.right)
+                ret_val = self.tostr(left, node.left) + \
+                    self.tostr(right, node.right)
+
+            # 双问号
+            elif node.op == '??':
+                left = self.execute_ast(node.left)
+                right = self.execute_ast(node.right)
 
-                    tmp = class_dict[inst.classname]['$'+attrname]
+                # 贪心法
+                if left == None:
+                    return right
+                elif 'ControllableInstance' in str(left):
+                    return left
+                elif 'ControllableInstance' in str(right):
+                    return right
+                else:
+                    return left
 
-                    # 成员属性
-                    if type(tmp) == phpast.ClassVariable:
-                        inst.attr[attrname] = 'NOTFOUND'
-                        ret_val = inst.attr[attrname]
+            # 值对比
+            elif node.op in ('==', '==='):
+                left = self.execute_ast(node.left)
+                right = self.execute_ast(node.right)
 
-                    # 成员方法
-                    else:
-                        ret_val = tmp
-
-            # AssignOp  += -= ...
-            elif type(node) == phpast.AssignOp:
-                if node.op == '.=':
-                    var = self.get_varref(node.left, True)
-                    var_t = self.execute_ast(node.left)
-                    val = self.execute_ast(node.right)
-                    val = self.tostr(var_t, node.left) + \
-                        self.tostr(val, node.right)
-                    if var in (None, 'NOTFOUND') or var.ref == None or type(var.ref) == str or var.key == None:  # 不关心的赋值
-                        return ret_val
-                    # 赋值，贪心法，不覆盖可控对象
-                    if type(var.ref[var.key]) != ControllableInstance:
-                        var.setValue(val)
-                    else:  # 否则仅在if作用域里过滤
-                        condition_stack[-1].add(str(var.ref[var.key].index))
-                    return ret_val
-                else:
-                    right = self.execute_ast(node.right)
+                if left not in (None, 'NOTFOUND', 'DONTCARE') and right not in (None, 'NOTFOUND', 'DONTCARE'):
+                    # 当前仅判断str的情况
+                    if type(left) == str and type(right) == str:
+                        ret_val = left == right
 
-            # UnaryOp  -xx +xx ...
-            elif type(node) == phpast.UnaryOp:
-                tmp = self.execute_ast(node.expr)
-                if node.op == '-':
-                    ret_val = -tmp
+            # 对instanceof的处理
+            elif node.op == 'instanceof':
+                inst = self.execute_ast(node.left)
+                if type(inst) == ControllableInstance:
+                    if type(node.right) == phpast.Constant:
+                        if node.right.name in ('iterator', 'arrayaccess'):
+                            tarr = PHPArray()
+                            tarr.isControllable = True
+                            tarr.index = inst.index
+                            tarr.isSanitized = True
+                            self.controllable_assign(inst, tarr)
+            elif node.op == '&&':
+                lres = self.execute_ast(node.left)
+                if lres == False:
+                    ret_val = lres
+                else:
+                    ret_val = self.execute_ast(node.right)
+            else:  # 其他情况
+                expr = [node.left, node.right]
+                for vexpr in expr:  # 迭代执行
+                    self.execute_ast(vexpr)
+        except Exception:
+            pass
+        return ret_val
 
-            # BinaryOp xx >= xx
-            elif type(node) == phpast.BinaryOp:
+    # TernaryOp
+    @handles(phpast.TernaryOp)
+    def exec_ternary_op(self, node):
+        cond = self.execute_ast(node.expr)
+        true_ret = None
+        false_ret = None
+        if cond == True:
+            true_ret = self.execute_ast(node.iftrue)
+        elif cond == False:
+            false_ret = self.execute_ast(node.iffalse)
+        else:
+            true_ret = self.execute_ast(node.iftrue)
+            false_ret = self.execute_ast(node.iffalse)
+
+        # 贪心法
+        if false_ret == None:
+            return true_ret
+        elif 'ControllableInstance' in str(true_ret):
+            return true_ret
+        elif 'ControllableInstance' in str(false_ret):
+            return false_ret
+        else:
+            return true_ret
+
+    @handles(phpast.ListAssignment)
+    def exec_list_assignment(self, node):
+        arr = self.execute_ast(node.expr)
+        if type(arr) == PHPArray:
+            for i in range(len(node.nodes)):
+                # 获取变量ref并赋值
+                var = self.get_varref(node.nodes[i])
+                var.setValue(arr[i])
+        elif type(arr) == ControllableInstance and arr.classname == None:
+            arr = self.controllable_arr_assign(arr, 0)
+            var = self.get_varref(node.nodes[0])
+            var.setValue(arr[0])
+            for i in range(1, len(node.nodes)):
+                arr[i] = ControllableInstance()
+                # 记录root index
+                arr[i].index = arr.index + (key_step(i),)
+                # 获取变量ref并赋值
+                var = self.get_varref(node.nodes[i])
+                var.setValue(arr[i])
+
+    @handles(phpast.New)
+    def exec_new(self, node):
+        ret_val = None
+        try:
+            # 先找到类，创建一个PHPInstance作为返回值，之后调用该类的构造函数（如果有的话）
+            # 1. use_list 2. 添加反斜杠 3. 添加namespace
+            classname = self.execute_ast(node.name)
+            # if type(classname) == str:
+            #     classname = classname.lower()
+            if type(classname) not in (ControllableInstance, str):
+                return ret_val
 
-                # 字符串拼接，先执行拼接的两个表达式，再分别调用tostr，最后拼接
-                if node.op == '.':
-                    left = self.execute_ast(node.left)
-                    right = self.execute_ast(node.right)
-                    ret_val = self.tostr(left, node.left) + \
-                        self.tostr(right, node.right)
+            # \\ArrayIterator内置类特殊处理（这里仅简化处理
+            if classname == '\\ArrayIterator':
+                return self.execute_ast(node.params[0].node)
 
-                # 双问号
-                elif node.op == '??':
-                    left = self.execute_ast(node.left)
-                    right = self.execute_ast(node.right)
+            # 构造函数第一个参数触发字符串化的情况
+            if classname in class_dict and '!construct_tostr' in class_dict[classname]:
+                tmp = self.execute_ast(node.params[0].node)
+                self.tostr(tmp, node.params[0].node)
 
-                    # 贪心法
-                    if left == None:
-                        return right
-                    elif 'ControllableInstance' in str(left):
-                        return left
-                    elif 'ControllableInstance' in str(right):
-                        return right
-                    else:
-                        return left
-
-                # 值对比
-                elif node.op in ('==', '==='):
-                    left = self.execute_ast(node.left)
-                    right = self.execute_ast(node.right)
-
-                    if left not in (None, 'NOTFOUND', 'DONTCARE') and right not in (None, 'NOTFOUND', 'DONTCARE'):
-                        # 当前仅判断str的情况
-                        if type(left) == str and type(right) == str:
-                            ret_val = left == right
-
-                # 对instanceof的处理
-                elif node.op == 'instanceof':
-                    inst = self.execute_ast(node.left)
-                    if type(inst) == ControllableInstance:
-                        if type(node.right) == phpast.Constant:
-                            if node.right.name in ('iterator', 'arrayaccess'):
-                                tarr = PHPArray()
-                                tarr.isControllable = True
-                                tarr.index = inst.index
-                                tarr.isSanitized = True
-                                self.controllable_assign(inst, tarr)
-                elif node.op == '&&':
-                    lres = self.execute_ast(node.left)
-                    if lres == False:
-                        ret_val = lres
-                    else:
-                        ret_val = self.execute_ast(node.right)
-                else:  # 其他情况
-                    expr = [node.left, node.right]
-                    for vexpr in expr:  # 迭代执行
-                        self.execute_ast(vexpr)
-
-            # TernaryOp
-            elif type(node) == phpast.TernaryOp:
-
-                cond = self.execute_ast(node.expr)
-                true_ret = None
-                false_ret = None
-                if cond == True:
-                    true_ret = self.execute_ast(node.iftrue)
-                elif cond == False:
-                    false_ret = self.execute_ast(node.iffalse)
-                else:
-                    true_ret = self.execute_ast(node.iftrue)
-                    false_ret = self.execute_ast(node.iffalse)
+            if type(classname) == ControllableInstance and classname.classname != None:
+                return ret_val
 
-                # 贪心法
-                if false_ret == None:
-                    return true_ret
-                elif 'ControllableInstance' in str(true_ret):
-                    return true_ret
-                elif 'ControllableInstance' in str(false_ret):
-                    return false_ret
-                else:
-                    return true_ret
-
-            elif type(node) == phpast.ListAssignment:
-                arr = self.execute_ast(node.expr)
-                if type(arr) == PHPArray:
-                    for i in range(len(node.nodes)):
-                        # 获取变量ref并赋值
-                        var = self.get_varref(node.nodes[i])
-                        var.setValue(arr[i])
-                elif type(arr) == ControllableInstance and arr.classname == None:
-                    arr = self.controllable_arr_assign(arr, 0)
-                    var = self.get_varref(node.nodes[0])
-                    var.setValue(arr[0])
-                    for i in range(1, len(node.nodes)):
-                        arr[i] = ControllableInstance()
-                        # 记录root index
-                        tmp_index = copy.copy(arr.index)
-                        tmp_index.append(f'key:{i}')
-                        arr[i].index = tmp_index
-                        # 获取变量ref并赋值
-                        var = self.get_varref(node.nodes[i])
-                        var.setValue(arr[i])
-
-            elif type(node) == phpast.New:
-                # 先找到类，创建一个PHPInstance作为返回值，之后调用该类的构造函数（如果有的话）
-                # 1. use_list 2. 添加反斜杠 3. 添加namespace
-                classname = self.execute_ast(node.name)
-                # if type(classname) == str:
-                #     classname = classname.lower()
-                if type(classname) not in (ControllableInstance, str):
-                    return ret_val
+            if classname == 'static':
+                classname = self.local_var['this'].classname
 
-                # \\ArrayIterator内置类特殊处理（这里仅简化处理
-                if classname == '\\ArrayIterator':
-                    return self.execute_ast(node.params[0].node)
+            inst = None
 
-                # 构造函数第一个参数触发字符串化的情况
-                if classname in class_dict and '!construct_tostr' in class_dict[classname]:
-                    tmp = self.execute_ast(node.params[0].node)
-                    self.tostr(tmp, node.params[0].node)
+            # 类名可控
+            if type(classname) == ControllableInstance and classname.classname == None:
+                par_li = []
+                # 获取参数
+                for vp in node.params:
+                    par_li.append(self.execute_ast(vp.node))
 
-                if type(classname) == ControllableInstance and classname.classname != None:
-                    return ret_val
+                # 构造函数的类名可控的情况，难以进行完整的静态分析，仅直接报sink
+                # self.pop_log_report(
+                #     '任意类构造函数调用(Arbitrary constructor called)', node)
 
-                if classname == 'static':
-                    classname = self.local_var['this'].classname
+                self.controllable_assign(classname, source_token)
 
-                inst = None
+            # 完整的命名空间
+            elif '\\' in classname:
+                inst = PHPInstance(classname)
 
-                # 类名可控
-                if type(classname) == ControllableInstance and classname.classname == None:
-                    par_li = []
-                    # 获取参数
-                    for vp in node.params:
-                        par_li.append(self.execute_ast(vp.node))
+            # 没有加命名空间
+            else:
+                if classname in BuiltinClass:  # 内置类，不关注
+                    inst = None
+                elif classname in self.use_list:  # 在use列表中
+                    inst = PHPInstance(self.use_list[classname])
+                elif self.namespace+'\\' + classname in class_dict:  # 省略了命名空间
+                    inst = PHPInstance(self.namespace+'\\' + classname)
+
+            if inst == None:
+                return 'DONTCARE'
 
-                    # 构造函数的类名可控的情况，难以进行完整的静态分析，仅直接报sink
-                    # self.pop_log_report(
-                    #     '任意类构造函数调用(Arbitrary constructor called)', node)
+            if inst.classname not in class_dict:  # 未找到目标类
+                return 'DONTCARE'
 
-                    self.controllable_assign(classname, source_token)
+            if '__construct' in class_dict[inst.classname]:  # 尝试调用构造函数
+                par_li = []
+                # 获取参数
+                for vp in node.params:
+                    par_li.append(self.execute_ast(vp.node))
 
-                # 完整的命名空间
-                elif '\\' in classname:
-                    inst = PHPInstance(classname)
+                self.call_method(inst, '__construct',
+                                 par_li, node)  # 调用构造函数
 
-                # 没有加命名空间
-                else:
-                    if classname in BuiltinClass:  # 内置类，不关注
-                        inst = None
-                    elif classname in self.use_list:  # 在use列表中
-                        inst = PHPInstance(self.use_list[classname])
-                    elif self.namespace+'\\' + classname in class_dict:  # 省略了命名空间
-                        inst = PHPInstance(self.namespace+'\\' + classname)
+            return inst
+        except Exception:
+            pass
+        return ret_val
 
-                if inst == None:
-                    return 'DONTCARE'
+    # 命名空间
+    @handles(phpast.Namespace)
+    def exec_namespace(self, node):
+        if node.name != None:
+            self.namespace = node.name
+
+    @handles(phpast.Clone)
+    def exec_clone(self, node):
+        # 虽然是clone，由于pop链问题的特殊性，需要对原root进行修改，所以这里直接返回原值
+        # return copy.deepcopy(self.execute_ast(node.node))
+        return self.execute_ast(node.node)
+
+    # 暂不处理
+    @handles(phpast.Break)
+    def exec_break(self, node):
+        pass
+
+    # 暂不处理
+    @handles(phpast.Continue)
+    def exec_continue(self, node):
+        pass
+
+    @handles(phpast.Yield)
+    def exec_yield(self, node):
+        print('Yield', f'''"{node.sourcefile}", line {node.lineno}''')
+
+    @handles(phpast.YieldFrom)
+    def exec_yield_from(self, node):
+        print('YieldFrom',
+              f'''"{node.sourcefile}", line {node.lineno}''')
+
+    # 暂不处理全局变量
+    @handles(phpast.Global)
+    def exec_global(self, node):
+        pass
+
+    @handles(phpast.Static)
+    def exec_static(self, node):
+        for vnode in node.nodes:
+            self.execute_ast(vnode)
+
+    @handles(phpast.Try)
+    def exec_try(self, node):
+        ret_val = None
+        try:
+            ret_val = self.execute_ast(node.nodes)
+            for catch in node.catches:
+                self.execute_ast(catch.nodes)
+        except Exception:
+            pass
+        return ret_val
 
-                if inst.classname not in class_dict:  # 未找到目标类
-                    return 'DONTCARE'
+    @handles(phpast.Catch)
+    def exec_catch(self, node):
+        print('Catch')
+
+    @handles(phpast.Finally)
+    def exec_finally(self, node):
+        print('Finally')
+
+    @handles(phpast.Throw)
+    def exec_throw(self, node):
+        condition_stack[-2].update(condition_stack[-1])
+        self.execute_ast(node.node)
+
+    @handles(phpast.Declare)
+    def exec_declare(self, node):
+        print(
+            'Declare', f'''"{node.sourcefile}", line {node.lineno}''')
+
+    @handles(phpast.Directive)
+    def exec_directive(self, node):
+        print('Directive',
+              f'''"{node.sourcefile}", line {node.lineno}''')
+
+    @handles(phpast.Closure)
+    def exec_closure(self, node):
+        return node  # 直接返回整个匿名函数
+
+    @handles(phpast.Class)
+    def exec_class(self, node):
+        print('Class', f'''"{node.sourcefile}", line {node.lineno}''')
+
+    @handles(phpast.Trait)
+    def exec_trait(self, node):
+        print('Trait', f'''"{node.sourcefile}", line {node.lineno}''')
+
+    @handles(phpast.ClassConstants)
+    def exec_class_constants(self, node):
+        print('ClassConstants')
+
+    @handles(phpast.ClassConstant)
+    def exec_class_constant(self, node):
+        print('ClassConstant')
+
+    @handles(phpast.ClassVariables)
+    def exec_class_variables(self, node):
+        print('ClassVariables')
+
+    @handles(phpast.ClassVariable)
+    def exec_class_variable(self, node):
+        print('ClassVariable')
+
+    @handles(phpast.Interface)
+    def exec_interface(self, node):
+        print('Interface')
+
+    # 暂不处理自增减
+    @handles(phpast.PreIncDecOp)
+    def exec_pre_inc_dec_op(self, node):
+        pass
+
+    # 暂不处理自增减
+    @handles(phpast.PostIncDecOp)
+    def exec_post_inc_dec_op(self, node):
+        pass
+
+    @handles(phpast.Cast)
+    def exec_cast(self, node):
+        ret_val = None
+        try:
+            tmp = self.execute_ast(node.expr)
+            if node.type == 'string':
+                ret_val = self.tostr(tmp, node.expr)
+        except Exception:
+            pass
+        return ret_val
 
-                if '__construct' in class_dict[inst.classname]:  # 尝试调用构造函数
-                    par_li = []
-                    # 获取参数
-                    for vp in node.params:
-                        par_li.append(self.execute_ast(vp.node))
+    @handles(phpast.Empty)
+    def exec_empty(self, node):
+        self.execute_ast(node.expr)
 
-                    self.call_method(inst, '__construct',
-                                     par_li, node)  # 调用构造函数
+    @handles(phpast.Silence)
+    def exec_silence(self, node):
+        return self.execute_ast(node.expr)
 
-                return inst
+    # 先暂时返回常量名
+    @handles(phpast.MagicConstant)
+    def exec_magic_constant(self, node):
+        return node.name
 
-            # 命名空间
-            elif type(node) == phpast.Namespace:
-                if node.name != None:
-                    self.namespace = node.name
+    @handles(phpast.Constant)
+    def exec_constant(self, node):
+        if node.name == 'false':
+            return False
+        elif node.name == 'true':
+            return True
+        elif node.name == 'null':
+            return None
+        # 这里处理有一些问题，用常量名代替常量
+        else:
+            return node.name
+
+    # 暂不处理静态变量
+    @handles(phpast.StaticVariable)
+    def exec_static_variable(self, node):
+        pass
+        # print('StaticVariable')
+
+    @handles(phpast.LexicalVariable)
+    def exec_lexical_variable(self, node):
+        print('LexicalVariable')
+
+    @handles(phpast.FormalParameter)
+    def exec_formal_parameter(self, node):
+        print('FormalParameter')
+
+    @handles(phpast.Parameter)
+    def exec_parameter(self, node):
+        print('Parameter')
+
+    # 暂时不关心字符串索引
+    @handles(phpast.StringOffset)
+    def exec_string_offset(self, node):
+        return None
+
+    # 暂不处理静态属性
+    @handles(phpast.StaticProperty)
+    def exec_static_property(self, node):
+        return None
+
+    @handles(phpast.StaticMethodCall)
+    def exec_static_method_call(self, node):
+        ret_val = None
+        try:
+            par_li = []
+            # 获取参数
+            for vp in node.params:
+                par_li.append(self.execute_ast(vp.node))
 
-            elif type(node) == phpast.Clone:
-                # 虽然是clone，由于pop链问题的特殊性，需要对原root进行修改，所以这里直接返回原值
-                # return copy.deepcopy(self.execute_ast(node.node))
-                return self.execute_ast(node.node)
+            vclassname = self.execute_ast(node.class_)
 
-            # 暂不处理
-            elif type(node) == phpast.Break:
-                pass
+            if type(vclassname) == ControllableInstance:  # 不处理可控对象的静态方法调用
+                return ret_val
 
-            # 暂不处理
-            elif type(node) == phpast.Continue:
-                pass
+            if vclassname == 'self':
+                classname = self.local_var['this'].classname
+            elif vclassname == 'parent':
+                return self.call_method('parent', node.name, par_li, node)
+            elif vclassname in self.use_list:
+                classname = self.use_list[vclassname]
+            elif '\\' in vclassname:
+                classname = vclassname
+            else:
+                classname = self.namespace+'\\'+vclassname
 
-            elif type(node) == phpast.Yield:
-                print('Yield', f'''"{node.sourcefile}", line {node.lineno}''')
+            ret_val = self.call_static_method(
+                classname, node.name, par_li, node)
+        except Exception:
+            pass
+        return ret_val
 
-            elif type(node) == phpast.YieldFrom:
-                print('YieldFrom',
-                      f'''"{node.sourcefile}", line {node.lineno}''')
+    @handles(phpast.ElseIf)
+    def exec_else_if(self, node):
+        print('ElseIf')
 
-            elif type(node) == phpast.Global:  # 暂不处理全局变量
-                pass
+    @handles(phpast.Else)
+    def exec_else(self, node):
+        print('Else')
 
-            elif type(node) == phpast.Static:
-                for vnode in node.nodes:
-                    self.execute_ast(vnode)
+    @handles(phpast.ForeachVariable)
+    def exec_foreach_variable(self, node):
+        print('ForeachVariable')
 
-            elif type(node) == phpast.Try:
-                ret_val = self.execute_ast(node.nodes)
-                for catch in node.catches:
-                    self.execute_ast(catch.nodes)
+    @handles(phpast.Case)
+    def exec_case(self, node):
+        ret_val = None
+        try:
+            ret_val = self.execute_ast(node.nodes)
+        except Exception:
+            pass
+        return ret_val
 
-            elif type(node) == phpast.Catch:
-                print('Catch')
+    @handles(phpast.Default)
+    def exec_default(self, node):
+        ret_val = None
+        try:
+            ret_val = self.execute_ast(node.nodes)
+        except Exception:
+            pass
+        return ret_val
 
-            elif type(node) == phpast.Finally:
-                print('Finally')
+    @handles(phpast.UseDeclarations)
+    def exec_use_declarations(self, node):
+        print('UseDeclarations')
 
-            elif type(node) == phpast.Throw:
-                condition_stack[-2].update(condition_stack[-1])
-                self.execute_ast(node.node)
+    @handles(phpast.UseDeclaration)
+    def exec_use_declaration(self, node):
+        print('UseDeclaration')
 
-            elif type(node) == phpast.Declare:
-                print(
-                    'Declare', f'''"{node.sourcefile}", line {node.lineno}''')
+    @handles(phpast.ConstantDeclarations)
+    def exec_constant_declarations(self, node):
+        print('ConstantDeclarations')
 
-            elif type(node) == phpast.Directive:
-                print('Directive',
-                      f'''"{node.sourcefile}", line {node.lineno}''')
+    @handles(phpast.ConstantDeclaration)
+    def exec_constant_declaration(self, node):
+        print('ConstantDeclaration')
 
-            elif type(node) == phpast.Closure:
-                return node  # 直接返回整个匿名函数
+    @handles(phpast.TraitUse)
+    def exec_trait_use(self, node):
+        print('TraitUse')
 
-            elif type(node) == phpast.Class:
-                print('Class', f'''"{node.sourcefile}", line {node.lineno}''')
+    @handles(phpast.TraitModifier)
+    def exec_trait_modifier(self, node):
+        print('TraitModifier')
 
-            elif type(node) == phpast.Trait:
-                print('Trait', f'''"{node.sourcefile}", line {node.lineno}''')
 
-            elif type(node) == phpast.ClassConstants:
-                print('ClassConstants')
 
-            elif type(node) == phpast.ClassConstant:
-                print('ClassConstant')
+# 函数名 -> (漏洞类型, 污点参数位置, 检查方法)，由sink表解析检查方式得到，check_func_sink只需查一次表
+sink_dispatch = MappingProxyType({
+    funcname: (vtype, args, sink_check_handlers[check])
+    for funcname, (vtype, args, check) in sink_table.items()
+})
 
-            elif type(node) == phpast.ClassVariables:
-                print('ClassVariables')
+# 并行查找时各进程共享的已找到链数量，用于在进程间保持early_stop_num
+chain_counter = None
 
-            elif type(node) == phpast.ClassVariable:
-                print('ClassVariable')
 
-            elif type(node) == phpast.Interface:
-                print('Interface')
+def claim_chain():
+    '''
+    确认记录一条新找到的链，已达到early_stop_num时返回False
+    并行查找时在共享计数上加一，并将本进程的find_num同步为总数
+    '''
+    global find_num
 
-            # 暂不处理自增减
-            elif type(node) == phpast.PreIncDecOp:
-                pass
+    if chain_counter is None:
+        find_num += 1
+        return True
 
-            # 暂不处理自增减
-            elif type(node) == phpast.PostIncDecOp:
-                pass
+    with chain_counter.get_lock():
+        if chain_counter.value >= early_stop_num:
+            find_num = chain_counter.value
+            return False
+        chain_counter.value += 1
+        find_num = chain_counter.value
+    return True
 
-            elif type(node) == phpast.Cast:
-                tmp = self.execute_ast(node.expr)
-                if node.type == 'string':
-                    ret_val = self.tostr(tmp, node.expr)
 
-            elif type(node) == phpast.Empty:
-                self.execute_ast(node.expr)
+def search_entries():
+    '''
+    按查找顺序列出所有入口 [(对象方法, 入口类), ...]
+    '''
+    entries = []
+    for func in entry_func_li:
 
-            elif type(node) == phpast.Silence:
-                return self.execute_ast(node.expr)
+        # 去掉不存在的对象方法
+        if func not in attr_func_dict:
+            continue
 
-            # 先暂时返回常量名
-            elif type(node) == phpast.MagicConstant:
-                return node.name
+        for vclass in attr_func_dict[func]:  # 查找入口类
+            entries.append((func, vclass))
+    return entries
 
-            elif type(node) == phpast.Constant:
-                if node.name == 'false':
-                    return False
-                elif node.name == 'true':
-                    return True
-                elif node.name == 'null':
-                    return None
-                # 这里处理有一些问题，用常量名代替常量
-                else:
-                    return node.name
 
-            # 暂不处理静态变量
-            elif type(node) == phpast.StaticVariable:
-                pass
-                # print('StaticVariable')
+def search_entry(func, vclass):
+    '''
+    以vclass的func方法为入口模拟执行，查找POP链
+    '''
+    global find_num
 
-            elif type(node) == phpast.LexicalVariable:
-                print('LexicalVariable')
+    if chain_counter is not None:
+        find_num = chain_counter.value  # 其它进程已找到的链
 
-            elif type(node) == phpast.FormalParameter:
-                print('FormalParameter')
+    namespace = ''
 
-            elif type(node) == phpast.Parameter:
-                print('Parameter')
+    new_key = random_string()  # 生成初始key
 
-            # 暂时不关心字符串索引
-            elif type(node) == phpast.StringOffset:
-                return None
+    root = ControllableInstance(vclass)  # 根对象
+    root.key = new_key
+    local_var = LocalVarDict({
+        'this': root
+    })
 
-            # 暂不处理静态属性
-            elif type(node) == phpast.StaticProperty:
-                return None
+    called_method = class_dict[vclass][func]
 
-            elif type(node) == phpast.StaticMethodCall:
+    pop_dict[new_key] = POPInfo(root)  # 记录POP链信息
+    pop_dict[new_key].possibleInfo.append(func+':')
+    pop_dict[new_key].normalInfo.append(vclass+'#'+func)
+    pop_dict[new_key].callsiteInfo.append(
+        [called_method.sourcefile, called_method.lineno])
+    condition_stack.append(set()) # 最外层的条件栈
+    cond_stack_depth.append(len(condition_stack))
+    if '__wakeup' in class_dict[vclass]:
+        pop_dict[new_key].wakeupExist = True
 
-                par_li = []
-                # 获取参数
-                for vp in node.params:
-                    par_li.append(self.execute_ast(vp.node))
+    # 尝试获取use语句列表
+    if hasattr(called_method, 'use_list'):
+        use_list = called_method.use_list
+    else:
+        use_list = {}
+    myExecutor = ASTExecutor(new_key, namespace, local_var, use_list)
 
-                vclassname = self.execute_ast(node.class_)
+    myExecutor.execute_ast(called_method)  # 执行ast
 
-                if type(vclassname) == ControllableInstance:  # 不处理可控对象的静态方法调用
-                    return ret_val
 
-                if vclassname == 'self':
-                    classname = self.local_var['this'].classname
-                elif vclassname == 'parent':
-                    return self.call_method('parent', node.name, par_li, node)
-                elif vclassname in self.use_list:
-                    classname = self.use_list[vclassname]
-                elif '\\' in vclassname:
-                    classname = vclassname
-                else:
-                    classname = self.namespace+'\\'+vclassname
+def search_worker_init():
+    '''
+    查找子进程不执行主进程的退出处理（写入结果文件），收到信号时直接退出
+    '''
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
 
-                ret_val = self.call_static_method(
-                    classname, node.name, par_li, node)
 
-            elif type(node) == phpast.ElseIf:
-                print('ElseIf')
+def search_entry_part(task):
+    '''
+    在查找子进程中执行一个入口
+    链和patch写入该入口单独的结果文件，由主进程按入口顺序合并，返回 (链文件, patch文件, 收集的patch信息)
+    '''
+    global result_file, patch_file
 
-            elif type(node) == phpast.Else:
-                print('Else')
+    i, func, vclass, parts_dir = task
+    result_file = os.path.join(parts_dir, f'{i}.pop_chains.json')
+    patch_file = os.path.join(parts_dir, f'{i}.patch.json')
 
-            elif type(node) == phpast.ForeachVariable:
-                print('ForeachVariable')
+    try:
+        search_entry(func, vclass)
+    except Exception:
+        traceback.print_exc()
+    result_writer.flush()
+    sys.stdout.flush()
 
-            elif type(node) == phpast.Case:
-                ret_val = self.execute_ast(node.nodes)
+    collected = (list(patch_collect), list(unable2patch_entry))
+    patch_collect.clear()
+    unable2patch_entry.clear()
+    return result_file, patch_file, collected
 
-            elif type(node) == phpast.Default:
-                ret_val = self.execute_ast(node.nodes)
 
-            elif type(node) == phpast.UseDeclarations:
-                print('UseDeclarations')
+def append_part(part_file, dest_file):
+    if not os.path.exists(part_file):
+        return
+    with open(part_file, 'rb') as fr, open(dest_file, 'ab') as fw:
+        shutil.copyfileobj(fr, fw)
+    os.remove(part_file)
 
-            elif type(node) == phpast.UseDeclaration:
-                print('UseDeclaration')
 
-            elif type(node) == phpast.ConstantDeclarations:
-                print('ConstantDeclarations')
+def search_pop_chains():
+    '''
+    以entry_func_li中的对象方法为入口，逐个入口类模拟执行，查找POP链
+    需要先调用dynamic_class_set_attr()建立索引
 
-            elif type(node) == phpast.ConstantDeclaration:
-                print('ConstantDeclaration')
+    search_workers大于1（或为0且有多个CPU）且系统支持fork时，入口类分配到进程池中并行查找，
+    子进程fork时继承已建立的索引（见freeze_index）。结果按入口顺序合并，找到的链总数仍受early_stop_num限制
+    查找子进程意外退出（进程池损坏）时，尚未完成的入口在主进程中逐个查找
+    '''
+    global chain_counter, find_num
 
-            elif type(node) == phpast.TraitUse:
-                print('TraitUse')
+    entries = search_entries()
+    report_progress('search', 0, len(entries), find_num)
 
-            elif type(node) == phpast.TraitModifier:
-                print('TraitModifier')
+    workers = search_workers or os.cpu_count() or 1
+    workers = min(workers, len(entries))
 
-        except Exception as e:
-            pass
-            # with open(log_file, 'a') as fw:
-            #     print('[- error]', type(e),
-            #           f'''"{node.sourcefile}", line {node.lineno}''', file=fw)
-            # print(traceback.format_exc(), file=fw)
+    pool = None
+    # 调用图收集在各进程中无法合并，此时逐个查找
+    if workers > 1 and not graph_gen and 'fork' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('fork')
+        chain_counter = ctx.Value('i', find_num)
+        result_writer.flush()  # 子进程不能继承缓冲中的结果
+        freeze_index()  # 子进程共享主进程中的索引
+        try:
+            pool = new_process_pool(workers, initializer=search_worker_init)
+        except OSError as e:
+            unfreeze_index()
+            chain_counter = None
+            print('[warning] Cannot start search workers, entries will be searched serially: '+str(e))
 
-        # self.check_local_var_ctrl()
-        return ret_val
+    if pool is None:
+        try:
+            for done, (func, vclass) in enumerate(entries, 1):
+                search_entry(func, vclass)
+                report_progress('search', done, len(entries), find_num)
+        finally:
+            result_writer.flush()
+        return
+
+    parts_dir = os.path.join(res_root, 'parts')
+    os.makedirs(parts_dir, exist_ok=True)
+
+    remaining = []
+    try:
+        # 每个入口一个任务：各入口耗时差别很大，逐个分配
+        futures = [pool.submit(search_entry_part, (i, func, vclass, parts_dir))
+                   for i, (func, vclass) in enumerate(entries)]
+        for done, future in enumerate(futures, 1):
+            try:
+                chains_part, patch_part, collected = future.result()
+            except BrokenProcessPool:
+                # 子进程意外退出（栈溢出、内存不足），未完成入口的部分结果丢弃，之后在主进程中逐个查找
+                print('[warning] A search worker exited unexpectedly, the remaining entries will be searched serially')
+                remaining = entries[done - 1:]
+                break
+            append_part(chains_part, result_file)
+            append_part(patch_part, patch_file)
+            patch_collect.update(collected[0])
+            unable2patch_entry.update(collected[1])
+            report_progress('search', done, len(entries), chain_counter.value)
+    finally:
+        close_process_pool(pool)
+        unfreeze_index()
+        find_num = chain_counter.value
+        chain_counter = None
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    try:
+        for done, (func, vclass) in enumerate(remaining, len(entries) - len(remaining) + 1):
+            search_entry(func, vclass)
+            report_progress('search', done, len(entries), find_num)
+    finally:
+        result_writer.flush()
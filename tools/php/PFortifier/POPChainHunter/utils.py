@@ -1,6 +1,6 @@
-from phply import phpast
-from phply.phplex import lexer
-from phply.phpparse import make_parser
+from phply import phpast, phplex, phpparse
+from phply.phplex import lexer, make_lexer
+from phply.phpparse import make_parser, get_parser
 import string
 import random
 from collections import OrderedDict
@@ -8,12 +8,22 @@ import os
 from config import *
 from POPChainHunter.BuiltinClass import *
 from POPChainHunter.BuiltinInterface import *
+from POPChainHunter.Journal import journal, JournaledObject, JournaledDict, JournaledOrderedDict, JournaledList
 import sys
 import time
 import pickle
 import copy
+import gc
 import traceback
 import signal
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import tempfile
+import json
+from types import MappingProxyType
 
 
 start_time = time.time()
@@ -110,6 +120,86 @@ file_sensitive_func2 = [
     'symlink',
 ]
 
+# sink表的检查方式（ASTExecutor中对应的 check_sink_<检查方式> 方法）
+# - tainted：各污点参数都可控时报告
+# - xss：同tainted，排除print_r(xxx, True)
+# - file_write：第一个污点参数为文件名，其余为文件内容；内容可控，且文件名可控或以.php结尾时报告
+# - controllable：污点参数是可控对象（如可控的文件句柄）时报告
+# - file_handle：fwrite等，文件句柄可控或其文件名可控/以.php结尾，且写入的内容可控时报告
+# - curl_handle：curl句柄可控或其url可控时报告
+sink_checks = ('tainted', 'xss', 'file_write', 'controllable', 'file_handle', 'curl_handle')
+
+
+def sink_entries():
+    '''
+    内置的sink，返回 [(函数名, 漏洞类型, 污点参数位置, 检查方式), ...]
+    '''
+    groups = [
+        (file_read_func, '任意文件读取(Arbitrary file reading)', (0,), 'tainted'),
+        (['fread'], '任意文件读取(Arbitrary file reading)', (0,), 'controllable'),
+        (file_del_func, '任意文件删除(Arbitrary file deletion)', (0,), 'tainted'),
+        (file_sensitive_func1, '文件敏感操作(File sensitive operation)', (0,), 'tainted'),
+        (file_sensitive_func2, '文件敏感操作(File sensitive operation)', (0, 1), 'tainted'),
+        (code_rce, '任意代码执行(Arbitrary code execution)', (0,), 'tainted'),
+        (['preg_replace'], 'Preg_replace任意代码执行(Preg_replace arbitrary code execution)', (0, 1), 'tainted'),
+        (['preg_replace_callback'],
+         'Preg_replace_callback任意代码执行(Preg_replace_callback arbitrary code execution)', (1, 2), 'tainted'),
+        (sys_rce, '系统命令注入(Command injection)', (0,), 'tainted'),
+        (['mail'], 'mail()选项注入(mail() options injection)', (4,), 'tainted'),
+        (['file_put_contents'], '任意文件写入(Arbitrary file write)', (0, 1), 'file_write'),
+        (['simplexml_load_string', 'simplexml_load_file'], 'XXE', (0,), 'tainted'),
+        (ssrf_func, 'SSRF', (0,), 'tainted'),
+        (sqli_func2, 'SQL注入(SQL injection)', (0,), 'tainted'),
+        (xss_func, 'XSS', (0,), 'xss'),
+        # 第二个参数（目标文件名）可控或者结尾是php，则能够上传php文件
+        (['move_uploaded_file'], '文件上传(File uploading)', (1,), 'file_write'),
+        (sqli_func, 'SQL注入(SQL injection)', (1,), 'tainted'),
+        (['fputs', 'fwrite'], '任意文件写入(Arbitrary file write)', (0, 1), 'file_handle'),
+        (['curl_exec'], 'SSRF', (0,), 'curl_handle'),
+    ]
+    return [(funcname, vtype, args, check) for funcs, vtype, args, check in groups for funcname in funcs]
+
+
+def read_sink_file(path):
+    '''
+    读取自定义sink文件（json），格式：
+    [
+        {"name": "函数名", "type": "漏洞类型", "args": [污点参数位置, ...], "check": "检查方式（可省略，默认tainted）"},
+        ...
+    ]
+    返回 [(函数名, 漏洞类型, 污点参数位置, 检查方式), ...]
+    '''
+    with open(path, encoding='utf-8') as fr:
+        items = json.load(fr)
+
+    entries = []
+    for item in items:
+        check = item.get('check', 'tainted')
+        if check not in sink_checks:
+            raise ValueError(f'unknown sink check "{check}" of {item["name"]} in {path}')
+        args = tuple(int(i) for i in item['args'])
+        if not args or min(args) < 0:
+            raise ValueError(f'invalid tainted arguments {item["args"]} of {item["name"]} in {path}')
+        entries.append((item['name'], item['type'], args, check))
+    return entries
+
+
+def build_sink_table():
+    '''
+    建立只读的sink表：{函数名: (漏洞类型, 污点参数位置, 检查方式)}
+    自定义sink文件中的函数覆盖内置的同名sink
+    '''
+    table = {}
+    entries = sink_entries()
+    if custom_sink_file:
+        entries += read_sink_file(os.path.join(hunter_root, custom_sink_file))
+    for funcname, vtype, args, check in entries:
+        table[funcname] = (vtype, args, check)
+    return MappingProxyType(table)
+
+
+sink_table = build_sink_table()
+
 # ----结束
 
 pop_dict = {}
@@ -317,7 +407,120 @@ def info_log(cur_time):
         fw.write('Time spent: '+str(cur_time-start_time)+'(s)\n')
 
 
-class POPInfo:
+class ResultWriter:
+    '''
+    缓冲找到的链和patch，定期追加到结果文件，避免每找到一条链都打开、关闭文件
+    - .lines: {文件路径: [待写入的行, ...]}
+    - .chains: 待输出到stdout的链，每行以 "[chain] " 开头，调用方可在扫描结束前读取
+    - .pending: 缓冲中的行数
+    - .last_flush: 上次写入的时间
+
+    缓冲中的行数达到result_flush_num，或距上次写入超过result_flush_interval秒时写入；
+    后者由后台计时线程（缓冲中有内容时启动）和report_progress()检查，查找长时间没有新结果时也会按时写入。
+    扫描结束、退出（exit_handler）和fork查找子进程前须调用flush()
+    '''
+
+    def __init__(self):
+        self.lines = {}
+        self.chains = []
+        self.pending = 0
+        self.last_flush = time.time()
+        self._lock = threading.RLock()
+        self._timer = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # 子进程中没有计时线程，父进程的计时线程可能正持有锁
+        self._lock = threading.RLock()
+        self._timer = None
+
+    def write(self, path, line):
+        with self._lock:
+            if path not in self.lines:
+                self.lines[path] = []
+            self.lines[path].append(line)
+            self.pending += 1
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._flush_loop, daemon=True)
+                self._timer.start()
+
+    def add_chain(self, path, vul_info):
+        line = json.dumps(vul_info, ensure_ascii=False)
+        with self._lock:
+            self.write(path, line)
+            self.chains.append(line)
+            if self.pending >= result_flush_num:
+                self.flush()
+            else:
+                self.flush_due()
+
+    def flush_due(self):
+        '''
+        缓冲中有内容且距上次写入超过result_flush_interval秒时写入
+        '''
+        if self.pending and time.time() - self.last_flush >= result_flush_interval:
+            self.flush()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(result_flush_interval)
+            try:
+                self.flush_due()
+            except Exception:
+                traceback.print_exc()
+
+    def flush(self):
+        with self._lock:
+            lines, self.lines = self.lines, {}
+            chains, self.chains = self.chains, []
+            self.pending = 0
+            self.last_flush = time.time()
+
+            for path, path_lines in lines.items():
+                with open(path, 'a', encoding='utf8') as fw:
+                    fw.write('\n'.join(path_lines) + '\n')
+            if chains:
+                # 一次写入，避免与其它线程输出的行交错
+                sys.stdout.write(''.join('[chain] ' + line + '\n' for line in chains))
+                sys.stdout.flush()
+                # 记录当前时间
+                info_log(self.last_flush)
+
+
+result_writer = ResultWriter()
+
+last_progress = 0  # 上次输出进度的时间
+
+
+def report_progress(phase, done, total, chains=0):
+    '''
+    以 "[progress] <json>" 的一行向stdout输出扫描进度，供调用方展示
+    phase：parse（解析php文件，done/total为文件数）、search（查找POP链，done/total为入口类数）
+    距上次输出不足progress_interval秒时跳过，阶段开始和结束时总会输出
+    '''
+    global last_progress
+
+    # 长时间没有找到新的链时，缓冲中的链也按时写入
+    result_writer.flush_due()
+
+    now = time.time()
+    if 0 < done < total and now - last_progress < progress_interval:
+        return
+    last_progress = now
+
+    # 一次写入，避免与计时线程输出的链交错
+    sys.stdout.write('[progress] ' + json.dumps({
+        'phase': phase,
+        'done': done,
+        'total': total,
+        'chains': chains,
+        'elapsed': round(now - start_time, 1),
+    }) + '\n')
+    sys.stdout.flush()
+
+
+class POPInfo(JournaledObject):
     '''
     记录POP链的详细信息
     - .root: ControllableInstance, # 记录pop链的根对象
@@ -327,20 +530,20 @@ class POPInfo:
     - .jmpNode,  # 在漏洞报告时储存跳转节点
     - .wakeupExist, # 入口类是否有wakeup
     - .firstJmpIndex, # 记录第一个跳转对应的root index，用于生成精准wakeup建议
-    由于需要支持深拷贝，所有属性均不能包含"引用"，比如dict的引用
+    分支间通过journal回滚状态，所有可变属性都需要使用Journaled容器
     '''
 
     def __init__(self, root):
         self.root = root
-        self.normalInfo = []
-        self.possibleInfo = []
-        self.callsiteInfo = []
+        self.normalInfo = JournaledList()
+        self.possibleInfo = JournaledList()
+        self.callsiteInfo = JournaledList()
         self.jmpNode = None
         self.wakeupExist = False
         self.firstJmpIndex = None
 
 
-class PHPArray:
+class PHPArray(JournaledObject):
     '''
     php数组比较奇葩，这里单独实现
     '''
@@ -354,9 +557,9 @@ class PHPArray:
 
     def __init__(self, vdict=None):
         if vdict == None:
-            self.vdict = OrderedDict()
+            self.vdict = JournaledOrderedDict()
         else:
-            self.vdict = OrderedDict(vdict)
+            self.vdict = JournaledOrderedDict(vdict)
 
     def append(self, ele):
         self.curIndex += 1
@@ -392,9 +595,7 @@ class PHPArray:
                 self.curIndex = key
             self.vdict[key] = tmp_ele
             # 记录root index
-            tmp_index = copy.copy(self.index)
-            tmp_index.append('key:{}'.format(key))
-            tmp_ele.index = tmp_index
+            tmp_ele.index = self.index + (key_step(key),)
             return tmp_ele
         else:
             return 'NOTFOUND'
@@ -425,7 +626,7 @@ class PHPArray:
         self.vdict.move_to_end(self.curIndex, last=False)
 
 
-class PHPInstance:
+class PHPInstance(JournaledObject):
     '''
     php对象模拟
     classname为包含名称空间的完整类名
@@ -435,7 +636,7 @@ class PHPInstance:
 
     def __init__(self, classname):
         self.classname = classname
-        self.attr = {}
+        self.attr = JournaledDict()
 
 
 class LocalVarDict(dict):
@@ -460,11 +661,40 @@ class ControllableInstance(PHPInstance):
 
     def __init__(self, classname=None):
         self.classname = classname
-        self.attr = {}
+        self.attr = JournaledDict()
         self.type = None
         self.sanitized = False
         self.isControllable = True  # 为了与PHPArray统一接口，增加此属性
-        self.index = []  # 储存从根对象到当前对象的索引链 ['attr:xxx', 'key:xxx']
+        self.index = ()  # 储存从根对象到当前对象的索引链 (('attr', 'xxx'), ('key', 'xxx'))，见attr_step、key_step
+
+
+attr_steps = {}
+key_steps = {}
+
+
+def attr_step(name):
+    '''
+    index链中访问属性的一步 ('attr', 属性名)，同一属性名共用一个tuple
+    '''
+    try:
+        return attr_steps[name]
+    except KeyError:
+        if type(name) != str:
+            raise TypeError('attribute name must be str, not '+type(name).__name__)
+        step = attr_steps[name] = ('attr', name)
+        return step
+
+
+def key_step(key):
+    '''
+    index链中访问数组元素的一步 ('key', 键)，键统一记录为字符串，同一个键共用一个tuple
+    '''
+    key = str(key)
+    try:
+        return key_steps[key]
+    except KeyError:
+        step = key_steps[key] = ('key', key)
+        return step
 
 
 class VarRef:
@@ -482,7 +712,7 @@ class VarRef:
         '''
         对ref进行赋值
         '''
-        if type(self.ref) in (dict, LocalVarDict, PHPArray):
+        if type(self.ref) in (dict, JournaledDict, LocalVarDict, PHPArray):
             if self.key != None:
                 self.ref[self.key] = val
             # 数组赋值 $this->ClassObj['where'][$logic][] = xxx
@@ -510,7 +740,7 @@ class ToStringNode:
         self.node = node
 
     def __getattr__(self, name):
-        return self.node.__dict__[name]
+        return getattr(self.node, name)
 
 
 class CallNode:
@@ -523,7 +753,7 @@ class CallNode:
         self.node = node
 
     def __getattr__(self, name):
-        return self.node.__dict__[name]
+        return getattr(self.node, name)
 
 
 class IteratorNode:
@@ -537,7 +767,7 @@ class IteratorNode:
 
     def __getattr__(self, name):
         # try:
-        return self.node.__dict__[name]
+        return getattr(self.node, name)
         # except KeyError:
         #     print()
 
@@ -553,7 +783,7 @@ class ArrayAccessNode:
 
     def __getattr__(self, name):
         # try:
-        return self.node.__dict__[name]
+        return getattr(self.node, name)
         # except KeyError:
         #     print()
 
@@ -971,39 +1201,273 @@ def load_cannot_user():
 loaded = None  # 用于在处理继承和trait use时记录已加载过的类和trait
 
 
-def dynamic_class_set_attr():
+def source_signature(*paths):
     '''
-    解析目标目录下所有的php文件中的类，并记录类中的方法和属性
+    对源码文件计算签名，代码变化后基于旧代码生成的缓存自动失效
+    '''
+    hasher = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as fr:
+            hasher.update(fr.read())
+    return hasher.hexdigest().encode()
 
-    不会去解析其中include的文件，每个文件只过一遍
+
+def evict_cache(cache_dir, max_mb):
+    '''
+    缓存目录超过max_mb时，按最近使用时间（mtime，命中缓存时会更新）从旧到新删除缓存文件
+    '''
+    entries = []
+    for root, _, files in os.walk(cache_dir):
+        for f in files:
+            if not f.endswith('.pkl'):
+                continue
+            path = os.path.join(root, f)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:  # 被并发的扫描删除
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    max_bytes = max_mb * 1024 * 1024
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def write_cache(path, obj):
+    '''
+    写入缓存，先写临时文件再替换，并发的扫描不会读到不完整的缓存
+    '''
+    tmp = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fw:
+            pickle.dump(obj, fw, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception:  # 缓存写入失败不影响扫描
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def read_cache(path):
     '''
+    读取缓存并更新其使用时间，不存在或已损坏时返回None
+    '''
+    try:
+        with open(path, 'rb') as fr:
+            obj = pickle.load(fr)
+    except Exception:
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return obj
 
-    # 使用缓存
-    if use_cache:
+
+# 解析器的签名，语法或AST节点定义变化后旧的AST缓存失效
+ast_signature = source_signature(phpast.__file__, phplex.__file__, phpparse.__file__)
+
+# 索引构建代码的签名，与解析器签名一起作为索引缓存的版本
+index_signature = source_signature(
+    __file__,
+    os.path.join(os.path.dirname(__file__), 'BuiltinClass.py'),
+    os.path.join(os.path.dirname(__file__), 'BuiltinInterface.py'),
+) + ast_signature
+
+
+def ast_cache_path(digest):
+    return os.path.join(ast_cache_dir, digest[:2], digest + '.pkl')
+
+
+def parse_php_file(vphpfile):
+    '''
+    解析单个php文件，返回 (ast, warning)，无法解析时ast为None
+    可在解析子进程中运行，返回值会通过pickle传回主进程
+    开启use_ast_cache时，内容未变化的文件直接使用缓存的解析结果
+    '''
+    with open(vphpfile, 'rb') as fr:
+        raw = fr.read()
+    try:
+        testphpfile = raw.decode('utf8')
+    except UnicodeDecodeError:
+        return None, '[warning] The file cannot be decoded: '+vphpfile
+    # 与文本模式读取一致，统一换行符
+    testphpfile = testphpfile.replace('\r\n', '\n').replace('\r', '\n')
+
+    if use_ast_cache:
+        digest = hashlib.sha256(ast_signature + raw).hexdigest()
+        entry = read_cache(ast_cache_path(digest))
+    else:
+        entry = None
+
+    if entry is None:
+        parser = get_parser()
+        file_lexer = make_lexer()
         try:
-            # 使用update是为了保留原索引，python在引入库中的变量时会重新获取一个新变量，
-            # 如果直接在这里赋值，在链查找时获得的是最初的那个索引（为空）
-            # 不用管trait，因为trait的信息已经被解析到class_dict中了
-            with open(attr_func_dict_cache, 'rb') as fr:
-                attr_func_dict.update(pickle.load(fr))
+            entry = (parser.parse(testphpfile, lexer=file_lexer), None)
 
-            with open(class_dict_cache, 'rb') as fr:
-                class_dict.update(pickle.load(fr))
+        except SyntaxError as e:  # 语法错误时直接忽略掉该文件，错误信息与路径无关，一并缓存
+            entry = (None, f'''line {file_lexer.lineno}\n{e}''')
 
-            with open(global_func_dict_cache, 'rb') as fr:
-                global_func_dict.update(pickle.load(fr))
+        if use_ast_cache:
+            write_cache(ast_cache_path(digest), entry)
 
-            with open(cannot_unser_cache, 'rb') as fr:
-                cannot_unser.update(pickle.load(fr))
+    vast, error = entry
+    if error is not None:
+        return None, f'''[warning] SyntaxError in file "{vphpfile}", {error}'''
+    return vast, None
 
-            return
-        except FileNotFoundError:
-            # 创建、清空缓存文件夹
-            try:
-                shutil.rmtree(hunter_root+'/cache/')
-            except FileNotFoundError:
-                pass
-            os.makedirs(hunter_root+'/cache/')
+
+def parse_worker_init():
+    '''
+    解析子进程不执行主进程的退出处理（写入结果文件），收到信号时直接退出
+    '''
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def new_process_pool(workers, initializer=None):
+    '''
+    以fork方式启动的进程池，子进程继承主进程中已建立的解析表/索引
+    使用ProcessPoolExecutor而不是multiprocessing.Pool：子进程被杀死（内存不足、栈溢出）时，
+    multiprocessing.Pool会补充新的子进程，但丢失的任务永远不会返回，取结果时一直阻塞；
+    ProcessPoolExecutor则令所有未完成的任务抛出BrokenProcessPool
+    '''
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'), initializer=initializer)
+
+
+def close_process_pool(pool):
+    '''
+    关闭进程池：取消尚未开始的任务，结束仍在运行的子进程（中途出错或被中断时不等待其完成）
+    '''
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join()
+
+
+def parse_php_files(php_files):
+    '''
+    按输入顺序依次产出 (文件路径, ast, warning)
+
+    parse_workers大于1（或为0且有多个CPU）且系统支持fork时，使用进程池并行解析，
+    否则在当前进程中逐个解析。子进程解析失败或结果无法传回的文件会在主进程中重新解析；
+    子进程意外退出（进程池损坏）时，剩余的文件都在主进程中逐个解析
+    '''
+    workers = parse_workers or os.cpu_count() or 1
+    workers = min(workers, len(php_files))
+
+    get_parser()  # 在fork前构建解析表，子进程直接继承
+
+    pool = None
+    if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        try:
+            pool = new_process_pool(workers, initializer=parse_worker_init)
+        except OSError as e:
+            print('[warning] Cannot start parse workers, files will be parsed serially: '+str(e))
+
+    if pool is None:
+        for vphpfile in php_files:
+            yield (vphpfile,) + parse_php_file(vphpfile)
+        return
+
+    try:
+        # 每个文件一个任务：单个文件出错不影响后续结果的获取
+        futures = [pool.submit(parse_php_file, vphpfile) for vphpfile in php_files]
+        broken = False
+        for i, vphpfile in enumerate(php_files):
+            future, futures[i] = futures[i], None  # 取出结果后不再持有
+            if broken:
+                vast, warning = parse_php_file(vphpfile)
+            else:
+                try:
+                    vast, warning = future.result()
+                except BrokenProcessPool:
+                    print('[warning] A parse worker exited unexpectedly, the remaining files will be parsed serially')
+                    broken = True
+                    vast, warning = parse_php_file(vphpfile)
+                except Exception:
+                    vast, warning = parse_php_file(vphpfile)
+            yield vphpfile, vast, warning
+    finally:
+        close_process_pool(pool)
+
+
+def index_cache_key(php_files):
+    '''
+    项目索引缓存的键：索引代码版本 + 影响索引的配置 + 项目根目录 + 按顺序的各文件路径和内容哈希
+    类信息的登记依赖文件顺序，文件列表的顺序也计入键中
+    只影响POP链搜索的配置（如max_pm_length）不计入，修改后再次扫描仍可使用缓存
+    '''
+    hasher = hashlib.sha256(index_signature)
+    hasher.update(repr((sorted(php_exts), exclude_die_wakeup, php_prog_root)).encode())
+    for vphpfile in php_files:
+        with open(vphpfile, 'rb') as fr:
+            digest = hashlib.sha256(fr.read()).hexdigest()
+        hasher.update(f'{os.path.relpath(vphpfile, php_prog_root)}\0{digest}\n'.encode())
+    return hasher.hexdigest()
+
+
+def index_cache_path(key):
+    return os.path.join(index_cache_dir, key + '.pkl')
+
+
+# 索引缓存中保存的全局表，整体pickle以保留各表之间共享的AST节点
+index_tables = (class_dict, attr_func_dict, global_func_dict, cannot_unser,
+                ext_dict, impl_dict, use_trait_dict)
+
+
+def load_index_cache(key):
+    '''
+    加载项目索引缓存，成功时返回True
+    使用update是为了保留原索引，python在引入库中的变量时会重新获取一个新变量，
+    如果直接在这里赋值，在链查找时获得的是最初的那个索引（为空）
+    '''
+    tables = read_cache(index_cache_path(key))
+    if tables is None:
+        return False
+    for table, cached in zip(index_tables, tables):
+        table.update(cached)
+    return True
+
+
+def save_index_cache(key):
+    write_cache(index_cache_path(key), index_tables)
+    evict_cache(index_cache_dir, index_cache_max_mb)
+
+
+def freeze_index():
+    '''
+    在fork查找子进程前调用，子进程通过copy-on-write与主进程共享同一份索引（而不是各自重建或反序列化）
+    垃圾回收遍历对象时会改写对象头，使索引所在的内存页在每个子进程中被复制一遍，
+    这里先回收一次，再把当前所有对象（主要是索引中的AST）移入永久代，之后的回收不再遍历它们
+    '''
+    gc.collect()
+    gc.freeze()
+
+
+def unfreeze_index():
+    gc.unfreeze()
+
+
+def dynamic_class_set_attr():
+    '''
+    解析目标目录下所有的php文件中的类，并记录类中的方法和属性
+
+    不会去解析其中include的文件，每个文件只过一遍
+    '''
 
     files = return_files(php_prog_root)
 
@@ -1016,26 +1480,25 @@ def dynamic_class_set_attr():
             php_files.append(os.path.abspath(files[i]))
     del files
 
-    # 解析php文件并加载类方法和类属性
-    for vphpfile in php_files:
-        if 'testcase' in vphpfile.lower():
-            continue
-        parser = make_parser()
-        try:
-            testphpfile = open(vphpfile, encoding='utf8').read()
-        except UnicodeDecodeError:
-            print('[warning] The file cannot be decoded: '+vphpfile)
-            continue
+    php_files = [f for f in php_files if 'testcase' not in f.lower()]
 
-        lexer.lexer.begin('INITIAL')
-        lexer.lineno = 1
+    # 使用项目索引缓存，命中时跳过解析和继承关系处理
+    if use_cache:
+        cache_key = index_cache_key(php_files)
+        if load_index_cache(cache_key):
+            print('[message] Index loaded from cache')
+            report_progress('parse', len(php_files), len(php_files))
+            return
 
-        try:
-            vast = parser.parse(testphpfile, lexer=lexer)
+    report_progress('parse', 0, len(php_files))
 
-        except SyntaxError as e:  # 语法错误时直接忽略掉该文件
-            print(
-                f'''[warning] SyntaxError in file "{vphpfile}", line {lexer.lineno}\n{e}''')
+    # 解析php文件并加载类方法和类属性
+    # 解析可以在多个进程中并行进行，但类信息的登记依赖文件顺序，仍按原顺序在主进程中完成
+    for parsed, (vphpfile, vast, warning) in enumerate(parse_php_files(php_files), 1):
+        report_progress('parse', parsed, len(php_files))
+        if warning is not None:
+            print(warning)
+        if vast is None:
             continue
 
         os.chdir(os.path.dirname(vphpfile))  # 进入PHP的工作路径
@@ -1072,6 +1535,9 @@ def dynamic_class_set_attr():
             # 设置class_dict
             tree_set_class_dict(node, namespace, vphpfile)
 
+    if use_ast_cache:
+        evict_cache(ast_cache_dir, ast_cache_max_mb)
+
     global loaded
     # 根据use trait关系对trait属性和类属性进行添加
     loaded = set()
@@ -1117,21 +1583,9 @@ def dynamic_class_set_attr():
                     attr_func_dict[node.name] = []
                 attr_func_dict[node.name].append(vclass)
 
-    if not os.path.exists(hunter_root+'/cache/'):
-        os.makedirs(hunter_root+'/cache/')
-
     # 缓存代码信息
-    with open(attr_func_dict_cache, 'wb') as fw:
-        pickle.dump(attr_func_dict, fw)
-
-    with open(class_dict_cache, 'wb') as fw:
-        pickle.dump(class_dict, fw)
-
-    with open(global_func_dict_cache, 'wb') as fw:
-        pickle.dump(global_func_dict, fw)
-
-    with open(cannot_unser_cache, 'wb') as fw:
-        pickle.dump(cannot_unser, fw)
+    if use_cache:
+        save_index_cache(cache_key)
 
 
 def add_parent_attr(vclass, extended: set):
@@ -0,0 +1,96 @@
+'''
+AST 结点内存占用与分配速度基准测试
+
+用法（在 PFortifier 目录下运行）：
+    python benchmarks/ast_mem_bench.py [项目zip或目录] [-c 副本数]
+
+默认使用仓库中的 test/monolog.zip。解析项目中的所有php文件并保留全部AST（与建立索引后一致），输出：
+    nodes:  AST结点数量
+    memory: 保留的AST占用的内存（tracemalloc统计，不含解析表），以及平均每个结点的字节数
+    peak:   解析过程中的内存峰值（tracemalloc）和进程的最大RSS
+    speed:  不开启tracemalloc时的解析速度（结点/秒）
+-c 将同一项目重复解析多次并全部保留，用于模拟更大的代码库
+'''
+
+import argparse
+import gc
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+from parse_bench import collect_php_files, default_project
+
+from phply import phpast
+from phply.phplex import make_lexer
+from phply.phpparse import get_parser
+
+
+def parse_all(sources, copies):
+    parser = get_parser()
+    trees = []
+    for _ in range(copies):
+        for _, code in sources:
+            try:
+                trees.append(parser.parse(code, lexer=make_lexer()))
+            except SyntaxError:
+                pass
+    return trees
+
+
+def count_nodes(value):
+    if isinstance(value, phpast.Node):
+        return 1 + sum(count_nodes(getattr(value, field)) for field in value.fields)
+    if isinstance(value, list):
+        return sum(count_nodes(item) for item in value)
+    return 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description='AST node memory benchmark')
+    ap.add_argument('project', nargs='?', default=default_project,
+                    help='zip file or directory of a php project')
+    ap.add_argument('-c', dest='copies', type=int, default=1, help='number of copies of the project to keep')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.project
+        if zipfile.is_zipfile(root):
+            with zipfile.ZipFile(root) as z:
+                z.extractall(tmp)
+            root = tmp
+        sources = collect_php_files(root)
+
+    if not sources:
+        print('no php files found')
+        return
+
+    sys.setrecursionlimit(10000)
+    get_parser()  # 解析表不计入
+
+    start = time.perf_counter()
+    trees = parse_all(sources, args.copies)
+    cost = time.perf_counter() - start
+    nodes = count_nodes(trees)
+    del trees
+    gc.collect()
+
+    tracemalloc.start()
+    trees = parse_all(sources, args.copies)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'files     {len(sources) * args.copies}')
+    print(f'nodes     {nodes}')
+    print(f'memory    {current / 1024 / 1024:.1f} MB ({current / nodes:.0f} bytes/node)')
+    print(f'peak      {peak / 1024 / 1024:.1f} MB traced, {maxrss:.1f} MB max RSS')
+    print(f'speed     {nodes / cost:.0f} nodes/sec ({cost:.3f}s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+'''
+PHP 文件解析吞吐量基准测试
+
+用法（在 PFortifier 目录下运行）：
+    python benchmarks/parse_bench.py [项目zip或目录] [-n 重复次数]
+
+默认使用仓库中的 test/monolog.zip，在单进程中对比两种解析方式的 files/sec：
+    per-file: 每个文件调用一次 make_parser()（原实现）
+    cached:   每个进程只构建一次解析器，每个文件使用新的词法分析器
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+hunter_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, hunter_root)
+
+from phply.phplex import lexer, make_lexer
+from phply.phpparse import make_parser, get_parser
+
+php_exts = ('php', 'phtml', 'inc')
+default_project = os.path.join(hunter_root, '..', '..', '..', 'test', 'monolog.zip')
+
+
+def collect_php_files(root):
+    php_files = []
+    for dirpath, _, files in os.walk(root):
+        for f in files:
+            path = os.path.join(dirpath, f)
+            if f.split('.')[-1] in php_exts and 'testcase' not in path.lower():
+                php_files.append(path)
+    php_files.sort()
+    return [(path, open(path, encoding='utf8', errors='ignore').read()) for path in php_files]
+
+
+def parse_per_file(sources):
+    for _, code in sources:
+        parser = make_parser()
+        lexer.lexer.begin('INITIAL')
+        lexer.lineno = 1
+        try:
+            parser.parse(code, lexer=lexer)
+        except SyntaxError:
+            pass
+
+
+def parse_cached(sources):
+    for _, code in sources:
+        parser = get_parser()
+        try:
+            parser.parse(code, lexer=make_lexer())
+        except SyntaxError:
+            pass
+
+
+def bench(name, func, sources, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(sources)
+        cost = time.perf_counter() - start
+        best = cost if best is None else min(best, cost)
+    print(f'{name:<10}{len(sources) / best:>10.1f} files/sec  ({best:.3f}s for {len(sources)} files)')
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description='PHP parsing throughput benchmark')
+    ap.add_argument('project', nargs='?', default=default_project,
+                    help='zip file or directory of a php project')
+    ap.add_argument('-n', dest='repeat', type=int, default=3, help='repeat times, the best run is reported')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.project
+        if zipfile.is_zipfile(root):
+            with zipfile.ZipFile(root) as z:
+                z.extractall(tmp)
+            root = tmp
+        sources = collect_php_files(root)
+
+    if not sources:
+        print('no php files found')
+        return
+
+    get_parser()  # 与服务中一致，解析表在计时之前已经构建
+    before = bench('per-file', parse_per_file, sources, args.repeat)
+    after = bench('cached', parse_cached, sources, args.repeat)
+    print(f'speedup   {before / after:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
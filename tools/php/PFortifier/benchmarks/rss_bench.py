@@ -0,0 +1,139 @@
+'''
+查找子进程内存占用基准测试
+
+用法（在 PFortifier 目录下运行）：
+    python benchmarks/rss_bench.py [项目zip或目录] [-w 子进程数]
+
+默认使用仓库中的 test/monolog.zip。先在主进程中建立索引，再分别用以下方式启动子进程，
+每个子进程查找一部分入口类，全部查找结束后同时统计各子进程的内存：
+- unpickle: spawn启动，每个子进程各自反序列化一份索引（不共享）
+- fork: fork启动，继承主进程的索引
+- fork+freeze: fork前调用freeze_index()，即search_pop_chains使用的方式
+
+输出每个子进程的 RSS、USS（私有内存）和 PSS（共享内存按进程数分摊），单位MB
+'''
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import zipfile
+
+hunter_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, hunter_root)
+os.chdir(hunter_root)
+
+import config
+
+default_project = os.path.join(hunter_root, '..', '..', '..', 'test', 'monolog.zip')
+
+
+def memory_mb():
+    '''
+    从 /proc/self/smaps_rollup 读取 (RSS, USS, PSS)
+    '''
+    fields = {}
+    with open('/proc/self/smaps_rollup') as fr:
+        for line in fr:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0][:-1]] = int(parts[1])
+    uss = fields['Private_Clean'] + fields['Private_Dirty']
+    return fields['Rss'] / 1024, uss / 1024, fields['Pss'] / 1024
+
+
+def run_worker(i, workers, root, tmp, index_file, barrier, conn):
+    '''
+    查找entries[i::workers]中的入口，等待所有子进程查找结束后统计内存
+    index_file不为None时（spawn），先反序列化索引
+    '''
+    if index_file is not None:
+        config.use_cache = False
+        config.set_target(root, os.path.join(tmp, f'result-{i}'))
+
+    from POPChainHunter import utils
+    import POPChainHunter.core as core
+
+    if index_file is not None:
+        os.chdir(root)
+        for table, cached in zip(utils.index_tables, utils.read_cache(index_file)):
+            table.clear()
+            table.update(cached)
+
+    sys.stdout = open(os.devnull, 'w')
+    for func, vclass in core.search_entries()[i::workers]:
+        core.search_entry(func, vclass)
+
+    barrier.wait()
+    conn.send(memory_mb())
+    conn.close()
+    barrier.wait()
+
+
+def run_mode(method, workers, root, tmp, index_file=None):
+    ctx = multiprocessing.get_context(method)
+    barrier = ctx.Barrier(workers)
+    procs = []
+    conns = []
+    for i in range(workers):
+        parent_conn, child_conn = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=run_worker,
+                           args=(i, workers, root, tmp, index_file, barrier, child_conn))
+        proc.start()
+        procs.append(proc)
+        conns.append(parent_conn)
+    results = [conn.recv() for conn in conns]
+    for proc in procs:
+        proc.join()
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Search worker memory benchmark')
+    ap.add_argument('project', nargs='?', default=default_project,
+                    help='zip file or directory of a php project')
+    ap.add_argument('-w', dest='workers', type=int, default=4, help='number of worker processes')
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.project
+        if zipfile.is_zipfile(root):
+            root = os.path.join(tmp, 'project')
+            with zipfile.ZipFile(args.project) as z:
+                z.extractall(root)
+        config.use_cache = False
+        config.set_target(root, os.path.join(tmp, 'result'))
+
+        from POPChainHunter import utils
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+        utils.dynamic_class_set_attr()
+        sys.stdout = stdout
+
+        index_file = os.path.join(tmp, 'index.pkl')
+        utils.write_cache(index_file, utils.index_tables)
+        index_mb = os.path.getsize(index_file) / 1024 / 1024
+
+        parent_rss = memory_mb()[0]
+        modes = [
+            ('unpickle', run_mode('spawn', args.workers, root, tmp, index_file)),
+            ('fork', run_mode('fork', args.workers, root, tmp)),
+        ]
+        utils.freeze_index()
+        modes.append(('fork+freeze', run_mode('fork', args.workers, root, tmp)))
+        utils.unfreeze_index()
+
+    print(f'index pickle  {index_mb:.1f} MB')
+    print(f'parent RSS    {parent_rss:.1f} MB')
+    print(f'{"mode":<12} {"worker":>6} {"RSS":>8} {"USS":>8} {"PSS":>8}')
+    for name, results in modes:
+        for i, (rss, uss, pss) in enumerate(results):
+            print(f'{name:<12} {i:>6} {rss:>8.1f} {uss:>8.1f} {pss:>8.1f}')
+        total_uss = sum(r[1] for r in results)
+        total_pss = sum(r[2] for r in results)
+        print(f'{name:<12} {"total":>6} {"":>8} {total_uss:>8.1f} {total_pss:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,6 @@ configuration file
 
 import os
 import shutil
-import re
 
 # garbage collect
 # on: reduce memory usage, but process speed down
@@ -34,10 +33,15 @@ skip_overdetected = True
 # filter_sink = False
 filter_sink = True
 
-# use cache
+# use the index cache (class/method tables) of the project, a rescan of an unchanged project skips parsing,
+# it is keyed by the project content, root directory, analyzer version and the config that affects the index
 use_cache = False
 # use_cache = True
 
+# per-file AST cache keyed by the file content, unchanged files are not parsed again when rescanning
+use_ast_cache = True
+# use_ast_cache = False
+
 # exclude the class whoese wakeup contains a "die()"
 # exclude_die_wakeup = False
 exclude_die_wakeup = True
@@ -67,35 +71,82 @@ entry_depth = 1
 early_stop_num = 1000
 
 # -------------------
-# php_prog_root: the root directory of the php program
-php_prog_root = os.environ.get("PHP_PROG_ROOT")
+# php_prog_root: the root directory of the php program (can be overridden by `Main.py -root`)
+php_prog_root = os.environ.get("PHP_PROG_ROOT", '')
 # -------------------
 
-hunter_root = os.getcwd()
+hunter_root = os.path.dirname(os.path.abspath(__file__))
 
-# The result dir
-tail = os.path.basename(php_prog_root.rstrip('/\\'))
-m = re.search(r'([0-9a-fA-F]{32})$', tail)
-res_dir_name = m.group(1)
-res_root = os.path.join(hunter_root, 'result', res_dir_name) + os.sep
+# The result dir, set by set_target()
+res_root = ''
 
 # must be the absolute path, result file to store the found chains
-result_file = res_root + r'pop_chains.json'
+result_file = ''
 
 # must be the absolute path, result file to store the patch
-patch_file = res_root + r'patch.json'
+patch_file = ''
 
 # result file to store the collected patch info
-patch_collect_file = res_root + r'patch_collect.json'
+patch_collect_file = ''
 
 # result file to store the pop chain entry which cannot be fixed
-unable2patch_file = res_root + r'unable2patch_entry.json'
+unable2patch_file = ''
 
 # must be the absolute path, result file to store the running information
-info_file = res_root + r'info.txt'
+info_file = ''
 
 # log info file
-log_file = res_root + r'log.txt'
+log_file = ''
+
+
+def set_target(prog_root, out_dir=None):
+    '''
+    设置本次扫描的目标程序目录与结果目录，须在导入 POPChainHunter 之前调用
+    out_dir 为空时使用 hunter_root/result/<目标目录名>，结果目录会被清空重建
+    每次扫描使用各自的结果目录，多个扫描进程可以同时运行
+    '''
+    global php_prog_root, res_root, result_file, patch_file, patch_collect_file
+    global unable2patch_file, info_file, log_file
+
+    php_prog_root = os.path.abspath(prog_root)
+    if out_dir is None:
+        out_dir = os.path.join(hunter_root, 'result', os.path.basename(php_prog_root.rstrip('/\\')))
+    res_root = os.path.abspath(out_dir) + os.sep
+
+    result_file = res_root + r'pop_chains.json'
+    patch_file = res_root + r'patch.json'
+    patch_collect_file = res_root + r'patch_collect.json'
+    unable2patch_file = res_root + r'unable2patch_entry.json'
+    info_file = res_root + r'info.txt'
+    log_file = res_root + r'log.txt'
+
+    try:
+        shutil.rmtree(res_root)
+    except FileNotFoundError:
+        pass
+    os.makedirs(res_root)
+
+
+# number of processes used to parse php files, 0: one per cpu core, 1: parse in the main process
+parse_workers = 0
+
+# number of processes used to search POP chains, each process searches a part of the entry classes
+# 0: one per cpu core, 1: search in the main process
+# entries searched in different processes do not share the pm summary, so the found chains may differ slightly from the serial search
+search_workers = 1
+
+# json file of custom sinks, which are added to (or override) the builtin sinks, relative to hunter_root or absolute
+# format: [{"name": "func", "type": "vuln type", "args": [0], "check": "tainted"}, ...], see read_sink_file() in POPChainHunter/utils.py
+custom_sink_file = os.environ.get("PFORTIFIER_SINK_FILE", '')
+
+# found chains and patches are buffered and appended to the result files when result_flush_num lines are buffered
+# or result_flush_interval seconds have passed, each chain is also printed to stdout as a "[chain] <json>" line at that time
+result_flush_num = 100
+result_flush_interval = 2
+
+# the scan progress (phase, processed files/entries, found chains, elapsed time) is printed to stdout as a
+# "[progress] <json>" line at most once every progress_interval seconds
+progress_interval = 1
 
 # python recursion limit
 python_rec_depth = 10000
@@ -107,13 +158,9 @@ php_exts = set(
 
 
 # cache directory
-attr_func_dict_cache = hunter_root+'/cache/attr_func_dict.pkl'
-class_dict_cache = hunter_root+'/cache/class_dict.pkl'
-global_func_dict_cache = hunter_root+'/cache/global_func_dict.pkl'
-cannot_unser_cache = hunter_root+'/cache/cannot_unser.pkl'
-
-try:
-    shutil.rmtree(res_root)
-except FileNotFoundError:
-    pass
-os.makedirs(res_root)
\ No newline at end of file
+ast_cache_dir = hunter_root+'/cache/ast'
+index_cache_dir = hunter_root+'/cache/index'
+
+# max disk usage (MB) of each cache directory, the least recently used entries are removed first
+ast_cache_max_mb = 1024
+index_cache_max_mb = 2048
@@ -6,9 +6,10 @@
 
 
 class Node(object):
+    # 结点数量多，且在整个查找过程中常驻内存，使用__slots__代替实例__dict__
+    # 子类的__slots__由node()根据fields生成，这里是所有结点共有的属性：行号、父节点、源文件
+    __slots__ = ('lineno', 'parent', 'sourcefile')
     fields = []
-    parent = None  # 父节点
-    sourcefile = None  # 源文件
 
     def __init__(self, *args, **kwargs):
         assert len(self.fields) == len(args), \
@@ -18,6 +19,8 @@ class Node(object):
             self.lineno = kwargs['lineno']
         except KeyError:
             self.lineno = None
+        self.parent = None  # 父节点
+        self.sourcefile = None  # 源文件
         for i, field in enumerate(self.fields):
             setattr(self, field, args[i])
 
@@ -64,14 +67,15 @@ class Node(object):
         return (self.__class__.__name__, values)
 
 
-def node(name, fields):
+def node(name, fields, extra=()):
     '''
     根据name和fields生成继承Node的动态类
 
     name为类名  
-    fields是类包含的成员属性，为列表
+    fields是类包含的成员属性，为列表，同时作为该类的__slots__
+    extra是建立索引时附加到该类结点上的属性（如use列表），未附加时不存在该属性
     '''
-    attrs = {'fields': fields}
+    attrs = {'fields': fields, '__slots__': tuple(fields) + tuple(extra)}
     return type(name, (Node,), attrs)
 
 
@@ -100,18 +104,21 @@ Throw = node('Throw', ['node'])
 Declare = node('Declare', ['directives', 'node'])
 Directive = node('Directive', ['name', 'node'])
 Function = node('Function', ['name', 'params',
-                             'nodes', 'is_ref', 'returntype'])
+                             'nodes', 'is_ref', 'returntype'],
+                ['use_list', 'namespace'])
 Method = node('Method', ['name', 'modifiers', 'params',
-                         'nodes', 'is_ref', 'returntype'])
+                         'nodes', 'is_ref', 'returntype'],
+              ['use_list'])
 Closure = node('Closure', ['params', 'vars', 'nodes', 'is_ref'])
 Class = node('Class', ['name', 'type', 'extends',
-                       'implements', 'traits', 'nodes'])
-Trait = node('Trait', ['name', 'traits', 'nodes'])
+                       'implements', 'traits', 'nodes'],
+             ['use_list'])
+Trait = node('Trait', ['name', 'traits', 'nodes'], ['use_list'])
 ClassConstants = node('ClassConstants', ['nodes'])
 ClassConstant = node('ClassConstant', ['name', 'initial'])
 ClassVariables = node('ClassVariables', ['modifiers', 'nodes'])
 ClassVariable = node('ClassVariable', ['name', 'initial'])
-Interface = node('Interface', ['name', 'extends', 'nodes'])
+Interface = node('Interface', ['name', 'extends', 'nodes'], ['use_list'])
 AssignOp = node('AssignOp', ['op', 'left', 'right'])
 BinaryOp = node('BinaryOp', ['op', 'left', 'right'])
 UnaryOp = node('UnaryOp', ['op', 'expr'])
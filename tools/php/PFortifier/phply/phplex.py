@@ -646,6 +646,19 @@ class FilteredLexer(object):
 full_lexer = lex.lex()
 lexer = FilteredLexer(full_lexer)
 
+
+def make_lexer():
+    """Return a fresh lexer in the INITIAL state for parsing one file.
+
+    Cloning reuses the compiled master regexes of full_lexer, so this is
+    cheap compared to lex.lex().
+    """
+    new_lexer = FilteredLexer(full_lexer.clone())
+    new_lexer.lexer.lexstatestack = []
+    new_lexer.lexer.begin('INITIAL')
+    new_lexer.lineno = 1
+    return new_lexer
+
 full_tokens = tokens
 tokens = [token for token in tokens if token not in unparsed]
 
@@ -2109,6 +2109,24 @@ def make_parser(debug=False):
     return yacc.yacc(debug=debug)
 
 
+_parser = None
+
+
+def get_parser():
+    """Return the parser of the current process.
+
+    The LALR tables are built (or loaded from parsetab) on the first call
+    only.  The parser keeps no state between parse() calls, so the same
+    instance is reused for every file; pair it with a lexer from
+    phplex.make_lexer().  Processes forked after the first call inherit
+    the built parser.
+    """
+    global _parser
+    if _parser is None:
+        _parser = make_parser()
+    return _parser
+
+
 def main():
     import argparse
     import os
@@ -38,55 +38,73 @@ def get_file_hash(file):
     file.seek(0)  # 重置文件指针，以便后续保存
     return hasher.hexdigest()
 
-def generate_yaml(base_yaml, target, new_yaml):
+def generate_yaml(base_yaml, target, new_yaml, out_dir=None):
+    """
+    基于 base_yaml 生成本次扫描的配置文件 new_yaml
+    指定 out_dir 时 outputDir 指向该目录，返回链结果文件（outputDir 下的 GC_OUT）的路径
+    """
     with open(base_yaml, 'r') as f:
         base_config = yaml.safe_load(f)
 
     target = target + "/"
 
     base_config['appClassPath'].append(target)
+    if out_dir is not None:
+        base_config['outputDir'] = out_dir
 
     with open(new_yaml, 'w', encoding='utf-8') as nf:
         yaml.dump(base_config, nf, default_flow_style=False, sort_keys=False)
 
-def decompile_java(save_path):
+    return os.path.join(base_config['outputDir'], base_config['GC_OUT'])
+
+def java_class_files(decompile_dir):
     """
-    若找到 .jar 文件则使用 jadx 反编译
-    反编译结果保存在 save_path/decompiled/ 下
+    遍历 jadx 反编译目录，返回 [(类名, 简单类名, 相对 decompile_dir 的路径), ...]
+    类名为 sources/ 下去掉 .java 后缀的路径，如 org/apache/Foo
     """
-    jar_files = []
-    for root, _, files in os.walk(save_path):
+    classes = []
+    for root, _, files in os.walk(decompile_dir):
         for file in files:
-            if file.endswith('.jar'):
-                jar_files.append(os.path.join(root, file))
-
-    if not jar_files:
-        return
-    
-    output_dir = os.path.join(save_path, "decompiled")
-    os.makedirs(output_dir, exist_ok=True)
-
-    for jar in jar_files:
-        # 'jar' is already an absolute path from os.walk
-        jar_path = jar
-        jar_output = os.path.join(output_dir, os.path.splitext(os.path.basename(jar))[0])
-        os.makedirs(jar_output, exist_ok=True)
+            if not file.endswith('.java'):
+                continue
+            rel = os.path.relpath(os.path.join(root, file), decompile_dir).replace('\\', '/')
+            name = rel[:-len('.java')]
+            # jadx 的输出为 <输出目录>/sources/<包路径>/<类>.java
+            if name.startswith('sources/'):
+                name = name[len('sources/'):]
+            elif '/sources/' in name:
+                name = name.split('/sources/', 1)[1]
+            classes.append((name, file[:-len('.java')], rel))
+    return classes
 
-        tool_dir = os.path.join(os.path.abspath(os.path.dirname(__file__)), "tools", "java_decompile", "bin")
-        # Choose the correct launcher per platform
-        if os.name == 'nt':
-            run_cmd = ["cmd", "/c", "jadx.bat", "-d", jar_output, jar_path]
-        else:
-            run_cmd = ["./jadx", "-d", jar_output, jar_path]
-            # Try to ensure executable permission (best-effort; ignore failures)
+def jar_class_entries(project_dir):
+    """
+    列出项目中各 jar 包含的类（不解压、不反编译），返回 [(类名, 简单类名, jar 相对 project_dir 的路径), ...]
+    类名如 org/apache/Foo，内部类归入外部类
+    """
+    classes = []
+    for root, _, files in os.walk(project_dir):
+        for file in files:
+            if not file.endswith('.jar'):
+                continue
+            jar_path = os.path.join(root, file)
+            rel = os.path.relpath(jar_path, project_dir).replace('\\', '/')
             try:
-                jadx_path = os.path.join(tool_dir, "jadx")
-                if os.path.exists(jadx_path):
-                    os.chmod(jadx_path, os.stat(jadx_path).st_mode | 0o111)
-            except Exception:
-                pass
-
-        with subprocess.Popen(run_cmd, cwd=tool_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True) as proc:
-            for line in proc.stdout:
-                print(line, end='')
-                sys.stdout.flush()
\ No newline at end of file
+                with zipfile.ZipFile(jar_path) as z:
+                    names = z.namelist()
+            except (zipfile.BadZipFile, OSError):
+                continue
+            seen = set()
+            for entry in names:
+                if not entry.endswith('.class') or entry.startswith('META-INF/'):
+                    continue
+                # Spring Boot 等可执行 jar 中的类位于 BOOT-INF/classes/ 下
+                if entry.startswith('BOOT-INF/classes/'):
+                    entry = entry[len('BOOT-INF/classes/'):]
+                name = entry[:-len('.class')].split('$', 1)[0]
+                simple = name.rsplit('/', 1)[-1]
+                if simple in ('module-info', 'package-info') or name in seen:
+                    continue
+                seen.add(name)
+                classes.append((name, simple, rel))
+    return classes